@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import sys, os
+import argparse
+import time
+import tracemalloc
+from datetime import date
+
+# Importar parse_calendar
+PROYECTO_ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, PROYECTO_ROOT)
+
+from src.reader import parse_calendar, ENGINES
+
+EXCEL = os.path.join(PROYECTO_ROOT, "tax_calendar_25_cleaned.xlsm")
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Compara tiempo y memoria pico de los motores de parse_calendar"
+    )
+    p.add_argument("excel", nargs="?", default=EXCEL,
+                   help="Excel a leer (por defecto el calendario limpio).")
+    p.add_argument("-e", "--engine", action="append", choices=ENGINES,
+                   help="Motor a medir (repetible). Por defecto todos.")
+    p.add_argument("-d", "--date",
+                   help="Medir la consulta de una sola fecha (YYYY-MM-DD).")
+    p.add_argument("-w", "--workers", type=int,
+                   help="Procesos por motor (parse_calendar workers).")
+    p.add_argument("-n", "--repeat", type=int, default=3,
+                   help="Repeticiones por motor; se queda el mejor tiempo.")
+    return p.parse_args()
+
+def measure(path, engine, target_date=None, repeat=3, workers=None):
+    """Mejor tiempo de pared, pico de memoria Python (tracemalloc) y memoria
+    retenida por la lista de registros devuelta.
+
+    Con workers > 1 el pico solo cubre el proceso principal.
+    """
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        regs = parse_calendar(path, target_date=target_date, engine=engine, workers=workers)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    del regs
+    tracemalloc.start()
+    regs = parse_calendar(path, target_date=target_date, engine=engine, workers=workers)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"engine": engine, "records": len(regs), "seconds": best,
+            "peak_mb": peak / 2**20, "retained_mb": retained / 2**20}
+
+def main():
+    args = parse_args()
+    target = date.fromisoformat(args.date) if args.date else None
+    engines = args.engine or list(ENGINES)
+
+    results = [measure(args.excel, engine, target, args.repeat, args.workers)
+               for engine in engines]
+
+    ref = results[0]
+    print(f"{'motor':<10} {'registros':>9} {'tiempo (s)':>11} {'pico (MB)':>10} {'retenido (MB)':>14} "
+          f"{'x tiempo':>9} {'x memoria':>10}")
+    for r in results:
+        print(f"{r['engine']:<10} {r['records']:>9} {r['seconds']:>11.3f} {r['peak_mb']:>10.1f} "
+              f"{r['retained_mb']:>14.2f} "
+              f"{ref['seconds'] / r['seconds']:>9.1f} {ref['peak_mb'] / max(r['peak_mb'], 1e-9):>10.1f}")
+
+if __name__ == "__main__":
+    main()
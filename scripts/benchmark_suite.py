@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+import sys, os
+import argparse
+import contextlib
+import io
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+# Importar src/ y los scripts que se miden
+PROYECTO_ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, PROYECTO_ROOT)
+
+from src import reader
+from src.convert import convert_workbook
+from src.reader import ENGINES, iter_calendar, parse_calendar
+from src.synthetic import CalendarSpec, build_calendar
+from scripts import convert_colors, generate_reports
+
+BASELINE = os.path.join(PROYECTO_ROOT, "data", "benchmarks", "baseline.json")
+BASELINE_VERSION = 1
+
+# Tamaños con nombre: empresas x filas x años
+SIZES = {
+    "small": "3x20x1",
+    "medium": "10x50x1",
+    "large": "20x100x2",
+}
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Mide parse_calendar, convert_colors y generate_reports sobre calendarios "
+                    "sintéticos de varios tamaños y guarda tiempos y memoria pico en JSON"
+    )
+    p.add_argument("-s", "--size", action="append",
+                   help=f"Tamaño (repetible): {', '.join(SIZES)} o EMPRESASxFILASxAÑOS "
+                        "(ej. 5x30x1). Por defecto small y medium.")
+    p.add_argument("-e", "--engine", action="append", choices=ENGINES,
+                   help="Motor de parse_calendar a medir (repetible). Por defecto todos.")
+    p.add_argument("-n", "--repeat", type=int, default=3,
+                   help="Repeticiones por tarea; se queda el mejor tiempo.")
+    p.add_argument("--seed", type=int, default=0, help="Semilla de los libros sintéticos.")
+    p.add_argument("-o", "--output",
+                   help="JSON en el que guardar los resultados (por defecto "
+                        "data/benchmarks/baseline.json, salvo con --compare: entonces solo "
+                        "se guardan si se da -o).")
+    p.add_argument("--compare", metavar="JSON",
+                   help="Comparar con una medición anterior; sale con error si alguna tarea "
+                        "es más lenta que lo que permite --tolerance.")
+    p.add_argument("--tolerance", type=float, default=0.25,
+                   help="Margen de tiempo tolerado frente a --compare (0.25 = 25%%).")
+    p.add_argument("--keep", metavar="DIR",
+                   help="Dejar los libros generados en DIR en vez de en un temporal.")
+    args = p.parse_args()
+    if args.compare and args.output and \
+            os.path.abspath(args.output) == os.path.abspath(args.compare):
+        p.error("-o no puede ser el mismo JSON que --compare: se perdería la referencia")
+    return args
+
+def output_path(args):
+    """JSON en el que guardar la medición, o None: con --compare la referencia
+    no se pisa con lo que se está comparando."""
+    return args.output or (None if args.compare else BASELINE)
+
+def size_spec(size: str, seed: int) -> CalendarSpec:
+    return CalendarSpec.parse(SIZES.get(size, size), seed=seed)
+
+def _cold():
+    """Vacía las cachés en memoria del proceso: cada repetición lee de cero."""
+    reader._LAYOUTS.clear()
+
+def measure(fn, repeat=3):
+    """(mejor tiempo de pared, pico de memoria Python en MB, resultado de fn).
+
+    El pico se mide con tracemalloc en una ejecución aparte, para que su coste
+    no entre en el tiempo.
+    """
+    best = None
+    for _ in range(repeat):
+        _cold()
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    del result
+    _cold()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20, result
+
+def tasks(path, workdir, engines, spec):
+    """(nombre, función) de cada tarea sobre el libro path."""
+    target = date(spec.start_year, 6, 2)
+    for engine in engines:
+        yield f"parse_calendar[{engine}]", lambda e=engine: len(parse_calendar(path, engine=e))
+    yield "parse_calendar[xml,fecha]", lambda: len(parse_calendar(path, target_date=target,
+                                                                  engine="xml"))
+
+    dst = os.path.join(workdir, "convertido.xlsx")
+    def convert():
+        return sum(r.changed for r in convert_workbook(
+            path, dst, convert_colors.color_code_for, convert_colors.skip_sheet,
+            reuse=False))
+    yield "convert_colors[patch]", convert
+
+    out_dir = os.path.join(workdir, "outputs")
+    os.makedirs(out_dir, exist_ok=True)
+    def reports():
+        generate_reports.OUT_DIR = out_dir
+        with contextlib.redirect_stdout(io.StringIO()):
+            return len(generate_reports.stream_reports(iter_calendar(path)))
+    yield "generate_reports[all-dates]", reports
+
+def run(sizes, engines, repeat, seed, workdir):
+    results = []
+    for size in sizes:
+        spec = size_spec(size, seed)
+        path = os.path.join(workdir, f"calendar_{spec.label}.xlsx")
+        t0 = time.perf_counter()
+        build_calendar(path, spec)
+        print(f"\n== {size} ({spec.label}): {os.path.getsize(path) / 2**10:.0f} KB, "
+              f"generado en {time.perf_counter() - t0:.1f}s")
+        for name, fn in tasks(path, workdir, engines, spec):
+            seconds, peak_mb, count = measure(fn, repeat)
+            results.append({"size": size, "spec": spec.label, "task": name,
+                            "seconds": seconds, "peak_mb": peak_mb, "count": count})
+            print(f"  {name:<28} {seconds:>8.3f}s {peak_mb:>9.1f} MB  ({count})")
+    return results
+
+def compare(results, baseline_path, tolerance):
+    """Tabla frente a la medición de baseline_path; True si nada empeora más
+    de tolerance."""
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {(r["spec"], r["task"]): r for r in json.load(f)["results"]}
+    ok = True
+    print(f"\n{'tamaño':<10} {'tarea':<28} {'base (s)':>9} {'ahora (s)':>10} {'x tiempo':>9} "
+          f"{'x memoria':>10}")
+    for r in results:
+        b = base.get((r["spec"], r["task"]))
+        if b is None:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        worse = ratio > 1 + tolerance
+        ok &= not worse
+        print(f"{r['spec']:<10} {r['task']:<28} {b['seconds']:>9.3f} {r['seconds']:>10.3f} "
+              f"{ratio:>9.2f} {r['peak_mb'] / max(b['peak_mb'], 1e-9):>10.2f}"
+              + ("  ← más lento" if worse else ""))
+    return ok
+
+def save(results, path, args):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": BASELINE_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResultados guardados en: {path}")
+
+def main():
+    args = parse_args()
+    sizes = args.size or ["small", "medium"]
+    engines = args.engine or list(ENGINES)
+
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+        results = run(sizes, engines, args.repeat, args.seed, args.keep)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run(sizes, engines, args.repeat, args.seed, workdir)
+
+    ok = compare(results, args.compare, args.tolerance) if args.compare else True
+
+    output = output_path(args)
+    if output:
+        save(results, output, args)
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,94 @@
 #!/usr/bin/env python3
 import os
 import sys
+import argparse
+import time
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 
 # Rutas
 ROOT   = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+
+from src.convert import convert_workbook
+from src.legend import DEFAULT_LEGEND, read_legend
+from src.palette import is_background
+from src.reader import date_grid
+from src.xlsx import XlsxPackage
+
 INPUT  = os.path.join(ROOT, "tax_calendar_25.xlsm")
 OUTPUT = os.path.join(ROOT, "tax_calendar_25_cleaned.xlsm")
 
-# Mapa de color ARGB → sigla
-COLOR_CODE = {
-    "FFFFFF": "SP",  # blanco
-    "FFFF66": "SI",
-    "9966FF": "RI",
-    "FF5050": "SD",
-    "FF99FF": "AD",
-    "70AD47": "OS",
-    "00B0F0": "OP",
-    "996633": "HS",
-    "BF8F00": "HL",
-    "CC9900": "HL",
-}
+# Mapa de color ARGB → sigla: la leyenda común y, solo aquí, el blanco como SP
+COLOR_CODE = {"FFFFFF": "SP", **DEFAULT_LEGEND.colors}
 SIGLAS = set(COLOR_CODE.values())
 
-def argb_to_hex(argb):
-    if not argb:
-        return None
-    s = str(argb)
-    return s[-6:].upper()
+def color_code_for(pkg, sheet):
+    """COLOR_CODE con los colores que añada la leyenda de la hoja: la misma
+    con la que el lector la clasifica."""
+    return {"FFFFFF": "SP", **read_legend(pkg, sheet).colors}
 
-def main():
-    print(f"INPUT file:  {INPUT}")
-    print(f"OUTPUT file: {OUTPUT}")
-    if not os.path.exists(INPUT):
-        print("ERROR: no existe el archivo de entrada")
-        sys.exit(1)
+def skip_sheet(sheet):
+    return sheet == "SETTINGS" or sheet.startswith("CALENDAR")
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Convierte los colores del calendario en siglas y quita los formatos condicionales"
+    )
+    p.add_argument("input", nargs="?", default=INPUT, help="Libro de entrada (.xlsm/.xlsx).")
+    p.add_argument("output", nargs="?", default=OUTPUT, help="Libro convertido.")
+    p.add_argument("--mode", choices=("patch", "openpyxl"), default="patch",
+                   help="patch: reescribe solo las celdas afectadas en el XML de cada hoja y "
+                        "copia el resto del zip tal cual (por defecto); openpyxl: carga y "
+                        "guarda el libro entero con keep_vba=True.")
+    p.add_argument("-w", "--workers", type=int,
+                   help="Procesos para el modo patch: cada hoja se convierte en uno aparte.")
+    p.add_argument("--force", action="store_true",
+                   help="Modo patch: convertir todo aunque el manifiesto de la salida diga "
+                        "que ya está al día.")
+    return p.parse_args()
+
+def convert_patch(input_path, output_path, workers=None, force=False):
+    summary = []
+    for r in convert_workbook(input_path, output_path, color_code_for, skip_sheet,
+                              workers, reuse=not force):
+        summary.append(r)
+        if r.reused:
+            print(f"  '{r.sheet}' sin cambios: se reutiliza la salida anterior")
+        else:
+            print(f"  celdas modificadas en '{r.sheet}': {r.changed} ({r.seconds:.2f}s)")
+        if r.kept:
+            print(f"  AVISO: '{r.sheet}' tiene {r.kept} celdas coloreadas que son la maestra de "
+                  f"una fórmula compartida o matricial; se dejan sin convertir (hazlo a mano o "
+                  f"con --mode openpyxl)")
 
+    print(f"\n{'hoja':<30} {'siglas':>7} {'rellenos':>9} {'sin convertir':>14} {'tiempo (s)':>11}")
+    for r in summary:
+        print(f"{r.sheet:<30} {r.changed:>7} {r.cleared:>9} {r.kept:>14} "
+              f"{'reutilizada' if r.reused else f'{r.seconds:.3f}':>11}")
+    print(f"{'total':<30} {sum(r.changed for r in summary):>7} {sum(r.cleared for r in summary):>9} "
+          f"{sum(r.kept for r in summary):>14} {sum(r.seconds for r in summary):>11.3f}")
+    reused = sum(r.reused for r in summary)
+    print(f"\nTotal hojas procesadas: {len(summary)} (reutilizadas: {reused})")
+    print("Guardado correctamente en:", output_path)
+
+def convert_openpyxl(input_path, output_path):
     try:
-        wb = load_workbook(INPUT, keep_vba=True)
+        wb = load_workbook(input_path, keep_vba=True)
     except Exception as e:
         print("ERROR al abrir el workbook:", e)
         sys.exit(1)
 
+    # Como en modo patch: solo la rejilla de fechas, cada hoja con su leyenda y
+    # sin blancos de fondo como SP
+    with XlsxPackage(input_path) as pkg:
+        palette = pkg.palette
+        sheets = [s for s in pkg.sheetnames if not skip_sheet(s)]
+        grids = {s: date_grid(pkg, s) for s in sheets}
+        color_codes = {s: color_code_for(pkg, s) for s in sheets}
     processed = 0
     for sheet in wb.sheetnames:
-        if sheet == "SETTINGS" or sheet.startswith("CALENDAR"):
+        if skip_sheet(sheet):
             continue
         ws = wb[sheet]
         print(f"\nProcesando hoja: {sheet}")
@@ -58,18 +101,24 @@ def main():
             pass
 
         cells_changed = 0
-        for row in ws.iter_rows():
+        color_code = color_codes.get(sheet, COLOR_CODE)
+        grid = grids.get(sheet)
+        first, legend, cols = grid if grid else (0, None, ())
+        for row in ws.iter_rows(min_row=first, max_row=legend - 1 if legend else None) if grid else ():
             for cell in row:
+                if cell.column not in cols:
+                    continue
                 val = cell.value
                 # 1) Si ya es sigla válida, ignorar
                 if isinstance(val, str) and val.strip().upper() in SIGLAS:
                     continue
 
                 # 2) Si tiene relleno sólido, convertir
+                # cell.fill es un StyleProxy: isinstance(.., PatternFill) nunca se cumple
                 fill = cell.fill
-                if isinstance(fill, PatternFill) and fill.fill_type == "solid":
-                    hexa = argb_to_hex(fill.start_color.rgb)
-                    code = COLOR_CODE.get(hexa)
+                if getattr(fill, "fill_type", None) == "solid":
+                    color = fill.start_color
+                    code = None if is_background(color) else color_code.get(palette.rgb(color))
                     if code:
                         cell.value = code
                         cells_changed += 1
@@ -81,11 +130,26 @@ def main():
     print(f"\nTotal hojas procesadas: {processed}")
     # Guardar
     try:
-        wb.save(OUTPUT)
-        print("Guardado correctamente en:", OUTPUT)
+        wb.save(output_path)
+        print("Guardado correctamente en:", output_path)
     except Exception as e:
         print("ERROR al guardar el archivo:", e)
         sys.exit(1)
 
+def main():
+    args = parse_args()
+    print(f"INPUT file:  {args.input}")
+    print(f"OUTPUT file: {args.output}")
+    if not os.path.exists(args.input):
+        print("ERROR: no existe el archivo de entrada")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    if args.mode == "patch":
+        convert_patch(args.input, args.output, args.workers, args.force)
+    else:
+        convert_openpyxl(args.input, args.output)
+    print(f"Tiempo: {time.perf_counter() - t0:.2f}s (modo {args.mode})")
+
 if __name__ == "__main__":
     main()
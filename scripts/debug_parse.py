@@ -5,52 +5,36 @@ import sys, os
 PROYECTO_ROOT = os.path.dirname(os.path.dirname(__file__))
 sys.path.insert(0, PROYECTO_ROOT)
 
-from src.reader import parse_calendar
-from openpyxl import load_workbook
-from datetime import datetime
+from src.reader import parse_calendar, sheet_layout
+from src.trace import Tracer
+from src.xlsx import XlsxPackage
 
 EXCEL = os.path.join(PROYECTO_ROOT, "tax_calendar_25.xlsm")
 
 def debug_sheet(name):
-    wb = load_workbook(EXCEL, data_only=True)
-    ws = wb[name]
     print(f"\n=== Hoja: {name} ===")
+    layout = sheet_layout(EXCEL, name)
 
-    # 1) month_row
-    month_row = None; month_val = None
-    for r in range(1, 11):
-        for cell in ws[r]:
-            if isinstance(cell.value, str) and " - " in cell.value:
-                month_row = r; month_val = cell.value; break
-        if month_row: break
-    print(" month_row:", month_row, f"({month_val})")
-
-    # 2) valores Mes-Año en cols 3–10
-    if month_row:
-        print(" month_info cols 3–10:", [ws.cell(row=month_row, column=c).value for c in range(3, 11)])
-
-    # 3) day_row
-    day_row = None
-    for r in range((month_row or 1)+1, (month_row or 1)+8):
-        nums = [c.value for c in ws[r] if isinstance(c.value, (int, float))]
-        if len(set(nums))>1 and all(1<=int(v)<=31 for v in nums):
-            day_row = r; break
-    print(" day_row:", day_row)
-
-    # 4) valores días cols 3–10
-    if day_row:
-        print(" days cols 3–10:", [ws.cell(row=day_row, column=c).value for c in range(3, 11)])
-
-    wb.close()
+    # 1) month_row y cabeceras Mes-Año
+    print(" month_row:", layout.month_row)
+    if layout.month_row:
+        print(" month_headers:", {f"{m} {y}": c for (m, y), c in layout.month_headers.items()})
+
+    # 2) day_row y primeras fechas del eje
+    print(" day_row:", layout.day_row)
+    if layout.axis:
+        print(" fechas cols 3–10:", [layout.axis.dates.get(c) for c in range(3, 11)])
 
 def main():
-    wb = load_workbook(EXCEL, data_only=True)
+    with XlsxPackage(EXCEL) as pkg:
+        sheetnames = pkg.sheetnames
     for sheet in ["ENDESA", "DRAGADOS", "X-ELIO","ALTADIA", "REPSOL"]:
-        if sheet in wb.sheetnames:
+        if sheet in sheetnames:
             debug_sheet(sheet)
-    wb.close()
 
-    regs = parse_calendar(EXCEL)
+    tracer = Tracer(cells=50)
+    regs = parse_calendar(EXCEL, cache=True, tracer=tracer)
+    print("\n" + tracer.report())
     print("\nTotal registros parseados:", len(regs))
     if regs:
         print("Primeros 10 registros:")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import sys, os
+import argparse
+import tempfile
+
+# Importar src/
+PROYECTO_ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, PROYECTO_ROOT)
+
+from src.differential import CANDIDATES, REFERENCE, run, speedups
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Compara cada motor de lectura con el de referencia (openpyxl) sobre "
+                    "calendarios sintéticos aleatorios y mide cuánto más rápido es"
+    )
+    p.add_argument("-n", "--cases", type=int, default=25, help="Libros aleatorios a probar.")
+    p.add_argument("--seed", type=int, default=0, help="Semilla: misma semilla, mismos libros.")
+    p.add_argument("-c", "--candidate", action="append", choices=sorted(CANDIDATES),
+                   help="Lector a comparar (repetible). Por defecto todos.")
+    p.add_argument("-d", "--dates", type=int, default=3,
+                   help="Fechas sueltas por libro para comparar también la consulta de un día.")
+    p.add_argument("--max-companies", type=int, default=4, help="Máximo de hojas de empresa.")
+    p.add_argument("--max-rows", type=int, default=30, help="Máximo de filas por hoja.")
+    p.add_argument("--keep", metavar="DIR",
+                   help="Dejar los libros generados en DIR (para reproducir un fallo).")
+    return p.parse_args()
+
+def check(args, workdir):
+    candidates = {c: CANDIDATES[c] for c in args.candidate or CANDIDATES}
+    results = []
+    for i, res in enumerate(run(args.cases, workdir, args.seed, args.dates, candidates,
+                                max_companies=args.max_companies, max_rows=args.max_rows)):
+        results.append(res)
+        estado = "OK" if not res.mismatches else f"{len(res.mismatches)} DIFERENCIAS"
+        print(f"caso {i:03d} {res.spec.label:<9} registros={res.records:<6} "
+              f"renombrado={res.overrides or '-'}  {estado}")
+        for m in res.mismatches:
+            print("  " + str(m).replace("\n", "\n  "))
+            print(f"  spec: {res.spec}")
+    return results
+
+def main():
+    args = parse_args()
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+        results = check(args, args.keep)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = check(args, workdir)
+
+    failed = [r for r in results if r.mismatches]
+    print(f"\n{'lector':<14} {'tiempo (s)':>11} {'x vs ' + REFERENCE:>13} {'casos con diferencias':>22}")
+    for name, (seconds, speedup) in sorted(speedups(results).items(), key=lambda kv: kv[1][0]):
+        bad = sum(any(m.candidate == name for m in r.mismatches) for r in results)
+        print(f"{name:<14} {seconds:>11.3f} {speedup:>13.2f} {bad:>22}")
+    print(f"\n{len(results)} libros, {len(failed)} con diferencias")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
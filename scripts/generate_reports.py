@@ -3,24 +3,17 @@ import sys, os
 import argparse
 from datetime import date, timedelta
 from collections import defaultdict
-from src.reader import parse_calendar
+from itertools import groupby
+from operator import itemgetter
+from src.matrix import CalendarMatrix
+from src.reader import Registro, parse_calendar, iter_calendar, company_legend, ENGINES
+from src.legend import LEGEND
+from src.trace import Tracer
 
 PROYECTO_ROOT = os.path.dirname(os.path.dirname(__file__))
 EXCEL = os.path.join(PROYECTO_ROOT, "tax_calendar_25_cleaned.xlsm")
 OUT_DIR = os.path.join(PROYECTO_ROOT, "data", "outputs")
 
-LEGEND = {
-    "SI": "Send information",
-    "RI": "Review information and doubts (EY Local)",
-    "SD": "Send draft (EY Local)",
-    "AD": "Approve draft",
-    "OS": "Official Submission Deadline",
-    "OP": "Official Payment Deadline",
-    "SP": "Official Submission and Payment (same deadline)",
-    "HS": "Public Holiday Spain",
-    "HL": "Local Holiday – Non-working day"
-}
-
 def parse_args():
     p = argparse.ArgumentParser(
         description="Genera informes de impuestos por fecha, rango o todas las fechas"
@@ -34,6 +27,20 @@ def parse_args():
                      help="Rango de fechas (YYYY-MM-DD YYYY-MM-DD).")
     p.add_argument("-c", "--company",
                    help="Filtrar por empresa (ej. ALTADIA).")
+    p.add_argument("-e", "--engine", choices=ENGINES,
+                   help="Motor con el que se lee el Excel cuando la caché no está al día "
+                        "(por defecto xml para una sola fecha, que lee solo sus columnas, "
+                        "y openpyxl para el resto; con --company solo se leen sus hojas).")
+    p.add_argument("-w", "--workers", type=int,
+                   help="Procesos para leer las hojas en paralelo.")
+    p.add_argument("--no-cache", action="store_true",
+                   help="Ignorar la caché en disco y volver a leer el Excel. Con la "
+                        "caché, una sola fecha o una empresa salen de ella si está al "
+                        "día y, si no, se lee solo lo pedido; rango y todas las fechas "
+                        "sin empresa la rehacen si el Excel cambió.")
+    p.add_argument("--trace", nargs="?", type=int, const=0, metavar="CELDAS",
+                   help="Mostrar tiempos por hoja y fase al terminar; con CELDAS, "
+                        "también las últimas decisiones por celda.")
     return p.parse_args()
 
 def daterange(start: date, end: date):
@@ -42,34 +49,76 @@ def daterange(start: date, end: date):
         yield d
         d += timedelta(days=1)
 
-def write_report(regs, dt: date, company=None):
+def report_path(dt: date, company=None):
     fn = dt.isoformat()
     if company: fn += f"_{company}"
-    path = os.path.join(OUT_DIR, f"{fn}.txt")
+    return os.path.join(OUT_DIR, f"{fn}.txt")
+
+class Legends(dict):
+    """Empresa → descripción de cada sigla según la leyenda de su hoja, leída
+    la primera vez que se pide."""
+    def __init__(self, path_excel):
+        super().__init__()
+        self.path_excel = path_excel
+
+    def __missing__(self, empresa):
+        self[empresa] = company_legend(self.path_excel, empresa).descriptions
+        return self[empresa]
+
+def write_report(regs, dt: date, company=None, append=False, legends=None):
+    """Escribe (o, con append, amplía) el informe de una fecha; legends da,
+    por empresa, la descripción de cada sigla (LEGEND si no se da)."""
+    path = report_path(dt, company)
 
     grouped = defaultdict(lambda: defaultdict(list))
     for r in regs:
         grouped[r["empresa"]][r["pais"]].append((r["impuesto"], r["estado"]))
 
-    with open(path, "w", encoding="utf-8") as f:
-        header = f"Informe de impuestos para {dt.isoformat()}"
-        if company: header += f" (Empresa: {company})"
-        f.write(header+"\n\n")
+    with open(path, "a" if append else "w", encoding="utf-8") as f:
+        if not append:
+            header = f"Informe de impuestos para {dt.isoformat()}"
+            if company: header += f" (Empresa: {company})"
+            f.write(header+"\n\n")
         for emp, paises in grouped.items():
+            legend = legends[emp] if legends is not None else LEGEND
             f.write(f"Empresa: {emp}\n")
             for pais, items in paises.items():
                 f.write(f"  País: {pais}\n")
                 for imp, est in items:
-                    desc = LEGEND.get(est,"")
+                    desc = legend.get(est,"")
                     line = f"    • {imp}: {est}"
                     if desc: line += f" — {desc}"
                     f.write(line+"\n")
             f.write("\n")
-    print(f"Generado: {path}")
+    if not append:
+        print(f"Generado: {path}")
+
+def stream_reports(regs, company=None, dates=None, legends=None):
+    """Escribe los informes empresa a empresa según llegan los registros.
+
+    Solo se retiene una empresa en memoria, como CalendarMatrix: las fechas
+    con informe son sus columnas con algún estado y cada informe, un corte
+    por columna. El informe de cada fecha se crea con la primera empresa que
+    tiene registros ese día y las siguientes se añaden al final. Devuelve las
+    fechas con informe.
+    """
+    wanted = set(dates) if dates is not None else None
+    written = set()
+    for empresa, batch in groupby(regs, key=itemgetter("empresa")):
+        m = CalendarMatrix.from_records(empresa, batch)
+        for dt in m.active_dates():
+            if wanted is not None and dt not in wanted:
+                continue
+            regs_dt = [Registro(empresa, pais, imp, dt, estado) for pais, imp, estado in m.on(dt)]
+            write_report(regs_dt, dt, company, append=dt in written, legends=legends)
+            written.add(dt)
+    return written
 
 def main():
     args = parse_args()
     os.makedirs(OUT_DIR, exist_ok=True)
+    tracer = Tracer(args.trace) if args.trace is not None else None
+    legends = Legends(EXCEL)
 
     # Montamos la lista de fechas a procesar
     dates = []
@@ -78,33 +127,42 @@ def main():
             dates = [date.fromisoformat(args.date)]
         except:
             print("Fecha inválida:", args.date); sys.exit(1)
-    elif args.range:
-        try:
-            start = date.fromisoformat(args.range[0])
-            end   = date.fromisoformat(args.range[1])
-            if start > end:
-                print("El inicio debe ser ≤ fin."); sys.exit(1)
-            dates = list(daterange(start,end))
-        except:
-            print("Formato de rango inválido."); sys.exit(1)
-    else:  # --all-dates
-        all_regs = parse_calendar(EXCEL)
-        if args.company:
-            all_regs = [r for r in all_regs if r["empresa"].lower()==args.company.lower()]
-        dates = sorted({r["fecha"] for r in all_regs})
+        # Una sola fecha: basta con leer país, impuesto y su columna
+        regs = parse_calendar(EXCEL, target_date=dates[0], company_filter=args.company,
+                              engine=args.engine or "xml", cache=not args.no_cache,
+                              workers=args.workers, tracer=tracer)
+        if regs:
+            write_report(regs, dates[0], args.company, legends=legends)
+            written = {dates[0]}
+        else:
+            written = set()
+    else:
+        if args.range:
+            try:
+                start = date.fromisoformat(args.range[0])
+                end   = date.fromisoformat(args.range[1])
+                if start > end:
+                    print("El inicio debe ser ≤ fin."); sys.exit(1)
+                dates = list(daterange(start,end))
+            except:
+                print("Formato de rango inválido."); sys.exit(1)
+        # Rango o todas las fechas: una única lectura del Excel para todo el
+        # lote, escribiendo cada empresa en cuanto se ha leído su hoja
+        regs = iter_calendar(EXCEL, company_filter=args.company, engine=args.engine or "openpyxl",
+                             cache=not args.no_cache, workers=args.workers, tracer=tracer)
+        written = stream_reports(regs, args.company, dates if args.range else None, legends)
+        if args.all_dates:
+            dates = sorted(written)
+
+    if tracer:
+        print(tracer.report(), file=sys.stderr)
 
     if not dates:
         print("No hay fechas para procesar con esos filtros.")
         return
 
-    # Para cada fecha, extraemos e informamos
     for dt in dates:
-        regs = parse_calendar(EXCEL, target_date=dt)
-        if args.company:
-            regs = [r for r in regs if r["empresa"].lower()==args.company.lower()]
-        if regs:
-            write_report(regs, dt, args.company)
-        else:
+        if dt not in written:
             print(f"No hay registros para {dt.isoformat()}"+(f" y empresa {args.company}" if args.company else ""))
 
 if __name__ == "__main__":
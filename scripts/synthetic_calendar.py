@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import sys, os
+import argparse
+
+# Importar src/
+PROYECTO_ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, PROYECTO_ROOT)
+
+from src.synthetic import CalendarSpec, build_calendar
+
+OUTPUT = os.path.join(PROYECTO_ROOT, "data", "mini_prueba.xlsx")
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Genera un calendario fiscal sintético con la disposición del real"
+    )
+    p.add_argument("output", nargs="?", default=OUTPUT,
+                   help="Libro a escribir (por defecto data/mini_prueba.xlsx).")
+    p.add_argument("-c", "--companies", type=int, default=3, help="Hojas de empresa.")
+    p.add_argument("-r", "--rows", type=int, default=10, help="Filas de país/impuesto por hoja.")
+    p.add_argument("-y", "--years", type=int, default=1, help="Años de calendario.")
+    p.add_argument("--start-year", type=int, default=2025, help="Primer año.")
+    p.add_argument("--density", type=float, default=0.05,
+                   help="Fracción de celdas de fecha con sigla, color o ruido.")
+    p.add_argument("--seed", type=int, default=0, help="Semilla: mismo valor, mismo libro.")
+    return p.parse_args()
+
+def main():
+    args = parse_args()
+    spec = CalendarSpec(companies=args.companies, rows=args.rows, years=args.years,
+                        start_year=args.start_year, density=args.density, seed=args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    build_calendar(args.output, spec)
+    print(f"Generado: {args.output} ({spec.label}, semilla {spec.seed})")
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ from src.reader import parse_calendar
 
 def main():
     path = os.path.join(PROYECTO_ROOT, "tax_calendar_25.xlsm")
-    regs = parse_calendar(path)
+    regs = parse_calendar(path, cache=True)
     print(f"Total registros encontrados: {len(regs)}\n")
     for i, r in enumerate(regs[:10], start=1):
         print(f"{i:02d} | {r['fecha'].isoformat()} | {r['empresa']} | "
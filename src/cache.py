@@ -0,0 +1,164 @@
+"""Caché en disco del calendario parseado, por huella del Excel y de cada hoja.
+
+La huella es tamaño + mtime + hash del contenido, más la versión del parser.
+Si tamaño y mtime coinciden no se vuelve a leer el Excel; si cambian, se
+calcula el hash y solo se reconstruye cuando el contenido es distinto.
+
+Los registros se guardan por hoja, con la huella de su sheetN.xml (CRC32 y
+tamaño del zip) y un hash de lo que toma del resto del libro (sus cadenas
+compartidas y sus estilos). Al reconstruir solo se reparsean las hojas cuya
+huella cambió; las demás se reutilizan tal cual. La leyenda con la que se
+lee cada hoja (src.legend) está en la propia hoja, así que entra en su huella.
+"""
+import hashlib
+import os
+import pickle
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.xlsx import XlsxPackage
+
+# Carpeta de caché: CALENDAR_CACHE_DIR o .calendar_cache junto al Excel
+CACHE_ENV = "CALENDAR_CACHE_DIR"
+CACHE_DIRNAME = ".calendar_cache"
+
+# Partes comunes a todas las hojas: si no cambian, tampoco lo que cada hoja toma de ellas
+SHARED_PARTS = ("xl/workbook.xml", "xl/sharedStrings.xml", "xl/styles.xml", "xl/theme/theme1.xml")
+
+# Referencias de una celda a la tabla de cadenas y a la de estilos
+_STRING_REF = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+_STYLE_REF = re.compile(rb'<c\b[^>]*\bs="(\d+)"')
+
+def cache_path(path_excel: str, cache_dir: Optional[str] = None) -> str:
+    path_excel = os.path.abspath(path_excel)
+    cache_dir = cache_dir or os.environ.get(CACHE_ENV) or os.path.join(
+        os.path.dirname(path_excel), CACHE_DIRNAME)
+    return os.path.join(cache_dir, os.path.basename(path_excel) + ".pkl")
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def fingerprint(path_excel: str) -> dict:
+    st = os.stat(path_excel)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def _read(cpath: str, version: str) -> Optional[dict]:
+    try:
+        with open(cpath, "rb") as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != version or "sheets" not in entry:
+        return None
+    return entry
+
+def records(entry: dict) -> List[Any]:
+    """Registros de todas las hojas, en el orden del libro."""
+    return [r for sheet in entry["order"] for r in entry["sheets"][sheet]["records"]]
+
+def load(path_excel: str, version: str, cache_dir: Optional[str] = None) -> Optional[List[Any]]:
+    """Registros en caché si siguen siendo válidos para el Excel actual, o None."""
+    cpath = cache_path(path_excel, cache_dir)
+    entry = _read(cpath, version)
+    if entry is None:
+        return None
+
+    fp = fingerprint(path_excel)
+    if fp["size"] == entry["size"] and fp["mtime_ns"] == entry["mtime_ns"]:
+        return records(entry)
+    if fp["size"] != entry["size"] or file_hash(path_excel) != entry["sha256"]:
+        return None
+    # Mismo contenido con otro mtime (copia, checkout...): se actualiza la huella
+    entry.update(fp)
+    _write(cpath, entry)
+    return records(entry)
+
+def load_entry(path_excel: str, version: str, cache_dir: Optional[str] = None) -> Optional[dict]:
+    """La entrada guardada aunque el Excel haya cambiado, para reutilizar sus hojas."""
+    return _read(cache_path(path_excel, cache_dir), version)
+
+def snapshot(path_excel: str) -> dict:
+    """Huella completa (con hash), a tomar antes de parsear el Excel."""
+    fp = fingerprint(path_excel)
+    fp["sha256"] = file_hash(path_excel)
+    return fp
+
+# -- huellas por hoja --------------------------------------------------------
+
+def member_key(pkg: XlsxPackage, member: str) -> Tuple[int, int]:
+    """(CRC32, tamaño) del miembro según el directorio del zip, sin descomprimirlo."""
+    info = pkg.zip.getinfo(member)
+    return info.CRC, info.file_size
+
+def shared_parts(pkg: XlsxPackage) -> Dict[str, Tuple[int, int]]:
+    names = set(pkg.zip.namelist())
+    return {m: member_key(pkg, m) for m in SHARED_PARTS if m in names}
+
+def sheet_refs(pkg: XlsxPackage, sheet: str) -> Tuple[List[int], List[int]]:
+    """(índices de cadenas compartidas, índices de estilo) que usan las celdas de la hoja."""
+    data = pkg.sheet_xml(sheet)
+    return (sorted({int(i) for i in _STRING_REF.findall(data)}),
+            sorted({int(i) for i in _STYLE_REF.findall(data)}))
+
+def deps_digest(pkg: XlsxPackage, refs: Tuple[List[int], List[int]]) -> Optional[str]:
+    """Hash de lo que la hoja toma del resto del libro: sus cadenas, el relleno y
+    el formato de fecha de sus estilos, los rellenos de los formatos
+    condicionales, la paleta (tema e indexados) y la época del libro. None si
+    alguna referencia ya no existe."""
+    strings, styles = refs
+    sst, fills, xf_fills, date_styles = pkg.shared_strings, pkg.fills, pkg.xf_fills, pkg.date_styles
+    h = hashlib.sha256(repr((pkg.epoch, pkg.dxf_fills, pkg.palette)).encode())
+    try:
+        for i in strings:
+            h.update(sst[i].encode() + b"\0")
+    except IndexError:
+        return None
+    for i in styles:
+        fill = fills[xf_fills[i]] if i < len(xf_fills) and xf_fills[i] < len(fills) else None
+        h.update(repr((i, fill, date_styles.get(i))).encode())
+    return h.hexdigest()
+
+def sheet_entry(pkg: XlsxPackage, sheet: str, regs: List[Any]) -> dict:
+    refs = sheet_refs(pkg, sheet)
+    return {"key": member_key(pkg, pkg.sheets[sheet]), "refs": refs,
+            "deps": deps_digest(pkg, refs), "records": regs}
+
+def reusable_sheets(pkg: XlsxPackage, sheets: List[str], previous: Optional[dict]) -> Dict[str, dict]:
+    """Entradas de hoja de la caché anterior que siguen valiendo para el libro actual.
+
+    Una hoja vale si su sheetN.xml tiene el mismo CRC32 y tamaño y, cuando las
+    partes comunes cambiaron, si sus cadenas y estilos siguen siendo los mismos.
+    """
+    if not previous:
+        return {}
+    same_parts = previous.get("parts") == shared_parts(pkg)
+    valid = {}
+    for sheet in sheets:
+        old = previous["sheets"].get(sheet)
+        if old is None or old["key"] != member_key(pkg, pkg.sheets[sheet]):
+            continue
+        if same_parts or (old["deps"] is not None and deps_digest(pkg, old["refs"]) == old["deps"]):
+            valid[sheet] = old
+    return valid
+
+def save(path_excel: str, version: str, sheets: Dict[str, dict], order: List[str],
+         parts: Dict[str, Tuple[int, int]], snap: dict, cache_dir: Optional[str] = None):
+    """Guarda las entradas por hoja (ver sheet_entry) con la huella del libro."""
+    entry = {"version": version, "sheets": sheets, "order": order, "parts": parts}
+    entry.update(snap)
+    _write(cache_path(path_excel, cache_dir), entry)
+
+def _write(cpath: str, entry: dict):
+    # Escritura atómica; si la carpeta no es escribible se sigue sin caché
+    try:
+        os.makedirs(os.path.dirname(cpath), exist_ok=True)
+        tmp = f"{cpath}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cpath)
+    except OSError:
+        pass
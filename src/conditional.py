@@ -0,0 +1,425 @@
+"""Evaluación de formatos condicionales (colores que no son relleno de celda).
+
+Cubre las reglas que pintan un relleno a partir del valor de las celdas:
+cellIs (comparaciones y between), expression con fórmulas sencillas
+(referencias, constantes, comparaciones, AND/OR/NOT/ISBLANK) y las de texto
+(containsText, beginsWith, ...). Cada regla se evalúa de una vez sobre todo su
+rango con NumPy; las demás (escalas de color, top10, fórmulas con otras
+funciones...) se ignoran y quedan en CFRules.skipped, igual que las x14 de
+extLst (las que Excel guarda aparte, como las de iconos o barras con
+opciones nuevas), que no se evalúan.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from typing import Container, List, Optional, Sequence, Tuple
+
+import numpy as np
+from openpyxl.utils.datetime import to_excel
+
+from src.xlsx import T_X14_CF, T_X14_CFRULE, T_XM_SQREF, _tag, column_index
+
+T_CFRULE, T_FORMULA = _tag("cfRule"), _tag("formula")
+
+# Rango A1:B2 → (fila1, col1, fila2, col2)
+Block = Tuple[int, int, int, int]
+
+# Última fila y columna de una hoja: los rangos de columnas o filas enteras
+# llegan hasta ellas y se recortan a lo que hay al evaluar (CFRules.winners)
+MAX_ROW, MAX_COL = 1048576, 16384
+
+_REF_RE = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+_COL_RE = re.compile(r"^\$?([A-Za-z]{1,3})$")
+_ROW_RE = re.compile(r"^\$?(\d+)$")
+
+def _corner(ref: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """(fila, columna) de un extremo de rango; None en la que deja abierta
+    ('C' o '6'), o None del todo si no es un extremo válido."""
+    m = _REF_RE.match(ref)
+    if m:
+        return int(m.group(2)), column_index(m.group(1))
+    m = _COL_RE.match(ref)
+    if m:
+        return None, column_index(m.group(1))
+    m = _ROW_RE.match(ref)
+    return (int(m.group(1)), None) if m else None
+
+def parse_sqref(sqref: str) -> List[Block]:
+    """Bloques de un sqref: celdas y rangos ('C6:AG8'), columnas enteras
+    ('C:BK', '$C:$NZ') y filas enteras ('6:8'). Lo que no se entiende se omite."""
+    blocks = []
+    for part in sqref.split():
+        a, sep, b = part.partition(":")
+        ca, cb = _corner(a), _corner(b or a)
+        if ca is None or cb is None or (None in ca and not sep):
+            continue
+        if (ca[0] is None) != (cb[0] is None) or (ca[1] is None) != (cb[1] is None):
+            continue
+        r1, r2 = (1, MAX_ROW) if ca[0] is None else sorted((ca[0], cb[0]))
+        c1, c2 = (1, MAX_COL) if ca[1] is None else sorted((ca[1], cb[1]))
+        blocks.append((r1, c1, r2, c2))
+    return blocks
+
+class Unsupported(ValueError):
+    """Regla o fórmula fuera de lo que se sabe evaluar."""
+
+# -- fórmulas ----------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+      (?P<str>"(?:[^"]|"")*")
+    | (?P<ref>\$?[A-Za-z]{1,3}\$?\d+)(?![\w(])
+    | (?P<num>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+    | (?P<name>[A-Za-z_][\w.]*)
+    | (?P<op><>|<=|>=|[=<>(),&-])
+    )""", re.X)
+
+def _tokens(formula: str) -> List[Tuple[str, str]]:
+    out, pos = [], 0
+    formula = formula.strip()
+    while pos < len(formula):
+        m = _TOKEN_RE.match(formula, pos)
+        if not m or m.end() == pos:
+            raise Unsupported(f"fórmula no soportada: {formula!r}")
+        out.append((m.lastgroup, m.group(m.lastgroup)))
+        pos = m.end()
+    return out
+
+@dataclass
+class Ref:
+    row: int
+    col: int
+    row_abs: bool
+    col_abs: bool
+
+def _parse_ref(text: str) -> Ref:
+    m = re.match(r"^(\$?)([A-Za-z]{1,3})(\$?)(\d+)$", text)
+    return Ref(int(m.group(4)), column_index(m.group(2)), bool(m.group(3)), bool(m.group(1)))
+
+_FUNCS = {"AND", "OR", "NOT", "ISBLANK"}
+_COMPARE = {"=", "<>", "<", ">", "<=", ">="}
+
+def parse_formula(formula: str):
+    """Árbol de la fórmula: ('const', v) | ('ref', Ref) | ('cmp', op, a, b) |
+    ('neg', a) | ('call', NOMBRE, [args])."""
+    toks = _tokens(formula)
+    pos = 0
+
+    def peek():
+        return toks[pos] if pos < len(toks) else (None, None)
+
+    def take(value=None):
+        nonlocal pos
+        tok = peek()
+        if tok[0] is None or (value is not None and tok[1] != value):
+            raise Unsupported(f"fórmula no soportada: {formula!r}")
+        pos += 1
+        return tok
+
+    def comparison():
+        left = unary()
+        if peek()[1] in _COMPARE:
+            op = take()[1]
+            return ("cmp", op, left, unary())
+        return left
+
+    def unary():
+        if peek()[1] == "-":
+            take()
+            return ("neg", unary())
+        return primary()
+
+    def primary():
+        kind, text = take()
+        if kind == "num":
+            return ("const", float(text))
+        if kind == "str":
+            return ("const", text[1:-1].replace('""', '"'))
+        if kind == "ref":
+            return ("ref", _parse_ref(text))
+        if kind == "name":
+            name = text.upper()
+            if name in ("TRUE", "FALSE") and peek()[1] != "(":
+                return ("const", name == "TRUE")
+            if name not in _FUNCS:
+                raise Unsupported(f"función no soportada: {text}")
+            take("(")
+            args = []
+            if peek()[1] != ")":
+                args.append(comparison())
+                while peek()[1] == ",":
+                    take()
+                    args.append(comparison())
+            take(")")
+            return ("call", name, args)
+        if text == "(":
+            inner = comparison()
+            take(")")
+            return inner
+        raise Unsupported(f"fórmula no soportada: {formula!r}")
+
+    tree = comparison()
+    if pos != len(toks):
+        raise Unsupported(f"fórmula no soportada: {formula!r}")
+    return tree
+
+# -- valores -----------------------------------------------------------------
+
+@dataclass
+class Values:
+    """Valores de un bloque de celdas como en las comparaciones de Excel:
+    número (vacías = 0), texto en minúsculas (vacías = ""), y máscaras."""
+    num: np.ndarray
+    txt: np.ndarray
+    is_text: np.ndarray
+    blank: np.ndarray
+
+    @classmethod
+    def const(cls, value) -> "Values":
+        if isinstance(value, str):
+            return cls(np.float64(0), np.array(value.lower(), dtype=object),
+                       np.bool_(True), np.bool_(False))
+        return cls(np.float64(float(value)), np.array("", dtype=object),
+                   np.bool_(False), np.bool_(False))
+
+def _cell_value(v):
+    """(número, texto, es_texto) de un valor de celda."""
+    if v is None:
+        return 0.0, "", False
+    if isinstance(v, bool):
+        return float(v), "", False
+    if isinstance(v, (int, float)):
+        return float(v), "", False
+    if isinstance(v, (datetime, date, time)):
+        return float(to_excel(v)), "", False
+    return 0.0, str(v).lower(), True
+
+class Grid:
+    """Valores de la hoja (filas 1..n, columnas 1..m) listos para evaluar reglas."""
+
+    def __init__(self, rows: Sequence[Sequence]):
+        nrows = len(rows)
+        ncols = max((len(r) for r in rows), default=0)
+        self.shape = (nrows, ncols)
+        self.num = np.zeros(self.shape)
+        self.txt = np.full(self.shape, "", dtype=object)
+        self.is_text = np.zeros(self.shape, dtype=bool)
+        self.blank = np.ones(self.shape, dtype=bool)
+        for i, row in enumerate(rows):
+            for j, v in enumerate(row):
+                if v is None:
+                    continue
+                self.blank[i, j] = False
+                self.num[i, j], self.txt[i, j], self.is_text[i, j] = _cell_value(v)
+
+    def take(self, rows: np.ndarray, cols: np.ndarray) -> Values:
+        """Valores en las filas × columnas dadas (1-based); fuera de la hoja, vacías."""
+        nrows, ncols = self.shape
+        ri, ci = rows - 1, cols - 1
+        inside = ((ri >= 0) & (ri < nrows))[:, None] & ((ci >= 0) & (ci < ncols))[None, :]
+        if not nrows or not ncols:
+            empty = np.zeros(inside.shape)
+            return Values(empty, np.full(inside.shape, "", dtype=object),
+                          empty.astype(bool), ~empty.astype(bool))
+        ix = np.ix_(np.clip(ri, 0, nrows - 1), np.clip(ci, 0, ncols - 1))
+        return Values(np.where(inside, self.num[ix], 0.0),
+                      np.where(inside, self.txt[ix], ""),
+                      inside & self.is_text[ix],
+                      ~inside | self.blank[ix])
+
+_OPS = {
+    "=": np.equal, "<>": np.not_equal, "<": np.less,
+    ">": np.greater, "<=": np.less_equal, ">=": np.greater_equal,
+}
+
+def compare(op: str, a: Values, b: Values) -> np.ndarray:
+    """Comparación de Excel: sin distinguir mayúsculas, el texto es mayor que
+    cualquier número y una celda vacía vale "" frente a texto y 0 frente a números."""
+    fn = _OPS[op]
+    ta = a.is_text | (a.blank & b.is_text)
+    tb = b.is_text | (b.blank & a.is_text)
+    as_text = np.asarray(fn(a.txt, b.txt), dtype=bool)
+    as_num = fn(a.num, b.num)
+    mixed = fn(ta.astype(np.int8), tb.astype(np.int8))
+    return np.where(ta & tb, as_text, np.where(~ta & ~tb, as_num, mixed))
+
+def _truth(v) -> np.ndarray:
+    if isinstance(v, Values):
+        return ~v.is_text & (v.num != 0)
+    return v
+
+# -- reglas ------------------------------------------------------------------
+
+_CELLIS = {
+    "equal": "=", "notEqual": "<>", "greaterThan": ">", "lessThan": "<",
+    "greaterThanOrEqual": ">=", "lessThanOrEqual": "<=",
+}
+_TEXT_RULES = {"containsText", "notContainsText", "beginsWith", "endsWith",
+               "containsBlanks", "notContainsBlanks"}
+
+@dataclass
+class CFRule:
+    blocks: List[Block]
+    kind: str
+    dxf: Optional[int]
+    priority: int
+    stop: bool = False
+    operator: Optional[str] = None
+    formulas: list = field(default_factory=list)
+    text: str = ""
+
+    @property
+    def anchor(self) -> Tuple[int, int]:
+        """Celda respecto a la que se desplazan las referencias relativas."""
+        r1, c1, _, _ = self.blocks[0]
+        return r1, c1
+
+    def evaluate(self, grid: Grid, block: Block) -> np.ndarray:
+        """Máscara (filas × columnas del bloque) de celdas en las que se cumple."""
+        r1, c1, r2, c2 = block
+        rows, cols = np.arange(r1, r2 + 1), np.arange(c1, c2 + 1)
+        ar, ac = self.anchor
+
+        def value(node):
+            kind = node[0]
+            if kind == "const":
+                return Values.const(node[1])
+            if kind == "ref":
+                ref = node[1]
+                rr = np.array([ref.row]) if ref.row_abs else rows - ar + ref.row
+                cc = np.array([ref.col]) if ref.col_abs else cols - ac + ref.col
+                return grid.take(rr, cc)
+            if kind == "neg":
+                v = value(node[1])
+                if not isinstance(v, Values):
+                    v = Values.const(0)
+                return Values(-v.num, v.txt, v.is_text, v.blank)
+            if kind == "cmp":
+                return compare(node[1], as_values(value(node[2])), as_values(value(node[3])))
+            name, args = node[1], node[2]
+            if name == "ISBLANK":
+                v = value(args[0])
+                return v.blank if isinstance(v, Values) else np.bool_(False)
+            truths = [_truth(value(a)) for a in args]
+            if name == "NOT":
+                return ~truths[0]
+            if name == "AND":
+                return np.logical_and.reduce(np.broadcast_arrays(*truths))
+            return np.logical_or.reduce(np.broadcast_arrays(*truths))
+
+        def as_values(v):
+            if isinstance(v, Values):
+                return v
+            return Values(np.asarray(v, dtype=float), np.array("", dtype=object),
+                          np.bool_(False), np.bool_(False))
+
+        shape = (len(rows), len(cols))
+        if self.kind == "expression":
+            result = _truth(value(self.formulas[0]))
+        elif self.kind == "cellIs":
+            cell = grid.take(rows, cols)
+            if self.operator in _CELLIS:
+                result = compare(_CELLIS[self.operator], cell, as_values(value(self.formulas[0])))
+            else:
+                lo, hi = as_values(value(self.formulas[0])), as_values(value(self.formulas[1]))
+                inside = ((compare(">=", cell, lo) & compare("<=", cell, hi))
+                          | (compare(">=", cell, hi) & compare("<=", cell, lo)))
+                result = inside if self.operator == "between" else ~inside
+        else:
+            cell = grid.take(rows, cols)
+            if self.kind in ("containsBlanks", "notContainsBlanks"):
+                empty = cell.blank | (cell.is_text & (cell.txt == ""))
+                result = empty if self.kind == "containsBlanks" else ~empty
+            else:
+                text = self.text.lower()
+                match = {"containsText": lambda s: text in s, "notContainsText": lambda s: text not in s,
+                         "beginsWith": lambda s: s.startswith(text),
+                         "endsWith": lambda s: s.endswith(text)}[self.kind]
+                # Solo se busca en celdas de texto (y vacías)
+                shown = np.where(cell.is_text, cell.txt, "")
+                found = np.vectorize(match, otypes=[bool])(shown)
+                result = np.where(cell.is_text | cell.blank, found, self.kind == "notContainsText")
+        return np.broadcast_to(np.asarray(result, dtype=bool), shape)
+
+def _rule(elem, blocks: List[Block]) -> CFRule:
+    kind = elem.get("type")
+    dxf = elem.get("dxfId")
+    rule = CFRule(blocks=blocks, kind=kind, dxf=int(dxf) if dxf is not None else None,
+                  priority=int(elem.get("priority", 0)),
+                  stop=elem.get("stopIfTrue") in ("1", "true"),
+                  operator=elem.get("operator"), text=elem.get("text", ""))
+    formulas = [f.text or "" for f in elem.iter(T_FORMULA)]
+    if kind == "expression":
+        if not formulas:
+            raise Unsupported("expression sin fórmula")
+        rule.formulas = [parse_formula(formulas[0])]
+    elif kind == "cellIs":
+        needed = 2 if rule.operator in ("between", "notBetween") else 1
+        if (needed == 1 and rule.operator not in _CELLIS) or len(formulas) < needed:
+            raise Unsupported(f"cellIs {rule.operator}")
+        rule.formulas = [parse_formula(f) for f in formulas[:needed]]
+    elif kind not in _TEXT_RULES:
+        raise Unsupported(f"regla {kind}")
+    return rule
+
+@dataclass
+class CFRules:
+    rules: List[CFRule]
+    skipped: List[str] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    @property
+    def max_col(self) -> int:
+        return max((b[3] for r in self.rules for b in r.blocks), default=0)
+
+    def winners(self, grid: Grid, fills: Container[int]) -> np.ndarray:
+        """dxf cuyo relleno se ve en cada celda de la rejilla, o -1 si ninguno.
+
+        Las reglas se aplican por prioridad: la primera que se cumple y trae
+        relleno decide la celda; stopIfTrue corta también las que no lo traen.
+        """
+        won = np.full(grid.shape, -1, dtype=np.int32)
+        decided = np.zeros(grid.shape, dtype=bool)
+        nrows, ncols = grid.shape
+        for rule in sorted(self.rules, key=lambda r: r.priority):
+            paints = rule.dxf is not None and rule.dxf in fills
+            if not (paints or rule.stop):
+                continue
+            for r1, c1, r2, c2 in rule.blocks:
+                r2, c2 = min(r2, nrows), min(c2, ncols)
+                if r1 > r2 or c1 > c2:
+                    continue
+                block = (r1, c1, r2, c2)
+                hit = rule.evaluate(grid, block) & ~decided[r1 - 1:r2, c1 - 1:c2]
+                if paints:
+                    won[r1 - 1:r2, c1 - 1:c2][hit] = rule.dxf
+                decided[r1 - 1:r2, c1 - 1:c2] |= hit
+        return won
+
+def load_rules(elements) -> CFRules:
+    """Reglas de los <conditionalFormatting> de una hoja (ver XlsxPackage.conditional_formats).
+
+    Las x14 y las de rangos que no se entienden van a skipped, para que la
+    traza diga qué colores no se han podido ver.
+    """
+    rules, skipped = [], []
+    for cf in elements:
+        if cf.tag == T_X14_CF:
+            sqref = cf.findtext(T_XM_SQREF) or ""
+            skipped.extend(f"{sqref}: regla x14 {elem.get('type')} (extLst)"
+                           for elem in cf.iter(T_X14_CFRULE))
+            continue
+        sqref = cf.get("sqref", "")
+        blocks = parse_sqref(sqref)
+        if len(blocks) < len(sqref.split()):
+            skipped.append(f"{sqref}: rango no soportado")
+        if not blocks:
+            continue
+        for elem in cf.iter(T_CFRULE):
+            try:
+                rules.append(_rule(elem, blocks))
+            except Unsupported as e:
+                skipped.append(f"{cf.get('sqref')}: {e}")
+    return CFRules(rules, skipped)
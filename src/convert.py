@@ -0,0 +1,397 @@
+"""Conversión de colores a siglas parcheando el zip del libro, sin openpyxl.
+
+Cada hoja se procesa sola: se reescriben únicamente los <c> de la rejilla de
+fechas (reader.date_grid: ni cabeceras, ni país e impuesto, ni la leyenda)
+cuyo estilo tiene un relleno sólido (la sigla del color como texto en línea y
+un estilo clon sin relleno) y se quitan los formatos condicionales. Los
+blancos de tema o indexados (palette.is_background) no son SP: solo pierden
+el relleno. styles.xml recibe los
+estilos clon; el resto de miembros del zip (vbaProject.bin incluido) se copia
+tal cual. calcChain.xml se descarta, como al guardar con openpyxl: Excel lo
+regenera. Las celdas maestras de una fórmula compartida o matricial (<f ref=...>)
+no se tocan: sin ellas las celdas que dependen de su si quedarían apuntando a
+nada y Excel daría el libro por dañado. Se cuentan en SheetResult.kept.
+
+Con workers > 1 cada hoja se parchea en un proceso aparte; el proceso
+principal solo ensambla el zip, en el orden original.
+
+La tabla de colores puede ser la misma para todo el libro o una función
+(paquete, hoja) → tabla, para convertir cada hoja con su propia leyenda.
+
+Junto a la salida se deja un manifiesto (<salida>.manifest.json) con el hash
+del libro de entrada y, por hoja, su huella y la de su tabla de colores. Si
+nada cambió no se vuelve a escribir; si solo cambiaron algunas hojas, las
+demás se copian ya convertidas de la salida anterior.
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from html import unescape
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from lxml import etree
+
+from src.cache import file_hash, member_key, shared_parts, sheet_refs
+from src.palette import DEFAULT_PALETTE, Palette, is_background
+from src.reader import date_grid
+from src.xlsx import XlsxPackage, _tag, column_index
+
+# Celda completa (<c .../> o <c ...>...</c>) y sus atributos
+_CELL_RE = re.compile(rb'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_S_RE = re.compile(rb'\ss="(\d+)"')
+_REF_RE = re.compile(rb'\sr="([A-Z]+)(\d+)"')
+_T_RE = re.compile(rb'\st="(\w+)"')
+_DROP_ATTRS_RE = re.compile(rb'\s(?:t|cm|vm)="[^"]*"')
+_V_RE = re.compile(rb'<v>(.*?)</v>', re.S)
+_IS_T_RE = re.compile(rb'<t\b[^>]*>(.*?)</t>', re.S)
+# <f> maestra de fórmula compartida (t="shared") o matricial (t="array")
+_F_MASTER_RE = re.compile(rb'<f\b[^>]*\sref="')
+
+# Formatos condicionales: los normales y los x14 de extLst
+_CF_RE = re.compile(rb'<conditionalFormatting\b.*?</conditionalFormatting>', re.S)
+_X14_CF_RE = re.compile(rb'<ext\b[^>]*\{78C0D931-6437-407d-A8EE-F0AAD7539E65\}[^>]*>.*?</ext>', re.S)
+_EMPTY_EXTLST_RE = re.compile(rb'<extLst>\s*</extLst>')
+
+CALC_CHAIN = "xl/calcChain.xml"
+_CALC_CHAIN_REL_RE = re.compile(rb'<Relationship\b[^>]*Target="[^"]*calcChain\.xml"[^>]*/>')
+_CALC_CHAIN_CT_RE = re.compile(rb'<Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>')
+
+# Cambia si cambia lo que patch_sheet/patch_styles escriben
+MANIFEST_VERSION = "4"
+
+# Tabla color (rgb) → sigla, para todo el libro o por hoja
+ColorCode = Union[Dict[str, str], Callable[[XlsxPackage, str], Dict[str, str]]]
+
+@dataclass
+class SheetResult:
+    sheet: str
+    changed: int       # celdas con sigla nueva
+    cleared: int       # rellenos quitados
+    seconds: float
+    reused: bool = False   # copiada de la salida anterior sin volver a convertir
+    kept: int = 0          # celdas con relleno sólido sin convertir: maestras de fórmula
+
+@dataclass
+class SheetCodes:
+    """Lo que la conversión de una hoja toma de su tabla de colores."""
+    codes: Dict[int, Optional[str]]    # estilo sólido → sigla, o None
+    siglas: Set[str]
+    digest: str                        # color_code_digest de la tabla
+
+def solid_colors(styles: etree._Element,
+                 palette: Palette = DEFAULT_PALETTE) -> Dict[int, Optional[str]]:
+    """Estilo (índice de cellXfs) con relleno sólido → rgb de su color (de
+    tema o indexado ya resuelto), o None si es de fondo."""
+    fills = styles.find(_tag("fills"))
+    fills = list(fills) if fills is not None else []
+    xfs = styles.find(_tag("cellXfs"))
+    colors: Dict[int, Optional[str]] = {}
+    for i, xf in enumerate(xfs if xfs is not None else ()):
+        fill_id = int(xf.get("fillId", 0))
+        pattern = fills[fill_id].find(_tag("patternFill")) if fill_id < len(fills) else None
+        if pattern is None or pattern.get("patternType") != "solid":
+            continue
+        fg = pattern.find(_tag("fgColor"))
+        fg = dict(fg.attrib) if fg is not None else {}
+        colors[i] = None if is_background(fg) else palette.rgb(fg)
+    return colors
+
+def sheet_codes(colors: Dict[int, Optional[str]], color_code: Dict[str, str]) -> SheetCodes:
+    """SheetCodes de una hoja con tabla color_code (colors como en solid_colors)."""
+    return SheetCodes({i: color_code.get(rgb) if rgb else None for i, rgb in colors.items()},
+                      set(color_code.values()), color_code_digest(color_code))
+
+def patch_styles(data: bytes,
+                 palette: Palette = DEFAULT_PALETTE) -> Tuple[bytes, Dict[int, int], Dict[int, Optional[str]]]:
+    """styles.xml con un clon sin relleno de cada estilo sólido.
+
+    Devuelve el XML nuevo, estilo original → clon y estilo original → rgb
+    (solid_colors).
+    """
+    root = etree.fromstring(data)
+    colors = solid_colors(root, palette)
+    xfs = root.find(_tag("cellXfs"))
+    remap: Dict[int, int] = {}
+    for i in sorted(colors):
+        clone = copy.deepcopy(xfs[i])
+        clone.set("fillId", "0")
+        clone.attrib.pop("applyFill", None)
+        remap[i] = len(xfs)
+        xfs.append(clone)
+    if remap:
+        xfs.set("count", str(len(xfs)))
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True), remap, colors
+
+def _cell_text(attrs: bytes, body: bytes, shared) -> Optional[str]:
+    """Texto de la celda tal y como lo ve openpyxl sin data_only (None si es
+    número, fórmula u otra cosa que no puede ser una sigla)."""
+    if b"<f" in body:
+        return None
+    t = _T_RE.search(attrs)
+    t = t.group(1) if t else b"n"
+    if t == b"inlineStr":
+        return unescape(b"".join(_IS_T_RE.findall(body)).decode())
+    v = _V_RE.search(body)
+    if v is None:
+        return None
+    if t == b"s":
+        return shared[int(v.group(1))]
+    if t == b"str":
+        return unescape(v.group(1).decode())
+    return None
+
+def _in_grid(attrs: bytes, grid) -> bool:
+    ref = _REF_RE.search(attrs)
+    if ref is None or grid is None:
+        return False
+    first, legend, cols = grid
+    row = int(ref.group(2))
+    return row >= first and (legend is None or row < legend) and \
+        column_index(ref.group(1).decode()) in cols
+
+def patch_sheet(data: bytes, remap: Dict[int, int], codes: Dict[int, Optional[str]],
+                shared, siglas: Set[str], grid) -> Tuple[bytes, int, int, int]:
+    """XML de la hoja con las celdas de relleno sólido de grid (date_grid)
+    convertidas y sin formatos condicionales. Devuelve (xml, celdas con sigla
+    nueva, rellenos quitados, maestras de fórmula que se dejan como estaban)."""
+    changed = cleared = kept = 0
+
+    def cell(m):
+        nonlocal changed, cleared, kept
+        attrs, body = m.group(1), m.group(2) or b""
+        s = _S_RE.search(attrs)
+        if s is None or int(s.group(1)) not in remap or not _in_grid(attrs, grid):
+            return m.group(0)
+        sid = int(s.group(1))
+        text = _cell_text(attrs, body, shared)
+        if text is not None and text.strip().upper() in siglas:
+            return m.group(0)
+        if _F_MASTER_RE.search(body):
+            kept += 1
+            return m.group(0)
+        attrs = _S_RE.sub(b' s="%d"' % remap[sid], attrs, count=1)
+        cleared += 1
+        code = codes[sid]
+        if not code:
+            return b"<c%s>%s</c>" % (attrs, body) if body else b"<c%s/>" % attrs
+        changed += 1
+        attrs = _DROP_ATTRS_RE.sub(b"", attrs)
+        return b'<c%s t="inlineStr"><is><t>%s</t></is></c>' % (attrs, code.encode())
+
+    data = _CELL_RE.sub(cell, data)
+    data = _CF_RE.sub(b"", data)
+    data = _X14_CF_RE.sub(b"", data)
+    data = _EMPTY_EXTLST_RE.sub(b"", data)
+    return data, changed, cleared, kept
+
+def _patch(pkg: XlsxPackage, sheet: str, remap: Dict[int, int], codes: Dict[int, Optional[str]],
+           siglas: Set[str]) -> Tuple[bytes, int, int, int, float]:
+    t0 = time.perf_counter()
+    patched = patch_sheet(pkg.sheet_xml(sheet), remap, codes, pkg.shared_strings, siglas,
+                          date_grid(pkg, sheet))
+    return (*patched, time.perf_counter() - t0)
+
+def _convert_sheet(src: str, sheet: str, remap: Dict[int, int], codes: Dict[int, Optional[str]],
+                   siglas: Set[str]) -> Tuple[bytes, int, int, int, float]:
+    """Tarea de un proceso del pool: abre el libro por su cuenta y devuelve la
+    hoja parcheada con sus contadores y los segundos que tardó."""
+    with XlsxPackage(src) as pkg:
+        return _patch(pkg, sheet, remap, codes, siglas)
+
+def _copy_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    new = zipfile.ZipInfo(info.filename, info.date_time)
+    new.compress_type = info.compress_type
+    new.external_attr = info.external_attr
+    new.create_system = info.create_system
+    new.file_size = info.file_size
+    return new
+
+# -- manifiesto ---------------------------------------------------------------
+
+def manifest_path(dst: str) -> str:
+    return dst + ".manifest.json"
+
+def color_code_digest(color_code: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(color_code, sort_keys=True).encode()).hexdigest()
+
+def load_manifest(dst: str) -> Optional[dict]:
+    """Manifiesto de la salida anterior, o None si falta, es de otra versión o
+    la salida ya no es la que se escribió."""
+    try:
+        with open(manifest_path(dst), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    try:
+        if file_hash(dst) != manifest["output"]:
+            return None
+    except OSError:
+        return None
+    return manifest
+
+def sheet_deps(pkg: XlsxPackage, refs: Tuple[List[int], List[int]],
+               remap: Dict[int, int], codes: Dict[int, Optional[str]]) -> Optional[str]:
+    """Hash de lo que la conversión de la hoja toma del resto del libro: el
+    texto de sus cadenas compartidas y, por cada estilo que usa, su clon y su
+    sigla. None si alguna cadena ya no existe."""
+    strings, styles = refs
+    h = hashlib.sha256()
+    try:
+        for i in strings:
+            h.update(pkg.shared_strings[i].encode() + b"\0")
+    except IndexError:
+        return None
+    h.update(repr([(i, remap.get(i), codes.get(i)) for i in styles]).encode())
+    return h.hexdigest()
+
+def reusable_sheets(pkg: XlsxPackage, sheets: Dict[str, str], manifest: Optional[dict],
+                    remap: Dict[int, int], plan: Dict[str, SheetCodes]) -> Dict[str, dict]:
+    """Hojas (miembro → entrada del manifiesto) cuya versión convertida en la
+    salida anterior sigue valiendo: misma tabla de colores de la hoja, el
+    mismo sheetN.xml (CRC32 y tamaño) y, si cambiaron estilos o cadenas
+    compartidas, los mismos clones, siglas y textos para lo que usa la hoja."""
+    if not manifest:
+        return {}
+    same_parts = manifest["parts"] == {m: list(k) for m, k in shared_parts(pkg).items()}
+    valid = {}
+    for member, name in sheets.items():
+        old = manifest["sheets"].get(name)
+        if not old or old["member"] != member or old["key"] != list(member_key(pkg, member)) \
+                or old["color_code"] != plan[member].digest:
+            continue
+        if same_parts or sheet_deps(pkg, old["refs"], remap, plan[member].codes) == old["deps"]:
+            valid[member] = old
+    return valid
+
+def _write_manifest(dst: str, manifest: dict):
+    # Escritura atómica; sin manifiesto la próxima vez simplemente se convierte todo
+    path = manifest_path(dst)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+# -- conversión ---------------------------------------------------------------
+
+def convert_workbook(
+    src: str,
+    dst: str,
+    color_code: ColorCode,
+    skip: Callable[[str], bool] = lambda sheet: False,
+    workers: Optional[int] = None,
+    reuse: bool = True,
+) -> Iterator[SheetResult]:
+    """Escribe en dst la copia convertida de src y produce un SheetResult
+    según se escribe cada hoja. color_code es la tabla de colores o, si es
+    una función, la da por hoja. Las hojas para las que skip es cierto se
+    copian sin tocar; workers > 1 reparte las hojas entre procesos.
+
+    Con reuse, si el manifiesto de dst dice que ya se convirtió este mismo
+    libro no se escribe nada, y si solo cambiaron algunas hojas las demás se
+    toman de dst.
+    """
+    table = color_code if callable(color_code) else lambda pkg, sheet: color_code
+    input_hash = file_hash(src)
+    manifest = load_manifest(dst) if reuse else None
+
+    with XlsxPackage(src) as pkg:
+        styles, remap, colors = patch_styles(pkg.zip.read("xl/styles.xml"), pkg.palette)
+        sheets = {member: name for name, member in pkg.sheets.items() if not skip(name)}
+        plan = {member: sheet_codes(colors, table(pkg, name)) for member, name in sheets.items()}
+        reused = reusable_sheets(pkg, sheets, manifest, remap, plan)
+
+        if (manifest and manifest["input"] == input_hash and len(reused) == len(sheets)
+                and len(manifest["sheets"]) == len(sheets)):
+            for member, name in sheets.items():
+                old = reused[member]
+                yield SheetResult(name, old["changed"], old["cleared"], 0.0, reused=True,
+                                  kept=old["kept"])
+            return
+
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        results = {}
+        try:
+            for result in _write_converted(pkg, src, tmp, dst, styles, remap, plan,
+                                           sheets, reused, workers):
+                results[result.sheet] = result
+                yield result
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        entries = {}
+        for member, name in sheets.items():
+            refs = sheet_refs(pkg, name)
+            entries[name] = {"member": member, "key": list(member_key(pkg, member)),
+                             "color_code": plan[member].digest, "refs": refs,
+                             "deps": sheet_deps(pkg, refs, remap, plan[member].codes),
+                             "changed": results[name].changed, "cleared": results[name].cleared,
+                             "kept": results[name].kept}
+        parts = {m: list(k) for m, k in shared_parts(pkg).items()}
+
+    os.replace(tmp, dst)
+    _write_manifest(dst, {
+        "version": MANIFEST_VERSION,
+        "input": input_hash,
+        "output": file_hash(dst),
+        "parts": parts,
+        "sheets": entries,
+    })
+
+def _write_converted(pkg, src, tmp, previous, styles, remap, plan, sheets, reused, workers):
+    with zipfile.ZipFile(tmp, "w") as zout:
+        pending = [m for m in sheets if m not in reused]
+        old = zipfile.ZipFile(previous) if reused else None
+
+        pool = None
+        if workers and workers > 1 and len(pending) > 1:
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(pending)))
+            futures = {m: pool.submit(_convert_sheet, src, sheets[m], remap, plan[m].codes,
+                                      plan[m].siglas)
+                       for m in pending}
+            converted = lambda member: futures.pop(member).result()
+        else:
+            converted = lambda member: _patch(pkg, sheets[member], remap, plan[member].codes,
+                                              plan[member].siglas)
+
+        try:
+            for info in pkg.zip.infolist():
+                name = info.filename
+                if name == CALC_CHAIN:
+                    continue
+                if name in reused:
+                    zout.writestr(_copy_info(info), old.read(name))
+                    entry = reused[name]
+                    yield SheetResult(sheets[name], entry["changed"], entry["cleared"], 0.0,
+                                      reused=True, kept=entry["kept"])
+                elif name in sheets:
+                    data, changed, cleared, kept, seconds = converted(name)
+                    zout.writestr(_copy_info(info), data)
+                    yield SheetResult(sheets[name], changed, cleared, seconds, kept=kept)
+                elif name == "xl/styles.xml":
+                    zout.writestr(_copy_info(info), styles)
+                elif name == "xl/_rels/workbook.xml.rels":
+                    zout.writestr(_copy_info(info), _CALC_CHAIN_REL_RE.sub(b"", pkg.zip.read(info)))
+                elif name == "[Content_Types].xml":
+                    zout.writestr(_copy_info(info), _CALC_CHAIN_CT_RE.sub(b"", pkg.zip.read(info)))
+                else:
+                    with pkg.zip.open(info) as fin, zout.open(_copy_info(info), "w") as fout:
+                        shutil.copyfileobj(fin, fout)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if old is not None:
+                old.close()
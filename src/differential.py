@@ -0,0 +1,172 @@
+"""Pruebas diferenciales: cada lector frente al motor de referencia.
+
+Genera libros aleatorios con src.synthetic (tamaño, cabecera, mezcla de
+siglas, colores y ruido distintos en cada caso), los lee con el motor
+openpyxl de parse_calendar y con cada candidato, y compara los registros
+como multiconjuntos: lo que falta y lo que sobra en el candidato. Las fechas
+sueltas se comparan igual, con la consulta de una sola fecha de cada motor.
+
+Un caso de cada dos añade a EMPRESA_OVERRIDES una hoja de empresa que se
+lee con el nombre de otra, para que el renombrado cuente también: los
+renombrados del libro real son de hojas que SKIP_SHEETS ya omite.
+"""
+import contextlib
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src import reader
+from src.matrix import load_matrices
+from src.reader import ENGINES, parse_calendar
+from src.synthetic import CalendarSpec, build_calendar, company_names, months
+
+REFERENCE = "openpyxl"
+
+# Candidato: (ruta, fecha o None) → registros
+Reader = Callable[[str, Optional[date]], list]
+
+def _engine(engine: str, workers: Optional[int] = None) -> Reader:
+    return lambda path, target: parse_calendar(path, target_date=target, engine=engine,
+                                               workers=workers)
+
+def _matrix(path: str, target: Optional[date]) -> list:
+    regs = [r for m in load_matrices(path, engine="xml").values() for r in m.records()]
+    return regs if target is None else [r for r in regs if r["fecha"] == target]
+
+CANDIDATES: Dict[str, Reader] = {
+    **{e: _engine(e) for e in ENGINES if e != REFERENCE},
+    "xml-workers": _engine("xml", workers=2),
+    "matrix": _matrix,
+}
+
+@dataclass
+class Mismatch:
+    """Diferencia de un candidato con la referencia en una consulta."""
+    candidate: str
+    target: Optional[date]
+    missing: List[tuple]        # en la referencia y no en el candidato
+    extra: List[tuple]          # en el candidato y no en la referencia
+
+    def __str__(self):
+        query = self.target.isoformat() if self.target else "todas las fechas"
+        lines = [f"{self.candidate} ({query}): faltan {len(self.missing)}, sobran {len(self.extra)}"]
+        lines += [f"  - {r}" for r in self.missing[:5]]
+        lines += [f"  + {r}" for r in self.extra[:5]]
+        return "\n".join(lines)
+
+@dataclass
+class CaseResult:
+    """Un libro aleatorio: su spec, los registros de la referencia, el tiempo
+    de cada lector (todas las fechas) y las diferencias encontradas."""
+    spec: CalendarSpec
+    overrides: Dict[str, str]
+    records: int
+    seconds: Dict[str, float] = field(default_factory=dict)
+    mismatches: List[Mismatch] = field(default_factory=list)
+
+def diff_records(ref, got) -> Tuple[List[tuple], List[tuple]]:
+    """(faltan, sobran) de got frente a ref, como multiconjuntos de
+    (empresa, pais, impuesto, fecha, estado)."""
+    a = Counter(tuple(r[k] for k in reader.Registro.KEYS) for r in ref)
+    b = Counter(tuple(r[k] for k in reader.Registro.KEYS) for r in got)
+    return sorted((a - b).elements()), sorted((b - a).elements())
+
+def random_spec(rnd: random.Random, max_companies: int = 4, max_rows: int = 30) -> CalendarSpec:
+    month_row = rnd.randint(1, reader.HEADER_ROWS)
+    return CalendarSpec(
+        companies=rnd.randint(1, max_companies),
+        rows=rnd.randint(1, max_rows),
+        years=rnd.choice((1, 1, 2)),
+        start_year=rnd.randint(2024, 2026),
+        start_month=rnd.randint(1, 12),
+        month_row=month_row,
+        day_row=month_row + rnd.randint(1, reader.DAY_ROW_SPAN),
+        first_col=rnd.randint(3, 6),
+        density=rnd.uniform(0.01, 0.3),
+        text_ratio=rnd.random(),
+        noise_ratio=rnd.uniform(0, 0.3),
+        extra_sheets=rnd.random() < 0.8,
+        seed=rnd.randrange(2**31),
+    )
+
+def random_overrides(rnd: random.Random, spec: CalendarSpec) -> Dict[str, str]:
+    """Nada, o una hoja de empresa renombrada (a veces como otra hoja del libro)."""
+    names = company_names(spec.companies)
+    if rnd.random() < 0.5:
+        return {}
+    sheet = rnd.choice(names)
+    return {sheet: rnd.choice([n for n in names if n != sheet] or ["Renamed"])}
+
+@contextlib.contextmanager
+def overrides(extra: Dict[str, str]):
+    """EMPRESA_OVERRIDES con extra añadido mientras dura el bloque."""
+    saved = dict(reader.EMPRESA_OVERRIDES)
+    reader.EMPRESA_OVERRIDES.update(extra)
+    try:
+        yield
+    finally:
+        reader.EMPRESA_OVERRIDES.clear()
+        reader.EMPRESA_OVERRIDES.update(saved)
+
+def _cold():
+    """Sin cachés en memoria: cada lector detecta y lee de cero."""
+    reader._LAYOUTS.clear()
+
+def _timed(fn: Reader, path: str, target: Optional[date]):
+    _cold()
+    t0 = time.perf_counter()
+    regs = fn(path, target)
+    return regs, time.perf_counter() - t0
+
+def sample_dates(rnd: random.Random, spec: CalendarSpec, n: int) -> List[date]:
+    """n fechas del eje del libro y una fuera de él."""
+    (y0, m0), (y1, m1) = months(spec)[0], months(spec)[-1]
+    first = date(y0, m0, 1)
+    last = date(y1 + m1 // 12, m1 % 12 + 1, 1) - timedelta(days=1)
+    dates = [first + timedelta(days=rnd.randint(0, (last - first).days)) for _ in range(n)]
+    return dates + [last + timedelta(days=1)]
+
+def check_case(path: str, spec: CalendarSpec, extra: Dict[str, str], dates: List[date],
+               candidates: Dict[str, Reader] = CANDIDATES) -> CaseResult:
+    """Compara cada candidato con la referencia en el libro path."""
+    with overrides(extra):
+        ref, ref_seconds = _timed(_engine(REFERENCE), path, None)
+        result = CaseResult(spec, extra, len(ref), {REFERENCE: ref_seconds})
+        for name, fn in candidates.items():
+            got, result.seconds[name] = _timed(fn, path, None)
+            missing, extra_regs = diff_records(ref, got)
+            if missing or extra_regs:
+                result.mismatches.append(Mismatch(name, None, missing, extra_regs))
+        for target in dates:
+            ref_day = parse_calendar(path, target_date=target, engine=REFERENCE)
+            # La consulta de una fecha tiene que ser también un corte de la completa
+            for name, got in (("openpyxl-fecha", ref_day),
+                              *((n, fn(path, target)) for n, fn in candidates.items())):
+                missing, extra_regs = diff_records([r for r in ref if r["fecha"] == target], got)
+                if missing or extra_regs:
+                    result.mismatches.append(Mismatch(name, target, missing, extra_regs))
+    return result
+
+def run(cases: int, workdir: str, seed: int = 0, dates: int = 3,
+        candidates: Dict[str, Reader] = CANDIDATES, **spec_limits) -> Iterator[CaseResult]:
+    """cases libros aleatorios (reproducibles con seed), uno tras otro."""
+    rnd = random.Random(seed)
+    for i in range(cases):
+        spec = random_spec(rnd, **spec_limits)
+        extra = random_overrides(rnd, spec)
+        path = os.path.join(workdir, f"case_{i:03d}.xlsx")
+        build_calendar(path, spec)
+        yield check_case(path, spec, extra, sample_dates(rnd, spec, dates), candidates)
+
+def speedups(results: List[CaseResult]) -> Dict[str, Tuple[float, float]]:
+    """Lector → (tiempo total, aceleración frente a la referencia en el total)."""
+    totals: Dict[str, float] = defaultdict(float)
+    for res in results:
+        for name, seconds in res.seconds.items():
+            totals[name] += seconds
+    ref = totals[REFERENCE]
+    return {name: (total, ref / total if total else float("inf")) for name, total in totals.items()}
@@ -0,0 +1,115 @@
+"""Leyenda de estados: color de relleno → sigla y sigla → descripción.
+
+COLOR_CODE y LEGEND son la leyenda del calendario 2025. read_legend añade la
+que trae una hoja en su bloque "Legend" (la fila en la que el lector deja de
+leer datos), y cada hoja se lee con la suya: en cada fila del bloque, la
+sigla, su muestra de color (el relleno de la celda de la sigla o de la de su
+izquierda) y la descripción (el primer texto a su derecha). Las siglas son
+las de Status: una sigla desconocida en el libro se ignora, y una muestra
+blanca o de fondo no da color (es la celda sin pintar, no un estado).
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.palette import is_background
+from src.xlsx import XlsxPackage
+
+# Mapa de color de fondo (hex) a código
+COLOR_CODE = {
+    "#FFFF66": "SI",
+    "#9966FF": "RI",
+    "#FF5050": "SD",
+    "#FF99FF": "AD",
+    "#70AD47": "OS",
+    "#00B0F0": "OP",
+    "#996633": "HS",
+    "#BF8F00": "HL",
+    "#CC9900": "HL",
+}
+
+# Leyenda de códigos
+LEGEND = {
+    "SI": "Send information",
+    "RI": "Review information and doubts (EY Local)",
+    "SD": "Send draft (EY Local)",
+    "AD": "Approve draft",
+    "OS": "Official Submission Deadline",
+    "OP": "Official Payment Deadline",
+    "SP": "Official Submission and Payment (same deadline)",
+    "HS": "Public Holiday Spain",
+    "HL": "Local Holiday – Non-working day"
+}
+
+WHITE = "FFFFFF"
+
+# Filas bajo "Legend" y columnas que se miran para buscar la leyenda
+LEGEND_ROWS = 20
+LEGEND_COLS = 8
+
+def rgb_key(rgb) -> Optional[str]:
+    """'FF00B0F0', '#00b0f0'... → '00B0F0'."""
+    if not rgb:
+        return None
+    return str(rgb)[-6:].upper()
+
+@dataclass(frozen=True)
+class Legend:
+    """Leyenda de un libro, ya compilada: colors va de rgb_key a sigla."""
+    colors: Dict[str, str]
+    descriptions: Dict[str, str]
+
+    def status_of_rgb(self, rgb) -> Optional[str]:
+        return self.colors.get(rgb_key(rgb)) if rgb else None
+
+    def merged(self, colors: Dict[str, str], descriptions: Dict[str, str]) -> "Legend":
+        """Esta leyenda con los colores y descripciones del libro encima."""
+        return Legend({**self.colors, **colors}, {**self.descriptions, **descriptions})
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha256(repr((sorted(self.colors.items()),
+                                    sorted(self.descriptions.items()))).encode()).hexdigest()
+
+DEFAULT_LEGEND = Legend({rgb_key(k): v for k, v in COLOR_CODE.items()}, dict(LEGEND))
+
+def _solid_rgb(pkg: XlsxPackage, style: int) -> Optional[str]:
+    xf_fills, fills = pkg.xf_fills, pkg.fills
+    if style >= len(xf_fills) or xf_fills[style] >= len(fills):
+        return None
+    fill = fills[xf_fills[style]]
+    if fill.get("patternType") != "solid" or is_background(fill["fgColor"]):
+        return None
+    rgb = pkg.palette.rgb(fill["fgColor"])
+    return rgb if rgb != WHITE else None
+
+def _legend_rows(pkg: XlsxPackage, sheet: str) -> List[list]:
+    """Filas (celdas (valor, estilo)) del bloque de leyenda de la hoja, o [].
+
+    La fila "Legend" se busca en el XML sin parsear la hoja (find_row) y solo
+    se parsean las LEGEND_ROWS filas que la siguen.
+    """
+    start = pkg.find_row(sheet, "legend")
+    if start is None:
+        return []
+    return [row for _, row in pkg.iter_rows(sheet, start + 1, start + LEGEND_ROWS, LEGEND_COLS)]
+
+def read_legend(pkg: XlsxPackage, sheet: Optional[str], base: Legend = DEFAULT_LEGEND) -> Legend:
+    """base con lo que diga el bloque de leyenda de la hoja (base si no tiene)."""
+    if sheet is None:
+        return base
+    colors: Dict[str, str] = {}
+    descriptions: Dict[str, str] = {}
+    for row in _legend_rows(pkg, sheet):
+        for i, (value, style) in enumerate(row):
+            code = value.strip().upper() if isinstance(value, str) else None
+            if code not in base.descriptions:
+                continue
+            rgb = _solid_rgb(pkg, style) or (_solid_rgb(pkg, row[i - 1][1]) if i else None)
+            if rgb:
+                colors[rgb] = code
+            desc = next((v.strip() for v, _ in row[i + 1:] if isinstance(v, str) and v.strip()), None)
+            if desc:
+                descriptions[code] = desc
+            break
+    return base.merged(colors, descriptions) if colors or descriptions else base
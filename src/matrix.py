@@ -0,0 +1,131 @@
+"""Representación en columnas del calendario: una matriz de códigos por empresa.
+
+Cada empresa es una rejilla densa (país, impuesto) × día con un código
+Status por celda (uint8, 0 = sin estado). Las consultas por fecha, rango o
+estado son cortes de NumPy en lugar de recorridos de listas de dicts. Las
+filas salen de los registros (ver CalendarMatrix.from_records), no de la
+hoja: una fila de la hoja sin ningún estado no está en la matriz.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.reader import Registro, Status, parse_calendar
+
+# Fecha de la columna 0 de una matriz sin registros (y sin columnas)
+EPOCH = date(1970, 1, 1)
+
+@dataclass
+class CalendarMatrix:
+    empresa: str
+    rows: List[Tuple[str, str]]  # (pais, impuesto) por fila; puede repetirse
+    start: date                  # fecha de la columna 0; el eje es diario y continuo
+    codes: np.ndarray            # uint8, forma (len(rows), días)
+
+    @property
+    def ndays(self) -> int:
+        return self.codes.shape[1]
+
+    @property
+    def dates(self) -> np.ndarray:
+        return np.arange(np.datetime64(self.start, "D"), np.datetime64(self.end, "D") + 1)
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.ndays - 1)
+
+    def column(self, d: date) -> Optional[int]:
+        """Columna de una fecha, o None si cae fuera del eje."""
+        j = (d - self.start).days
+        return j if 0 <= j < self.ndays else None
+
+    def on(self, d: date) -> List[Tuple[str, str, Status]]:
+        """(pais, impuesto, estado) con estado en la fecha d."""
+        j = self.column(d)
+        if j is None:
+            return []
+        col = self.codes[:, j]
+        return [(*self.rows[i], Status(col[i])) for i in np.flatnonzero(col)]
+
+    def active_dates(self) -> List[date]:
+        """Fechas con algún estado, en orden."""
+        return [self.start + timedelta(days=int(j)) for j in np.flatnonzero(self.codes.any(axis=0))]
+
+    def between(self, first: date, last: date) -> "CalendarMatrix":
+        """Submatriz con las columnas de first a last (ambas incluidas)."""
+        a = max((first - self.start).days, 0)
+        b = min((last - self.start).days + 1, self.ndays)
+        b = max(a, b)
+        return CalendarMatrix(self.empresa, self.rows, self.start + timedelta(days=a),
+                              self.codes[:, a:b])
+
+    def where(self, status: Status) -> List[Tuple[str, str, date]]:
+        """(pais, impuesto, fecha) de todas las celdas con ese estado."""
+        ii, jj = np.nonzero(self.codes == status)
+        return [(*self.rows[i], self.start + timedelta(days=int(j))) for i, j in zip(ii, jj)]
+
+    def counts(self) -> Dict[Status, int]:
+        """Número de celdas por estado."""
+        n = np.bincount(self.codes.ravel(), minlength=len(Status))
+        return {s: int(n[s]) for s in Status if s and n[s]}
+
+    def records(self) -> List[Registro]:
+        """Los mismos registros (y en el mismo orden) que parse_calendar."""
+        regs = []
+        for i, j in zip(*np.nonzero(self.codes)):
+            pais, imp = self.rows[i]
+            regs.append(Registro(self.empresa, pais, imp,
+                                 self.start + timedelta(days=int(j)), int(self.codes[i, j])))
+        return regs
+
+    @classmethod
+    def from_records(cls, empresa: str, regs: Iterable[Dict[str, Any]]) -> "CalendarMatrix":
+        """Construye la matriz de una empresa a partir de sus registros.
+
+        Los registros de una fila de la hoja llegan seguidos y en orden de
+        fecha, así que cada tramo consecutivo con el mismo (pais, impuesto) y
+        fechas crecientes es una fila de la matriz; si la fecha no avanza es
+        otra fila con la misma clave (o la misma fila de otra hoja de la
+        empresa, con EMPRESA_OVERRIDES). Los registros no dicen de qué fila de
+        la hoja vienen: filas seguidas con la misma clave cuyas fechas siguen
+        creciendo quedan en una sola y las filas sin estado no aparecen. Nada
+        de eso cambia records(), on() ni where(). Sin registros el eje empieza
+        en EPOCH y no tiene columnas.
+        """
+        rows: List[Tuple[str, str]] = []
+        ri: List[int] = []
+        days: List[int] = []
+        vals: List[int] = []
+        last = None
+        prev = 0
+        for r in regs:
+            key = (r["pais"], r["impuesto"])
+            day = r["fecha"].toordinal()
+            if key != last or day <= prev:
+                rows.append(key)
+                last = key
+            prev = day
+            ri.append(len(rows) - 1)
+            days.append(day)
+            vals.append(Status[r["estado"]])
+        if not days:
+            return cls(empresa, [], EPOCH, np.zeros((0, 0), dtype=np.uint8))
+
+        days_arr = np.asarray(days)
+        first = int(days_arr.min())
+        codes = np.zeros((len(rows), int(days_arr.max()) - first + 1), dtype=np.uint8)
+        codes[np.asarray(ri), days_arr - first] = np.asarray(vals, dtype=np.uint8)
+        return cls(empresa, rows, date.fromordinal(first), codes)
+
+def build_matrices(regs: Iterable[Dict[str, Any]]) -> Dict[str, CalendarMatrix]:
+    """Empresa → CalendarMatrix, en el orden de las hojas."""
+    por_empresa: Dict[str, List[Dict[str, Any]]] = {}
+    for r in regs:
+        por_empresa.setdefault(r["empresa"], []).append(r)
+    return {emp: CalendarMatrix.from_records(emp, rs) for emp, rs in por_empresa.items()}
+
+def load_matrices(path_excel: str, **kwargs) -> Dict[str, CalendarMatrix]:
+    """parse_calendar (todas las fechas) + build_matrices; kwargs van a parse_calendar."""
+    return build_matrices(parse_calendar(path_excel, **kwargs))
@@ -0,0 +1,117 @@
+"""Colores de tema e indexados → RGB, como los pinta Excel.
+
+Un relleno puede guardar su color como rgb, como índice de la paleta
+(indexed, la de openpyxl o la <indexedColors> propia del libro) o como
+color del tema (theme, de xl/theme/theme1.xml) con un tint opcional. Palette
+los deja todos en 'RRGGBB' para que la leyenda los compare por igual.
+"""
+import colorsys
+from typing import List, Optional, Sequence
+
+from lxml import etree
+from openpyxl.styles.colors import COLOR_INDEX
+
+NS_DRAWING = "http://schemas.openxmlformats.org/drawingml/2006/main"
+
+# Orden de <a:clrScheme> y tema por defecto de Office (2013+)
+SCHEME = ("dk1", "lt1", "dk2", "lt2", "accent1", "accent2", "accent3",
+          "accent4", "accent5", "accent6", "hlink", "folHlink")
+DEFAULT_THEME = ("000000", "FFFFFF", "44546A", "E7E6E6", "4472C4", "ED7D31",
+                 "A5A5A5", "FFC000", "5B9BD5", "70AD47", "0563C1", "954F72")
+
+# Colores de fondo: lt1 y lt2 del tema ("Blanco, Fondo 1", theme 0 y 2) y los
+# blancos y el de sistema de la paleta indexada. Pintan celdas corrientes, no
+# un estado: el blanco de SP solo cuenta como rgb
+BACKGROUND_THEME = frozenset((0, 2))
+BACKGROUND_INDEXED = frozenset((1, 9, 64))
+
+def parse_theme(data: bytes) -> List[str]:
+    """Los 12 colores del esquema de theme1.xml, en el orden de SCHEME."""
+    root = etree.fromstring(data)
+    scheme = root.find(f".//{{{NS_DRAWING}}}clrScheme")
+    colors = list(DEFAULT_THEME)
+    if scheme is None:
+        return colors
+    for i, name in enumerate(SCHEME):
+        node = scheme.find(f"{{{NS_DRAWING}}}{name}")
+        if node is None or not len(node):
+            continue
+        value = node[0].get("lastClr") or node[0].get("val")
+        if value and len(value) == 6:
+            colors[i] = value.upper()
+    return colors
+
+def apply_tint(rgb: str, tint: float) -> str:
+    """rgb aclarado (tint > 0) u oscurecido (tint < 0) en HLS, como Excel.
+
+    Excel redondea por el camino en enteros y en algún tono da ±1 por canal
+    respecto a este cálculo; los colores de la leyenda del libro pasan por
+    aquí igual, así que casan entre sí.
+    """
+    r, g, b = (int(rgb[i:i + 2], 16) / 255 for i in (0, 2, 4))
+    h, l, s = colorsys.rgb_to_hls(r, g, b)
+    l = l * (1 + tint) if tint < 0 else l * (1 - tint) + tint
+    r, g, b = colorsys.hls_to_rgb(h, l, s)
+    return "".join(f"{round(c * 255):02X}" for c in (r, g, b))
+
+class Palette:
+    """Tema y paleta indexada de un libro."""
+    __slots__ = ("theme", "indexed")
+
+    def __init__(self, theme: Sequence[str] = DEFAULT_THEME, indexed: Sequence[str] = COLOR_INDEX):
+        self.theme = tuple(theme)
+        self.indexed = tuple(c[-6:].upper() for c in indexed)
+
+    def __eq__(self, other):
+        return isinstance(other, Palette) and (self.theme, self.indexed) == (other.theme, other.indexed)
+
+    def __hash__(self):
+        return hash((self.theme, self.indexed))
+
+    def __repr__(self):
+        return f"Palette(theme={self.theme!r}, indexed={self.indexed!r})"
+
+    def rgb(self, color) -> Optional[str]:
+        """'RRGGBB' de un color: los atributos de un <fgColor>/<bgColor> de
+        styles.xml o un Color de openpyxl. None si es auto o no se resuelve."""
+        if not color:
+            return None
+        if isinstance(color, dict):
+            rgb, theme, indexed = color.get("rgb"), color.get("theme"), color.get("indexed")
+            tint = float(color.get("tint", 0))
+        else:
+            kind = getattr(color, "type", None)
+            rgb = color.rgb if kind == "rgb" else None
+            theme = color.theme if kind == "theme" else None
+            indexed = color.indexed if kind == "indexed" else None
+            tint = getattr(color, "tint", 0) or 0.0
+
+        if rgb:
+            base = str(rgb)[-6:].upper()
+        elif theme is not None:
+            # theme 0/1 y 2/3 son lt1/dk1 y lt2/dk2: el esquema los guarda al revés
+            i = int(theme)
+            i = i ^ 1 if i < 4 else i
+            base = self.theme[i] if i < len(self.theme) else None
+        elif indexed is not None:
+            i = int(indexed)
+            base = self.indexed[i] if i < len(self.indexed) else None
+        else:
+            return None
+        return apply_tint(base, tint) if base and tint else base
+
+DEFAULT_PALETTE = Palette()
+
+def is_background(color) -> bool:
+    """Si el color (como en Palette.rgb) es de tema o indexado de fondo."""
+    if not color:
+        return False
+    if isinstance(color, dict):
+        theme, indexed = color.get("theme"), color.get("indexed")
+    else:
+        kind = getattr(color, "type", None)
+        theme = color.theme if kind == "theme" else None
+        indexed = color.indexed if kind == "indexed" else None
+    if theme is not None:
+        return int(theme) in BACKGROUND_THEME
+    return indexed is not None and int(indexed) in BACKGROUND_INDEXED
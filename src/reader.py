@@ -1,7 +1,27 @@
 from openpyxl import load_workbook
-from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.reader.workbook import WorkbookParser
+from openpyxl.styles.stylesheet import apply_stylesheet
+from datetime import date
+from typing import List, Dict, Callable, Iterator, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from operator import attrgetter, itemgetter
+from enum import IntEnum
+from collections.abc import Mapping
+from sys import intern
+import calendar
 import re
+import warnings
+
+import numpy as np
+
+from src import cache as calendar_cache
+from src.conditional import CFRules, Grid, load_rules
+from src.legend import COLOR_CODE, LEGEND, DEFAULT_LEGEND, Legend, read_legend
+from src.palette import DEFAULT_PALETTE, Palette
+from src.trace import Tracer
+from src.xlsx import XlsxPackage
 
 def argb_to_hex(argb) -> Optional[str]:
     if not argb:
@@ -9,140 +29,1046 @@ def argb_to_hex(argb) -> Optional[str]:
     s = str(argb)
     return f"#{s[-6:]}"
 
-# Mapa de color de fondo (hex) a código
-COLOR_CODE = {
-    "#FFFF66": "SI",
-    "#9966FF": "RI",
-    "#FF5050": "SD",
-    "#FF99FF": "AD",
-    "#70AD47": "OS",
-    "#00B0F0": "OP",
-    "#996633": "HS",
-    "#BF8F00": "HL",
-    "#CC9900": "HL",
-}
+class Status(IntEnum):
+    """Códigos de LEGEND como entero pequeño (cabe en un uint8); 0 = sin estado."""
+    NONE = 0
+    SI = 1
+    RI = 2
+    SD = 3
+    AD = 4
+    OS = 5
+    OP = 6
+    SP = 7
+    HS = 8
+    HL = 9
 
-# Leyenda de códigos
-LEGEND = {
-    "SI": "Send information",
-    "RI": "Review information and doubts (EY Local)",
-    "SD": "Send draft (EY Local)",
-    "AD": "Approve draft",
-    "OS": "Official Submission Deadline",
-    "OP": "Official Payment Deadline",
-    "SP": "Official Submission and Payment (same deadline)",
-    "HS": "Public Holiday Spain",
-    "HL": "Local Holiday – Non-working day"
-}
+    @property
+    def description(self) -> str:
+        return LEGEND.get(self.name, "")
+
+_STATUS_NAMES = tuple(s.name for s in Status)
+
+class Registro(Mapping):
+    """Registro compacto del calendario con vista de dict de solo lectura.
+
+    Guarda empresa/pais/impuesto internados y el estado como Status; r["estado"],
+    r.keys(), dict(r) y la comparación con dicts funcionan como antes.
+    """
+    __slots__ = ("empresa", "pais", "impuesto", "fecha", "status")
+    KEYS = ("empresa", "pais", "impuesto", "fecha", "estado")
+
+    def __init__(self, empresa: str, pais: str, impuesto: str, fecha: date, estado):
+        self.empresa = empresa
+        self.pais = pais
+        self.impuesto = impuesto
+        self.fecha = fecha
+        self.status = Status[estado] if isinstance(estado, str) else Status(estado)
+
+    @property
+    def estado(self) -> str:
+        return _STATUS_NAMES[self.status]
+
+    def __getitem__(self, key):
+        if key in self.KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __eq__(self, other):
+        if isinstance(other, Registro):
+            return self._tuple() == other._tuple()
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return hash(self._tuple())
+
+    def __reduce__(self):
+        return Registro, self._tuple()
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def _tuple(self):
+        return (self.empresa, self.pais, self.impuesto, self.fecha, int(self.status))
 
 EMPRESA_OVERRIDES = {
     "France": "Repsol",
     "Netherlands": "Repsol",
 }
 
+# Versión del parser: cambiarla invalida la caché en disco cuando cambia
+# lo que devuelve parse_calendar para un mismo Excel
+PARSER_VERSION = "7"
+
+SKIP_SHEETS = {"SETTINGS", "REPSOL", "France", "Netherlands"}
+
+# Motores de lectura: "openpyxl" (modelo completo, referencia),
+# "readonly" (openpyxl read_only=True, lectura en streaming por filas) y
+# "xml" (zip + lxml.iterparse, sin openpyxl)
+ENGINES = ("openpyxl", "readonly", "xml")
+
+# La fila de mes-año está en las filas 1–6; los datos empiezan en la 6
+HEADER_ROWS = 6
+FIRST_DATA_ROW = 6
+# La fila de números de día está como mucho 7 filas por debajo de la de mes-año
+DAY_ROW_SPAN = 7
+# Margen (filas o columnas) tolerado entre las dimensiones declaradas y los datos
+BLOAT_SLACK = 100
+
+class BloatedSheetWarning(UserWarning):
+    """Las dimensiones de la hoja van mucho más allá de sus datos reales."""
+
+MONTH_HEADER_RE = re.compile(r"^([A-Za-z]+)\s*-\s*(\d{4})$")
+
+# Nombre de mes (mismo locale que strftime("%B")) → número de mes
+MONTHS = {calendar.month_name[i].lower(): i for i in range(1, 13)}
+
+def month_columns(month_headers: Dict[tuple, int]) -> Dict[int, date]:
+    """Columna → fecha para todos los días de todos los meses detectados.
+
+    Cada bloque de mes ocupa una columna por día a partir de su columna base,
+    igual que en la búsqueda de una sola fecha.
+    """
+    date_map: Dict[int, date] = {}
+    for (mes, anio), base in month_headers.items():
+        month = MONTHS.get(mes)
+        if not month:
+            continue
+        for day in range(1, calendar.monthrange(anio, month)[1] + 1):
+            date_map[base + day - 1] = date(anio, month, day)
+    return date_map
+
+
+def day_numbers(cells) -> Optional[Dict[int, int]]:
+    """Columna → día si la fila (pares columna, valor) es la de números de día.
+
+    Mismo criterio que debug_parse: al menos dos números distintos, todos
+    entre 1 y 31.
+    """
+    days = {col: int(v) for col, v in cells
+            if isinstance(v, (int, float)) and not isinstance(v, bool)}
+    if len(set(days.values())) > 1 and all(1 <= d <= 31 for d in days.values()):
+        return days
+    return None
+
+class DateAxis:
+    """Índice columna ↔ fecha de una hoja, construido una vez por hoja.
+
+    Con fila de días, cada columna numerada pertenece al último encabezado de
+    mes a su izquierda, así que los huecos o columnas extra entre meses no
+    desplazan las fechas. Sin fila de días (o en un mes sin números) se asume
+    un bloque contiguo de una columna por día desde el encabezado.
+    """
+    __slots__ = ("dates", "cols")
+
+    def __init__(self, dates: Dict[int, date]):
+        self.dates = dates                # columna → fecha
+        self.cols: Dict[date, int] = {}   # fecha → primera columna con esa fecha
+        for col in sorted(dates, reverse=True):
+            self.cols[dates[col]] = col
+
+    def __reduce__(self):
+        return DateAxis, (self.dates,)
+
+    @classmethod
+    def build(cls, month_headers: Dict[tuple, int], days: Optional[Dict[int, int]] = None) -> "DateAxis":
+        if not days:
+            return cls(month_columns(month_headers))
+        starts = sorted((col, anio, MONTHS[mes])
+                        for (mes, anio), col in month_headers.items() if mes in MONTHS)
+        dates: Dict[int, date] = {}
+        for i, (start, year, month) in enumerate(starts):
+            end = starts[i + 1][0] if i + 1 < len(starts) else None
+            last_day = calendar.monthrange(year, month)[1]
+            block = {c: d for c, d in days.items() if c >= start and (end is None or c < end)}
+            if not block:
+                block = {start + d - 1: d for d in range(1, last_day + 1)
+                         if end is None or start + d - 1 < end}
+            for c, d in block.items():
+                if d <= last_day:
+                    dates[c] = date(year, month, d)
+        return cls(dates)
+
+    def column(self, d: date) -> Optional[int]:
+        return self.cols.get(d)
+
+    def columns(self, target_date: Optional[date] = None) -> Dict[int, date]:
+        """Columnas a leer: la de target_date o, sin fecha, todas las del calendario."""
+        if not target_date:
+            return self.dates
+        col = self.cols.get(target_date)
+        return {col: target_date} if col else {}
+
+    def between(self, first: date, last: date) -> Dict[int, date]:
+        """Columnas de las fechas entre first y last (ambas incluidas)."""
+        return {c: d for d, c in self.cols.items() if first <= d <= last}
+
+class Layout:
+    """Disposición de la cabecera de una hoja: fila de meses, fila de días,
+    última columna de cabecera, mes→columna base y su DateAxis. month_row es
+    None si la hoja no tiene calendario."""
+    __slots__ = ("month_row", "day_row", "header_col", "month_headers", "axis")
+
+    def __init__(self, month_row: Optional[int], day_row: Optional[int] = None, header_col: int = 0,
+                 month_headers: Optional[Dict[tuple, int]] = None, axis: Optional[DateAxis] = None):
+        self.month_row = month_row
+        self.day_row = day_row
+        self.header_col = header_col
+        self.month_headers = month_headers or {}
+        self.axis = axis
+
+# Disposiciones ya detectadas, por firma de la cabecera (ver layout_signature); las
+# hojas de un libro suelen compartir cabecera, así que se detecta una vez
+LAYOUT_CACHE_SIZE = 256
+_LAYOUTS: "OrderedDict[tuple, Layout]" = OrderedDict()
+
+def layout_signature(pkg: XlsxPackage, sheet: str) -> tuple:
+    """Firma de la cabecera de la hoja: el XML de sus filas 1..HEADER_ROWS +
+    DAY_ROW_SPAN y las partes del libro que le dan significado (cadenas
+    compartidas, estilos, época)."""
+    return (pkg.header_signature(sheet, HEADER_ROWS + DAY_ROW_SPAN),
+            tuple(sorted(calendar_cache.shared_parts(pkg).items())))
+
+def detect_layout(open_rows, value_of) -> Layout:
+    """Fila de mes-año en las filas de cabecera, la de días debajo y el
+    DateAxis que forman. open_rows y value_of como en scan_sheet."""
+    month_row = header = days = day_row = None
+    for r, row in open_rows(1, HEADER_ROWS + DAY_ROW_SPAN, None, None):
+        if month_row is None:
+            if r > HEADER_ROWS:
+                break
+            if any(is_month_label(value_of(c)) for c in row):
+                month_row, header = r, row
+            continue
+        if r > month_row + DAY_ROW_SPAN:
+            break
+        days = day_numbers((col, value_of(c)) for col, c in enumerate(row, start=1))
+        if days:
+            day_row = r
+            break
+    if not month_row:
+        return Layout(None)
+
+    month_headers: Dict[tuple, int] = {}
+    header_col = 0
+    for col, c in enumerate(header, start=1):
+        value = value_of(c)
+        if value is not None:
+            header_col = col
+        key = parse_month_header(value)
+        if key:
+            month_headers[key] = col
+    return Layout(month_row, day_row, header_col, month_headers, DateAxis.build(month_headers, days))
+
+def cached_layout(signature: Optional[tuple], open_rows, value_of) -> Tuple[Layout, bool]:
+    """(disposición, si venía de caché): detect_layout solo si la firma es nueva."""
+    layout = _LAYOUTS.get(signature) if signature is not None else None
+    if layout is not None:
+        _LAYOUTS.move_to_end(signature)
+        return layout, True
+    layout = detect_layout(open_rows, value_of)
+    if signature is not None:
+        _LAYOUTS[signature] = layout
+        if len(_LAYOUTS) > LAYOUT_CACHE_SIZE:
+            _LAYOUTS.popitem(last=False)
+    return layout, False
+
+def check_extent(sheet: str, declared: Optional[tuple], extent: tuple,
+                 tracer: Optional[Tracer] = None):
+    """Compara las dimensiones declaradas (filas, columnas) con la extensión real.
+
+    La extensión real es la fila de la leyenda (o la última con país/impuesto)
+    y la última columna de cabecera o de fecha. Avisa con BloatedSheetWarning
+    si las dimensiones la superan en más de BLOAT_SLACK.
+    """
+    if tracer is not None:
+        tracer.note(sheet, f"dimensiones={declared} extension={extent}")
+    if declared and (declared[0] > extent[0] + BLOAT_SLACK or declared[1] > extent[1] + BLOAT_SLACK):
+        warnings.warn(f"{sheet}: dimensiones infladas ({declared[0]} filas x {declared[1]} columnas), "
+                      f"datos hasta la fila {extent[0]} y la columna {extent[1]}",
+                      BloatedSheetWarning, stacklevel=3)
+
+def value_extent(ws) -> tuple:
+    """(última fila con valor en A/B, última columna con valor) de una hoja
+    openpyxl completa, a partir de las celdas que guarda y no de max_row/max_column."""
+    cells = getattr(ws, "_cells", None)
+    if cells is None:
+        # Sin el dict de celdas de openpyxl 3.1: lo mismo con la API pública
+        values = (((r, c), v) for r, row in enumerate(ws.iter_rows(values_only=True), start=1)
+                  for c, v in enumerate(row, start=1))
+    else:
+        values = ((rc, cell.value) for rc, cell in cells.items())
+    last_row = last_col = 0
+    for (r, c), value in values:
+        if value is None:
+            continue
+        if c > last_col:
+            last_col = c
+        if c <= 2 and r > last_row:
+            last_row = r
+    return last_row, last_col
+
+def sheet_empresa(sheet: str, company_filter: Optional[str] = None) -> Optional[str]:
+    """Empresa de una hoja, o None si la hoja se omite o no pasa el filtro."""
+    if sheet in SKIP_SHEETS or sheet.startswith("CALENDAR"):
+        return None
+    empresa = EMPRESA_OVERRIDES.get(sheet, sheet)
+    if company_filter and empresa.lower() != company_filter.lower():
+        return None
+    return empresa
+
+def company_sheets(path_excel: str, company_filter: Optional[str] = None) -> List[str]:
+    """Hojas a leer (con EMPRESA_OVERRIDES y el filtro aplicados), en el orden
+    del libro, resueltas desde workbook.xml sin abrir ninguna hoja."""
+    with XlsxPackage(path_excel) as pkg:
+        return [s for s in pkg.sheetnames if sheet_empresa(s, company_filter)]
+
+def company_legend(path_excel: str, empresa: str) -> Legend:
+    """Leyenda de la hoja de la empresa (src.legend), la misma con la que los
+    motores la clasifican; DEFAULT_LEGEND si no hay tal hoja."""
+    with XlsxPackage(path_excel) as pkg:
+        return read_legend(pkg, next((s for s in pkg.sheetnames if sheet_empresa(s, empresa)), None))
+
+def package_layout(pkg: XlsxPackage, sheet: str) -> Layout:
+    """La disposición que ven los motores en una hoja del paquete abierto."""
+    def open_rows(min_row, max_row, max_col, only):
+        return pkg.iter_rows(sheet, min_row, max_row, max_col, only)
+    return cached_layout(layout_signature(pkg, sheet), open_rows, itemgetter(0))[0]
+
+def sheet_layout(path_excel: str, sheet: str) -> Layout:
+    """La disposición que ven los motores en la hoja (y la caché de cabeceras)."""
+    with XlsxPackage(path_excel) as pkg:
+        return package_layout(pkg, sheet)
+
+def date_grid(pkg: XlsxPackage, sheet: str) -> Optional[Tuple[int, Optional[int], frozenset]]:
+    """Celdas de la hoja que el lector clasifica: (primera fila de datos, fila
+    de la leyenda o None, columnas de fecha). Fuera quedan cabeceras, país e
+    impuesto y la leyenda. None si la hoja no tiene calendario."""
+    layout = package_layout(pkg, sheet)
+    if not layout.month_row or not layout.axis.dates:
+        return None
+    first = max(FIRST_DATA_ROW, (layout.day_row or layout.month_row) + 1)
+    return first, pkg.find_row(sheet, "legend", FIRST_DATA_ROW), frozenset(layout.axis.dates)
+
+# Lo que SheetLoader usa de openpyxl por debajo de load_workbook (3.1, fijado
+# en requirements.txt); si falta algo, se carga el libro entero
+INCREMENTAL_LOAD = hasattr(WorkbookParser, "find_sheets") and all(
+    hasattr(ExcelReader, step)
+    for step in ("read_manifest", "read_strings", "read_workbook", "read_theme", "read_worksheets")
+)
+
+class SheetLoader:
+    """Libro openpyxl (data_only=True) que parsea cada hoja cuando se pide.
+
+    Al abrir se leen una vez las cadenas compartidas, el libro, el tema y los
+    estilos, como en ExcelReader.read salvo assign_names (los nombres
+    definidos locales apuntan a hojas por posición); load(hoja) sigue con
+    read_worksheets solo para esa hoja. Sin INCREMENTAL_LOAD es
+    load_workbook y todas las hojas se parsean al abrir.
+    """
+    def __init__(self, path_excel: str):
+        self.reader = None
+        if not INCREMENTAL_LOAD:
+            self.wb = load_workbook(path_excel, data_only=True)
+            self.sheetnames = self.wb.sheetnames
+            return
+        self.reader = ExcelReader(path_excel, read_only=False, data_only=True)
+        try:
+            self.reader.read_manifest()
+            self.reader.read_strings()
+            self.reader.read_workbook()
+            self.reader.read_theme()
+            apply_stylesheet(self.reader.archive, self.reader.wb)
+        except BaseException:
+            self.reader.archive.close()
+            raise
+        self.wb = self.reader.wb
+        self._find_sheets = self.reader.parser.find_sheets
+        self.sheetnames = [sheet.name for sheet, rel in self._find_sheets()
+                           if rel.target in self.reader.valid_files]
+
+    def load(self, name: str):
+        """La hoja name del libro, parseándola si aún no lo está."""
+        if self.reader is not None and name not in self.wb.sheetnames:
+            parser = self.reader.parser
+            parser.find_sheets = lambda: (
+                (sheet, rel) for sheet, rel in self._find_sheets() if sheet.name == name
+            )
+            try:
+                self.reader.read_worksheets()
+            finally:
+                del parser.find_sheets
+        return self.wb[name]
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.archive.close()
+        self.wb.close()
+
+def is_month_label(val) -> bool:
+    return isinstance(val, str) and "-" in val and re.search(r"\b\d{4}\b", val) is not None
+
+def parse_month_header(val) -> Optional[tuple]:
+    """'June - 2025' → ('june', 2025)."""
+    if isinstance(val, str):
+        m = MONTH_HEADER_RE.match(val.strip())
+        if m:
+            return m.group(1).lower(), int(m.group(2))
+    return None
+
+def status_from_fill(fill, legend: Legend = DEFAULT_LEGEND,
+                     palette: Palette = DEFAULT_PALETTE) -> Optional[str]:
+    """Código de estado para un relleno sólido con color de la leyenda; los
+    colores de tema e indexados se resuelven con la paleta del libro."""
+    if not fill or getattr(fill, "fill_type", None) != "solid":
+        return None
+    return legend.status_of_rgb(palette.rgb(fill.fgColor))
+
+def status_from_xml_fill(fill: dict, legend: Legend = DEFAULT_LEGEND,
+                         palette: Palette = DEFAULT_PALETTE) -> Optional[str]:
+    """Igual que status_from_fill, para un relleno leído de styles.xml."""
+    if fill.get("patternType") != "solid":
+        return None
+    return legend.status_of_rgb(palette.rgb(fill["fgColor"]))
+
+def status_from_dxf_fill(fill: Optional[dict], legend: Legend = DEFAULT_LEGEND,
+                         palette: Palette = DEFAULT_PALETTE) -> Optional[str]:
+    """Igual que status_from_xml_fill, para el relleno de un formato condicional:
+    en los dxf el patrón sólido es el implícito y el color va en bgColor."""
+    if not fill or fill.get("patternType") not in (None, "solid"):
+        return None
+    return legend.status_of_rgb(palette.rgb(fill["bgColor"]) or palette.rgb(fill["fgColor"]))
+
+def conditional_status(rules: CFRules, rows: List[list], dxf_fills: List[Optional[dict]],
+                       tracer: Optional[Tracer] = None, sheet: str = "",
+                       legend: Legend = DEFAULT_LEGEND,
+                       palette: Palette = DEFAULT_PALETTE) -> Dict[tuple, Optional[str]]:
+    """(fila, columna) → estado de las celdas cuyo relleno decide un formato condicional.
+
+    rows son los valores de la hoja desde la fila 1. Una celda en el dict tiene
+    el relleno del formato (aunque su color no sea de ningún estado) y no el suyo.
+    """
+    if tracer is not None:
+        tracer.note(sheet, f"formatos condicionales: {len(rules.rules)} reglas"
+                           + (f", ignoradas: {'; '.join(rules.skipped)}" if rules.skipped else ""))
+    if not rules:
+        return {}
+    dxf_status = [status_from_dxf_fill(f, legend, palette) for f in dxf_fills]
+    won = rules.winners(Grid(rows), {i for i, f in enumerate(dxf_fills) if f is not None})
+    return {(int(i) + 1, int(j) + 1): dxf_status[won[i, j]] for i, j in zip(*np.nonzero(won >= 0))}
+
+def fill_status_table(fills, resolve=None, legend: Legend = DEFAULT_LEGEND,
+                      palette: Palette = DEFAULT_PALETTE) -> List[Optional[str]]:
+    """Estado de cada relleno del libro según su leyenda y su paleta, resuelto
+    una sola vez al cargarlo.
+
+    Los libros tienen muy pocos rellenos distintos: con esta tabla, clasificar
+    una celda por color es una consulta por índice de relleno (o de estilo).
+    """
+    resolve = resolve or status_from_fill
+    return [resolve(fill, legend, palette) for fill in fills]
+
+def legend_tables(build: Callable[[Legend], list]) -> Callable[[Legend], list]:
+    """build(legend) memorizado por leyenda: las hojas del libro suelen traer
+    la misma y su tabla de estados se hace una sola vez."""
+    tables: Dict[str, list] = {}
+
+    def table(legend: Legend) -> list:
+        key = legend.digest
+        if key not in tables:
+            tables[key] = build(legend)
+        return tables[key]
+    return table
+
+def status_from_text(val) -> Optional[str]:
+    if isinstance(val, str) and val.strip().upper() in LEGEND:
+        return val.strip().upper()
+    return None
+
 def parse_calendar(
     path_excel: str,
     target_date: Optional[date] = None,
-    company_filter: Optional[str] = None
-) -> List[Dict[str, Any]]:
-    wb = load_workbook(path_excel, data_only=True)
-    registros: List[Dict[str, Any]] = []
-
-    SKIP_SHEETS = {"SETTINGS", "REPSOL", "France", "Netherlands"}
-    for sheet in wb.sheetnames:
-        if sheet in SKIP_SHEETS or sheet.startswith("CALENDAR"):
-            continue
+    company_filter: Optional[str] = None,
+    engine: str = "openpyxl",
+    cache: bool = False,
+    workers: Optional[int] = None,
+    tracer: Optional[Tracer] = None
+) -> List[Registro]:
+    """Registros {empresa, pais, impuesto, fecha, estado} del calendario.
+
+    Sin target_date devuelve todas las fechas. engine elige el motor de
+    lectura (ver ENGINES); cache=True sirve la consulta desde la caché en
+    disco; workers > 1 reparte las hojas entre varios procesos; un Tracer
+    (src.trace) recoge tiempos por hoja y fase.
+    """
+    return list(iter_calendar(path_excel, target_date, company_filter,
+                              engine=engine, cache=cache, workers=workers, tracer=tracer))
+
+def iter_calendar(
+    path_excel: str,
+    target_date: Optional[date] = None,
+    company_filter: Optional[str] = None,
+    engine: str = "openpyxl",
+    cache: bool = False,
+    workers: Optional[int] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Registro]:
+    """Como parse_calendar, pero produce los registros hoja a hoja y fila a fila.
+
+    Los consumidores pueden escribir la salida de una empresa antes de que se
+    lea la siguiente hoja, con memoria acotada a lo que retengan ellos.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Motor desconocido: {engine!r} (opciones: {', '.join(ENGINES)})")
+    if cache:
+        return _iter_cached(path_excel, target_date, company_filter, engine, workers, tracer)
+    if workers and workers > 1:
+        return _iter_parallel(path_excel, target_date, company_filter, engine, workers, tracer)
+    return _engine(engine)(path_excel, target_date, company_filter, None, tracer)
+
+def _engine(engine: str):
+    return {
+        "openpyxl": _iter_openpyxl,
+        "readonly": _iter_readonly,
+        "xml": _iter_xml,
+    }[engine]
+
+def _sheet_engine(engine: str):
+    """Como _engine, pero produce (hoja, registros de la hoja) por cada hoja
+    elegida, con o sin registros; los de una hoja se consumen antes de pasar
+    a la siguiente."""
+    return {
+        "openpyxl": _sheets_openpyxl,
+        "readonly": _sheets_readonly,
+        "xml": _sheets_xml,
+    }[engine]
+
+def _flatten(by_sheet: Iterator[Tuple[str, Iterator[Registro]]]) -> Iterator[Registro]:
+    for _, regs in by_sheet:
+        yield from regs
+
+def _init_worker(overrides: Dict[str, str], skip: set):
+    """Arranque de cada proceso del pool: EMPRESA_OVERRIDES y SKIP_SHEETS como
+    estén en el proceso principal, que con spawn o forkserver no se heredan."""
+    EMPRESA_OVERRIDES.clear()
+    EMPRESA_OVERRIDES.update(overrides)
+    SKIP_SHEETS.clear()
+    SKIP_SHEETS.update(skip)
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(dict(EMPRESA_OVERRIDES), set(SKIP_SHEETS)))
+
+def _parse_chunk(engine, path_excel, target_date, company_filter, sheets, tracer=None):
+    """Tarea de un proceso del pool: las hojas de un bloque, ya en lista, y su
+    Tracer para fusionarlo en el del proceso principal."""
+    regs = list(_engine(engine)(path_excel, target_date, company_filter, sheets, tracer))
+    return regs, tracer
+
+def _iter_parallel(
+    path_excel: str,
+    target_date: Optional[date],
+    company_filter: Optional[str],
+    engine: str,
+    workers: int,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Registro]:
+    """Reparte las hojas en bloques contiguos entre procesos; cada proceso lee
+    solo sus hojas y los bloques se devuelven en el orden del libro, cada uno
+    en cuanto termina (y todos los anteriores han terminado)."""
+    sheets = company_sheets(path_excel, company_filter)
+    n = min(workers, len(sheets))
+    if n < 2:
+        yield from _engine(engine)(path_excel, target_date, company_filter, None, tracer)
+        return
+
+    size = -(-len(sheets) // n)
+    chunks = [sheets[i:i + size] for i in range(0, len(sheets), size)]
+    with _pool(len(chunks)) as pool:
+        futures = [pool.submit(_parse_chunk, engine, path_excel, target_date, company_filter,
+                               chunk, tracer.child() if tracer else None)
+                   for chunk in chunks]
+        for fut in futures:
+            regs, sub_tracer = fut.result()
+            if tracer:
+                tracer.merge(sub_tracer)
+            yield from regs
 
+def _iter_cached(
+    path_excel: str,
+    target_date: Optional[date],
+    company_filter: Optional[str],
+    engine: str,
+    workers: Optional[int] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Registro]:
+    """Calendario completo desde la caché en disco (se reconstruye si el Excel
+    cambió) y filtrado en memoria por fecha y empresa.
 
-        empresa = EMPRESA_OVERRIDES.get(sheet, sheet)
-        if company_filter and empresa.lower() != company_filter.lower():
+    Una consulta filtrada (una fecha o una empresa) con la caché desfasada no
+    la reconstruye: lee con el motor solo lo que pide (las columnas de esa
+    fecha, las hojas de esa empresa), como sin caché, y la caché se rehace en
+    la próxima lectura completa.
+    """
+    registros = calendar_cache.load(path_excel, PARSER_VERSION)
+    if registros is None and (target_date or company_filter):
+        if tracer:
+            tracer.note("caché", "fallo, consulta filtrada: se lee solo lo pedido")
+        if workers and workers > 1:
+            yield from _iter_parallel(path_excel, target_date, company_filter, engine, workers, tracer)
+        else:
+            yield from _engine(engine)(path_excel, target_date, company_filter, None, tracer)
+        return
+    if tracer:
+        tracer.note("caché", "acierto" if registros is not None else "fallo, se lee el Excel")
+    if registros is None:
+        registros = _refresh_cache(path_excel, engine, workers, tracer)
+    company = company_filter.lower() if company_filter else None
+    for r in registros:
+        if target_date and r.fecha != target_date:
+            continue
+        if company and r.empresa.lower() != company:
             continue
+        yield r
 
-        ws = wb[sheet]
-        print(f"\n[DEBUG] Hoja: {sheet}, Empresa: {empresa}")
+def _refresh_cache(
+    path_excel: str,
+    engine: str,
+    workers: Optional[int] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Registro]:
+    """Rehace la caché reparseando solo las hojas cuya huella cambió.
 
-        # 1) Detectar fila de mes-año en filas 1–6 (universal)
-        month_row = None
-        for r in range(1, 7):
-            for c in ws[r]:
-                val = c.value
-                if isinstance(val, str) and "-" in val and re.search(r"\b\d{4}\b", val):
-                    month_row = r
-                    break
-            if month_row:
-                break
-        print(f"[DEBUG]   month_row = {month_row}")
-        if not month_row:
+    Produce los registros de todas las hojas en el orden del libro, los de
+    cada una en cuanto se ha leído (o sacado de la caché anterior), y guarda
+    la caché al terminar.
+    """
+    snap = calendar_cache.snapshot(path_excel)
+    previous = calendar_cache.load_entry(path_excel, PARSER_VERSION)
+    with XlsxPackage(path_excel) as pkg:
+        order = [s for s in pkg.sheetnames if sheet_empresa(s)]
+        entries = calendar_cache.reusable_sheets(pkg, order, previous)
+        changed = [s for s in order if s not in entries]
+        if tracer:
+            tracer.note("caché", f"{len(entries)} hojas reutilizadas, {len(changed)} reparseadas")
+
+        parsed = dict.fromkeys(changed)
+        pending = _parse_sheets(path_excel, engine, changed, workers, tracer)
+        for sheet in order:
+            if sheet not in entries:
+                while parsed[sheet] is None:
+                    done, regs = next(pending)
+                    parsed[done] = regs
+                entries[sheet] = calendar_cache.sheet_entry(pkg, sheet, parsed.pop(sheet))
+            yield from entries[sheet]["records"]
+        parts = calendar_cache.shared_parts(pkg)
+    calendar_cache.save(path_excel, PARSER_VERSION, {s: entries[s] for s in order}, order, parts,
+                        snap)
+
+def _parse_sheets(
+    path_excel: str,
+    engine: str,
+    sheets: List[str],
+    workers: Optional[int] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Tuple[str, List[Registro]]]:
+    """(hoja, registros) de cada hoja de sheets, en el orden del libro y en
+    cuanto está leída. Sin workers el motor las lee en una sola pasada, con
+    cadenas compartidas y estilos cargados una vez; con workers > 1, cada
+    hoja en una tarea del pool."""
+    if workers and workers > 1 and len(sheets) > 1:
+        with _pool(min(workers, len(sheets))) as pool:
+            futures = [(s, pool.submit(_parse_chunk, engine, path_excel, None, None, [s],
+                                       tracer.child() if tracer else None))
+                       for s in sheets]
+            for s, future in futures:
+                regs, sub = future.result()
+                if tracer:
+                    tracer.merge(sub)
+                yield s, regs
+        return
+    if not sheets:
+        return
+    for sheet, regs in _sheet_engine(engine)(path_excel, None, None, sheets, tracer):
+        yield sheet, list(regs)
+
+def _iter_openpyxl(
+    path_excel: str,
+    target_date: Optional[date],
+    company_filter: Optional[str],
+    sheets: Optional[List[str]] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Registro]:
+    """Motor de referencia (_sheets_openpyxl), registro a registro."""
+    return _flatten(_sheets_openpyxl(path_excel, target_date, company_filter, sheets, tracer))
+
+def _sheets_openpyxl(
+    path_excel: str,
+    target_date: Optional[date],
+    company_filter: Optional[str],
+    sheets: Optional[List[str]] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Tuple[str, Iterator[Registro]]]:
+    """Motor de referencia: modelo completo y acceso aleatorio con ws.cell.
+
+    Cada hoja se parsea al llegar a ella (SheetLoader), así que con filtro de
+    empresa (o un bloque de hojas) solo se cargan esas hojas.
+    """
+    loader = SheetLoader(path_excel)
+    pkg = XlsxPackage(path_excel)
+    fill_tables = legend_tables(lambda legend: fill_status_table(loader.wb._fills, legend=legend,
+                                                                 palette=pkg.palette))
+    try:
+        for sheet in loader.sheetnames:
+            empresa = sheet_empresa(sheet, company_filter)
+            if not empresa or (sheets is not None and sheet not in sheets):
+                continue
+            yield sheet, _scan_openpyxl(loader, pkg, sheet, intern(empresa), target_date,
+                                        fill_tables, tracer)
+    finally:
+        pkg.close()
+        loader.close()
+
+def _scan_openpyxl(loader: SheetLoader, pkg: XlsxPackage, sheet: str, empresa: str,
+                   target_date: Optional[date], fill_tables, tracer: Optional[Tracer]):
+    """Registros de una hoja para _sheets_openpyxl."""
+    timed = tracer is not None
+    ws = loader.load(sheet)
+    if timed:
+        t0 = tracer.clock()
+    legend = read_legend(pkg, sheet)
+    fill_status = fill_tables(legend)
+
+    # 0) Extensión real: nunca se pasa de la última columna con valor ni de
+    #    la última fila con país/impuesto
+    last_row, last_col = value_extent(ws)
+    if not last_col:
+        return
+
+    def open_rows(min_row, max_row, max_col, only, ws=ws, last_col=last_col):
+        return enumerate(ws.iter_rows(min_row=min_row, max_row=max_row, max_col=last_col),
+                         start=min_row)
+
+    # 1) Fila de mes-año en filas 1–6 y de días debajo (universal); con una
+    #    firma de cabecera ya vista no se recorre nada
+    layout, hit = cached_layout(layout_signature(pkg, sheet), open_rows, attrgetter("value"))
+    month_row = layout.month_row
+    if timed:
+        t1 = tracer.clock()
+        tracer.add(sheet, "month_row", t1 - t0)
+        tracer.note(sheet, f"empresa={empresa} month_row={month_row}"
+                           + (" (cabecera en caché)" if hit else ""))
+    if not month_row:
+        return
+
+    # 2) Índice columna ↔ fecha y columnas: la de target_date o todas las fechas
+    axis = layout.axis
+    date_map = axis.columns(target_date)
+    cols = sorted(date_map)
+    if timed:
+        t2 = tracer.clock()
+        tracer.add(sheet, "headers", t2 - t1)
+        tracer.note(sheet, f"meses={list(layout.month_headers)} fila_dias={layout.day_row} "
+                           f"columnas={len(cols)}")
+    if not cols:
+        return
+
+    # 3) Formatos condicionales: sus rellenos tapan el de la celda
+    cf = None
+    rules = load_rules(pkg.conditional_formats(sheet))
+    if rules or rules.skipped:
+        rows = [list(row) for row in ws.iter_rows(min_row=1, max_row=last_row, max_col=cols[-1],
+                                                  values_only=True)] if rules else []
+        cf = conditional_status(rules, rows, pkg.dxf_fills, tracer, sheet, legend,
+                                pkg.palette) or None
+
+    # 4) Recorrer filas de datos hasta la leyenda o la última fila con país/impuesto
+    classify = 0.0
+    extent_row = last_row
+    for r in range(FIRST_DATA_ROW, last_row + 1):
+        pa = ws.cell(row=r, column=1).value
+        if isinstance(pa, str) and pa.strip().lower().startswith("legend"):
+            extent_row = r
+            break
+        ip = ws.cell(row=r, column=2).value
+        if not (isinstance(pa, str) and pa.strip() and isinstance(ip, str) and ip.strip()):
             continue
+        pais = intern(pa.strip())
+        imp  = intern(ip.strip())
+
+        for col in cols:
+            cell = ws.cell(row=r, column=col)
+            if timed:
+                tc = tracer.clock()
+
+            # 1) Por texto (siglas); 2) por formato condicional; 3) por color
+            #    de fondo, resuelto por relleno
+            val = cell.value
+            estado = status_from_text(val)
+            source = "texto"
+            if not estado:
+                if cf is not None and (r, col) in cf:
+                    estado = cf[r, col]
+                    source = "condicional" if estado else "-"
+                else:
+                    style = cell._style
+                    estado = fill_status[style.fillId if style is not None else 0]
+                    source = "color" if estado else "-"
+
+            if timed:
+                classify += tracer.clock() - tc
+                tracer.cell(sheet, r, col, val, estado, source)
+            if estado:
+                yield Registro(empresa, pais, imp, date_map[col], estado)
+
+    if timed:
+        tracer.add(sheet, "row_scan", tracer.clock() - t2 - classify)
+        tracer.add(sheet, "classify", classify)
+    check_extent(sheet, (ws.max_row, ws.max_column),
+                 (extent_row, max(layout.header_col, max(axis.dates, default=0))), tracer)
+
+def _iter_readonly(
+    path_excel: str,
+    target_date: Optional[date],
+    company_filter: Optional[str],
+    sheets: Optional[List[str]] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Registro]:
+    """Motor en streaming (_sheets_readonly), registro a registro."""
+    return _flatten(_sheets_readonly(path_excel, target_date, company_filter, sheets, tracer))
 
-        # 2) Mapear mes→columna base
-        month_headers: Dict[tuple,int] = {}
-        for col in range(1, ws.max_column + 1):
-            val = ws.cell(row=month_row, column=col).value
-            if isinstance(val, str):
-                m = re.match(r"^([A-Za-z]+)\s*-\s*(\d{4})$", val.strip())
-                if m:
-                    mes = m.group(1).lower()
-                    anio = int(m.group(2))
-                    month_headers[(mes, anio)] = col
-        print(f"[DEBUG]   month_headers keys: {list(month_headers.keys())}")
-
-        # 3) Determinar columna objetivo
-        cols: List[int] = []
-        date_map: Dict[int, date] = {}
-        if target_date:
-            key = (target_date.strftime("%B").lower(), target_date.year)
-            base = month_headers.get(key)
-            print(f"[DEBUG]   buscando key {key} -> base = {base}")
-            if not base:
+def _sheets_readonly(
+    path_excel: str,
+    target_date: Optional[date],
+    company_filter: Optional[str],
+    sheets: Optional[List[str]] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Tuple[str, Iterator[Registro]]]:
+    """Motor en streaming: read_only=True e iter_rows, sin modelo de celdas completo."""
+    wb = load_workbook(path_excel, read_only=True, data_only=True)
+    # openpyxl no lee los formatos condicionales en read_only: se toman del XML
+    pkg = XlsxPackage(path_excel)
+
+    def build(legend):
+        fill_status = fill_status_table(wb._fills, legend=legend, palette=pkg.palette)
+        return [fill_status[sa.fillId] for sa in wb._cell_styles]
+    style_tables = legend_tables(build)
+
+    try:
+        for sheet in wb.sheetnames:
+            empresa = sheet_empresa(sheet, company_filter)
+            if not empresa or (sheets is not None and sheet not in sheets):
                 continue
-            col_t = base + (target_date.day - 1)
-            print(f"[DEBUG]   target_date {target_date} -> col_target = {col_t}")
-            cols = [col_t]
-            date_map[col_t] = target_date
-        else:
-            continue  # rama all-dates omitida
+            empresa = intern(empresa)
+            ws = wb[sheet]
+            # Sin dimensiones, iter_rows no rellena filas ni columnas fantasma
+            declared = (ws.max_row, ws.max_column) if ws.max_row else None
+            ws.reset_dimensions()
+            legend = read_legend(pkg, sheet)
 
-        # 4) Recorrer filas de datos
-        for r in range(6, ws.max_row + 1):
-            pa = ws.cell(row=r, column=1).value
-            if isinstance(pa, str) and pa.strip().lower().startswith("legend"):
-                break
-            ip = ws.cell(row=r, column=2).value
-            if not (isinstance(pa, str) and pa.strip() and isinstance(ip, str) and ip.strip()):
+            def status_of(cell, style_status=style_tables(legend)):
+                # las EmptyCell de relleno no tienen estilo
+                sid = getattr(cell, "_style_id", None)
+                return None if sid is None else style_status[sid]
+
+            def open_rows(min_row, max_row, max_col, only, ws=ws):
+                # openpyxl lee la fila entera igualmente: only no ahorra nada aquí
+                return enumerate(ws.iter_rows(min_row=min_row, max_row=max_row, max_col=max_col),
+                                 start=min_row)
+
+            yield sheet, scan_sheet(
+                empresa, open_rows,
+                value_of=attrgetter("value"),
+                status_of=status_of,
+                target_date=target_date,
+                tracer=tracer,
+                sheet=sheet,
+                declared=declared,
+                cf_rules=load_rules(pkg.conditional_formats(sheet)),
+                dxf_fills=pkg.dxf_fills,
+                legend=legend,
+                palette=pkg.palette,
+                signature=layout_signature(pkg, sheet),
+            )
+    finally:
+        pkg.close()
+        wb.close()
+
+def _iter_xml(
+    path_excel: str,
+    target_date: Optional[date],
+    company_filter: Optional[str],
+    sheets: Optional[List[str]] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Registro]:
+    """Motor sin openpyxl (_sheets_xml), registro a registro."""
+    return _flatten(_sheets_xml(path_excel, target_date, company_filter, sheets, tracer))
+
+def _sheets_xml(
+    path_excel: str,
+    target_date: Optional[date],
+    company_filter: Optional[str],
+    sheets: Optional[List[str]] = None,
+    tracer: Optional[Tracer] = None
+) -> Iterator[Tuple[str, Iterator[Registro]]]:
+    """Motor sin openpyxl: lee workbook.xml, styles.xml, sharedStrings.xml y las
+    hojas necesarias directamente del zip con lxml.iterparse."""
+    with XlsxPackage(path_excel) as pkg:
+        def build(legend):
+            fill_status = fill_status_table(pkg.fills, status_from_xml_fill, legend, pkg.palette)
+            return [fill_status[i] if i < len(fill_status) else None for i in pkg.xf_fills]
+        style_tables = legend_tables(build)
+        n_styles = len(pkg.xf_fills)
+
+        for sheet in pkg.sheetnames:
+            empresa = sheet_empresa(sheet, company_filter)
+            if not empresa or (sheets is not None and sheet not in sheets):
                 continue
-            pais = pa.strip()
-            imp  = ip.strip()
-
-            for col in cols:
-                cell = ws.cell(row=r, column=col)
-                estado = None
-
-                # 1) Por texto (siglas)
-                val = cell.value
-                if isinstance(val, str) and val.strip().upper() in LEGEND:
-                    estado = val.strip().upper()
-                    print(f"[DEBUG]     reconocido texto -> {estado}")
-                else:
-                    # 2) Por color de fondo
-                    fill = cell.fill
-                    raw = None
-                    if fill and fill.fill_type == "solid":
-                        raw = getattr(fill.start_color, "rgb", None) or getattr(fill.fgColor, "rgb", None)
-                    if raw:
-                        hexc = argb_to_hex(raw)
-                        print(f"[DEBUG]     color hex detectado -> {hexc}")
-                        estado = COLOR_CODE.get(hexc)
-                        print(f"[DEBUG]     mapeado a estado -> {estado}")
+            empresa = intern(empresa)
+            # La leyenda sale de la propia hoja, que se lee igualmente
+            legend = read_legend(pkg, sheet)
+
+            def status_of(cell, style_status=style_tables(legend)):
+                s = cell[1]
+                return style_status[s] if s < n_styles else None
+
+            def open_rows(min_row, max_row, max_col, only, sheet=sheet):
+                return pkg.iter_rows(sheet, min_row, max_row, max_col, only)
+
+            yield sheet, scan_sheet(
+                empresa, open_rows,
+                value_of=itemgetter(0),
+                status_of=status_of,
+                target_date=target_date,
+                tracer=tracer,
+                sheet=sheet,
+                declared=pkg.dimension(sheet),
+                cf_rules=load_rules(pkg.conditional_formats(sheet)),
+                dxf_fills=pkg.dxf_fills,
+                legend=legend,
+                palette=pkg.palette,
+                signature=layout_signature(pkg, sheet),
+            )
+
+def scan_sheet(empresa, open_rows, value_of, status_of, target_date=None,
+               tracer: Optional[Tracer] = None, sheet: Optional[str] = None,
+               declared: Optional[tuple] = None, cf_rules: Optional[CFRules] = None,
+               dxf_fills: List[Optional[dict]] = (), legend: Legend = DEFAULT_LEGEND,
+               palette: Palette = DEFAULT_PALETTE, signature: Optional[tuple] = None):
+    """Recorrido común a los motores en streaming.
+
+    open_rows(min_row, max_row, max_col, only) devuelve pares (fila, celdas) con
+    las celdas de la fila en orden de columna (only, si no es None, son las
+    únicas columnas que hace falta leer); value_of/status_of extraen el valor y
+    el estado por color de una celda. Produce los mismos registros que el motor
+    de referencia, en el mismo orden. declared son las dimensiones (filas,
+    columnas) que dice la hoja, para check_extent; cf_rules y dxf_fills, sus
+    formatos condicionales y los rellenos de los dxf del libro; legend y
+    palette, la leyenda y la paleta con las que se resuelven esos rellenos;
+    signature, la firma de su cabecera (layout_signature) para no volver a
+    detectar una disposición ya vista.
+    """
+    timed = tracer is not None
+    sheet = sheet or empresa
+    if timed:
+        t0 = tracer.clock()
 
+    # 1) Fila de mes-año en las filas de cabecera y, debajo, la de días; con
+    #    una firma de cabecera ya vista no se lee nada
+    layout, hit = cached_layout(signature, open_rows, value_of)
+    month_row = layout.month_row
+    if timed:
+        t1 = tracer.clock()
+        tracer.add(sheet, "month_row", t1 - t0)
+        tracer.note(sheet, f"empresa={empresa} month_row={month_row}"
+                           + (" (cabecera en caché)" if hit else ""))
+    if not month_row:
+        return
+
+    # 2) Columnas de fecha a leer, según el índice columna ↔ fecha
+    axis = layout.axis
+    date_map = axis.columns(target_date)
+    cols = sorted(date_map)
+    if timed:
+        t2 = tracer.clock()
+        tracer.add(sheet, "headers", t2 - t1)
+        tracer.note(sheet, f"meses={list(layout.month_headers)} fila_dias={layout.day_row} "
+                           f"columnas={len(cols)}")
+    if not cols:
+        return
+
+    # 3) Formatos condicionales: necesitan los valores de la hoja hasta la
+    #    leyenda, así que solo las hojas con reglas se leen dos veces
+    cf = None
+    if cf_rules is not None and (cf_rules or cf_rules.skipped):
+        rows: List[list] = []
+        for r, row in open_rows(1, None, cols[-1], None) if cf_rules else ():
+            values = [value_of(c) for c in row]
+            if values and isinstance(values[0], str) and values[0].strip().lower().startswith("legend"):
+                break
+            rows.extend([] for _ in range(r - 1 - len(rows)))
+            rows.append(values)
+        cf = conditional_status(cf_rules, rows, dxf_fills, tracer, sheet, legend, palette) or None
+
+    # 4) Filas de datos, leyendo solo hasta la última columna de fecha; con una
+    #    sola fecha, solo país, impuesto y su columna
+    only = frozenset((1, 2, *cols)) if target_date else None
+    classify = 0.0
+    extent_row = 0
+    for r, row in open_rows(FIRST_DATA_ROW, None, cols[-1], only):
+        n = len(row)
+        pa = value_of(row[0]) if n > 0 else None
+        if isinstance(pa, str) and pa.strip().lower().startswith("legend"):
+            extent_row = r
+            break
+        ip = value_of(row[1]) if n > 1 else None
+        if pa is not None or ip is not None:
+            extent_row = r
+        if not (isinstance(pa, str) and pa.strip() and isinstance(ip, str) and ip.strip()):
+            continue
+        pais = intern(pa.strip())
+        imp  = intern(ip.strip())
+
+        for col in cols:
+            if col > n:
+                if cf is None:
+                    break
+                # Celda que no está en la hoja: solo puede pintarla un formato condicional
+                estado = cf.get((r, col))
+                if timed:
+                    tracer.cell(sheet, r, col, None, estado, "condicional" if estado else "-")
                 if estado:
-                    registros.append({
-                        "empresa": empresa,
-                        "pais": pais,
-                        "impuesto": imp,
-                        "fecha": date_map[col],
-                        "estado": estado
-                    })
-
-    wb.close()
-    return registros
+                    yield Registro(empresa, pais, imp, date_map[col], estado)
+                continue
+            cell = row[col - 1]
+            if timed:
+                tc = tracer.clock()
+                val = value_of(cell)
+                estado = status_from_text(val)
+                source = "texto"
+                if not estado:
+                    if cf is not None and (r, col) in cf:
+                        estado = cf[r, col]
+                        source = "condicional" if estado else "-"
+                    else:
+                        estado = status_of(cell)
+                        source = "color" if estado else "-"
+                classify += tracer.clock() - tc
+                tracer.cell(sheet, r, col, val, estado, source)
+            else:
+                estado = status_from_text(value_of(cell))
+                if not estado:
+                    estado = cf[r, col] if cf is not None and (r, col) in cf else status_of(cell)
+            if estado:
+                yield Registro(empresa, pais, imp, date_map[col], estado)
+
+    if timed:
+        tracer.add(sheet, "row_scan", tracer.clock() - t2 - classify)
+        tracer.add(sheet, "classify", classify)
+    check_extent(sheet, declared, (extent_row, max(layout.header_col, max(axis.dates, default=0))),
+                 tracer)
@@ -0,0 +1,177 @@
+"""Calendarios fiscales sintéticos con la disposición del real.
+
+build_calendar escribe un libro determinista (mismo CalendarSpec, mismo
+contenido) con lo que se encuentran los lectores en el Excel de verdad: una
+hoja por empresa con la fila de mes-año ("June - 2025"), la de días debajo,
+filas de país/impuesto con siglas (en mayúsculas, minúsculas o con espacios),
+rellenos de la leyenda, siglas pintadas de otro color (manda el texto),
+colores y textos que no son estados, el bloque "Legend" con sus muestras y
+filas tras él que no se leen, y las hojas que se omiten o se renombran
+(SETTINGS, CALENDAR ..., REPSOL, France, Netherlands).
+
+Sirve para pruebas y para el banco de pruebas (scripts/benchmark_suite.py),
+así que escribe en modo write_only: un libro grande no se queda en memoria.
+"""
+import calendar
+import random
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill
+
+from src.legend import DEFAULT_LEGEND
+
+# Disposición por defecto: título en la fila 1, meses en la 3, días en la 5 y
+# datos desde la 6 (FIRST_DATA_ROW del lector); los meses empiezan en la columna C
+TITLE_ROW = 1
+MONTH_ROW = 3
+DAY_ROW = 5
+FIRST_DATA_ROW = 6
+FIRST_COL = 3
+
+COUNTRIES = ("Spain", "Portugal", "Italy", "Germany", "Mexico", "Chile", "Brazil",
+             "Poland", "Ireland", "Morocco", "Peru", "Colombia")
+TAXES = ("VAT", "CIT", "WHT", "PIT", "IRPF", "IGIC", "Intrastat", "SII")
+
+# Hojas que el lector omite o asigna a otra empresa (SKIP_SHEETS, EMPRESA_OVERRIDES)
+EXTRA_SHEETS = ("SETTINGS", "REPSOL", "France", "Netherlands")
+
+# Colores que no son de la leyenda y textos que no son siglas
+UNKNOWN_COLORS = ("123456", "D9D9D9", "FFC000")
+NOISE_TEXT = ("n/a", "TBC", "x", "SIN", "-")
+
+@dataclass(frozen=True)
+class CalendarSpec:
+    """Tamaño y mezcla de un calendario sintético.
+
+    companies hojas de empresa × rows filas de país/impuesto × years años
+    (12 meses por año desde start_month de start_year). density es la
+    fracción de celdas de fecha con algo; de ellas, text_ratio llevan sigla
+    (el resto, solo relleno) y noise_ratio son ruido que el lector debe
+    ignorar. month_row, day_row y first_col mueven la cabecera dentro de lo
+    que acepta el lector (mes-año en las filas 1–6, días hasta 7 filas más
+    abajo); los datos empiezan tras la fila de días y nunca antes de la 6.
+    """
+    companies: int = 3
+    rows: int = 10
+    years: int = 1
+    start_year: int = 2025
+    start_month: int = 1
+    month_row: int = MONTH_ROW
+    day_row: int = DAY_ROW
+    first_col: int = FIRST_COL
+    density: float = 0.05
+    text_ratio: float = 0.5
+    noise_ratio: float = 0.1
+    extra_sheets: bool = True
+    seed: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.companies}x{self.rows}x{self.years}"
+
+    @classmethod
+    def parse(cls, text: str, **kwargs) -> "CalendarSpec":
+        """'10x50x2' → CalendarSpec(companies=10, rows=50, years=2)."""
+        companies, rows, years = (int(p) for p in text.lower().split("x"))
+        return cls(companies=companies, rows=rows, years=years, **kwargs)
+
+# Color de relleno de cada sigla según la leyenda (las que no tienen, como SP,
+# solo aparecen como texto)
+_CODE_COLORS = {}
+for _rgb, _code in DEFAULT_LEGEND.colors.items():
+    _CODE_COLORS.setdefault(_code, _rgb)
+CODES = tuple(DEFAULT_LEGEND.descriptions)
+COLORED_CODES = tuple(c for c in CODES if c in _CODE_COLORS)
+
+def company_names(n: int) -> List[str]:
+    return [f"COMPANY {i:02d}" for i in range(1, n + 1)]
+
+def months(spec: CalendarSpec):
+    """(año, mes) de cada bloque de mes, en orden de columna."""
+    first = spec.start_year * 12 + spec.start_month - 1
+    return [(i // 12, i % 12 + 1) for i in range(first, first + 12 * spec.years)]
+
+class _Styles:
+    """Un PatternFill por color, compartido por todas las celdas."""
+    def __init__(self):
+        self._fills = {}
+
+    def fill(self, rgb: str) -> PatternFill:
+        fill = self._fills.get(rgb)
+        if fill is None:
+            fill = self._fills[rgb] = PatternFill(fill_type="solid", start_color="FF" + rgb,
+                                                  end_color="FF" + rgb)
+        return fill
+
+def _cell(ws, styles: _Styles, value=None, rgb: Optional[str] = None):
+    if rgb is None:
+        return value
+    cell = WriteOnlyCell(ws, value=value)
+    cell.fill = styles.fill(rgb)
+    return cell
+
+def _date_cell(ws, styles: _Styles, rnd: random.Random, spec: CalendarSpec):
+    if rnd.random() >= spec.density:
+        return None
+    if rnd.random() < spec.noise_ratio:
+        if rnd.random() < 0.5:
+            return _cell(ws, styles, None, rnd.choice(UNKNOWN_COLORS))
+        return rnd.choice(NOISE_TEXT)
+    if rnd.random() < spec.text_ratio:
+        code = rnd.choice(CODES)
+        text = rnd.choice((code, code.lower(), f" {code} "))
+        # A veces pintada de otro estado: manda el texto
+        rgb = rnd.choice(COLORED_CODES) if rnd.random() < 0.2 else None
+        return _cell(ws, styles, text, rgb and _CODE_COLORS[rgb])
+    return _cell(ws, styles, None, _CODE_COLORS[rnd.choice(COLORED_CODES)])
+
+def _write_company(wb: Workbook, name: str, spec: CalendarSpec, styles: _Styles,
+                   rnd: random.Random):
+    ws = wb.create_sheet(name)
+    blocks = months(spec)
+    ndays = sum(calendar.monthrange(y, m)[1] for y, m in blocks)
+
+    header = [None] * (spec.first_col - 1)
+    days = [None] * (spec.first_col - 1)
+    for y, m in blocks:
+        n = calendar.monthrange(y, m)[1]
+        header += [f"{calendar.month_name[m]} - {y}"] + [None] * (n - 1)
+        days += list(range(1, n + 1))
+
+    title = [f"{name} – Tax calendar"]
+    for r in range(1, max(spec.day_row + 1, FIRST_DATA_ROW)):
+        ws.append(header if r == spec.month_row else days if r == spec.day_row
+                  else title if r == TITLE_ROW else [])
+
+    for i in range(spec.rows):
+        row = [COUNTRIES[i // len(TAXES) % len(COUNTRIES)], TAXES[i % len(TAXES)]]
+        row += [_date_cell(ws, styles, rnd, spec) for _ in range(ndays)]
+        ws.append(row)
+
+    # Leyenda: muestra de color en A, sigla en B, descripción en C
+    ws.append([])
+    ws.append(["Legend"])
+    for code, desc in DEFAULT_LEGEND.descriptions.items():
+        rgb = _CODE_COLORS.get(code)
+        ws.append([_cell(ws, styles, None, rgb) if rgb else None, code, desc])
+    # Tras la leyenda no se lee nada
+    ws.append(["Spain", "VAT", "SI", "OS"])
+
+def build_calendar(path: str, spec: CalendarSpec = CalendarSpec()) -> str:
+    """Escribe en path el calendario de spec y devuelve path."""
+    rnd = random.Random(spec.seed)
+    styles = _Styles()
+    wb = Workbook(write_only=True)
+    for name in company_names(spec.companies):
+        _write_company(wb, name, spec, styles, rnd)
+    if spec.extra_sheets:
+        for name in EXTRA_SHEETS:
+            _write_company(wb, name, replace(spec, rows=min(spec.rows, 3), years=1),
+                           styles, rnd)
+        calendar_ws = wb.create_sheet(f"CALENDAR {spec.start_year}")
+        calendar_ws.append([None, None, f"January - {spec.start_year}"])
+    wb.save(path)
+    return path
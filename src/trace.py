@@ -0,0 +1,67 @@
+"""Trazas del lector: tiempos por hoja y fase y decisiones por celda.
+
+Desactivadas por defecto: los motores reciben tracer=None y solo comprueban
+un booleano. Con un Tracer se miden las fases de cada hoja y, si se pide,
+se guardan las últimas decisiones por celda en un buffer circular.
+"""
+from collections import defaultdict, deque
+from time import perf_counter
+from typing import Dict, List, Optional
+
+# Fases de cada hoja, en orden
+PHASES = ("month_row", "headers", "row_scan", "classify")
+
+class Tracer:
+    def __init__(self, cells: int = 0):
+        """cells: tamaño del buffer de decisiones por celda (0 = no guardarlas)."""
+        self.timings: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(PHASES, 0.0))
+        self.notes: List[str] = []
+        self.cells: Optional[deque] = deque(maxlen=cells) if cells else None
+
+    def __getstate__(self):
+        # Se devuelve desde los procesos del pool: sin la lambda del defaultdict
+        state = self.__dict__.copy()
+        state["timings"] = dict(self.timings)
+        return state
+
+    def __setstate__(self, state):
+        timings = state.pop("timings")
+        self.__dict__.update(state)
+        self.timings = defaultdict(lambda: dict.fromkeys(PHASES, 0.0), timings)
+
+    clock = staticmethod(perf_counter)
+
+    def child(self) -> "Tracer":
+        """Tracer vacío con la misma configuración (para otro proceso)."""
+        return Tracer(self.cells.maxlen if self.cells is not None else 0)
+
+    def add(self, sheet: str, phase: str, seconds: float):
+        self.timings[sheet][phase] += seconds
+
+    def note(self, sheet: str, msg: str):
+        self.notes.append(f"{sheet}: {msg}")
+
+    def cell(self, sheet: str, row: int, col: int, value, estado: Optional[str], source: str):
+        """Decisión sobre una celda; source es "texto", "condicional", "color" o "-" (sin estado)."""
+        if self.cells is not None:
+            self.cells.append((sheet, row, col, value, estado, source))
+
+    def merge(self, other: "Tracer"):
+        for sheet, phases in other.timings.items():
+            for phase, seconds in phases.items():
+                self.add(sheet, phase, seconds)
+        self.notes.extend(other.notes)
+        if self.cells is not None and other.cells:
+            self.cells.extend(other.cells)
+
+    def report(self) -> str:
+        lines = [f"{'hoja':<20}" + "".join(f"{p:>11}" for p in PHASES) + f"{'total':>11}"]
+        for sheet, phases in self.timings.items():
+            lines.append(f"{sheet:<20}" + "".join(f"{phases[p]:>11.4f}" for p in PHASES)
+                         + f"{sum(phases.values()):>11.4f}")
+        lines.extend(self.notes)
+        if self.cells:
+            lines.append(f"Últimas {len(self.cells)} decisiones por celda:")
+            for sheet, row, col, value, estado, source in self.cells:
+                lines.append(f"  {sheet} R{row}C{col} {value!r} -> {estado or '-'} ({source})")
+        return "\n".join(lines)
@@ -0,0 +1,469 @@
+"""Lectura directa de un .xlsx/.xlsm como zip + XML (lxml.iterparse), sin
+cargar el libro con openpyxl (solo se reutilizan sus reglas de formatos de fecha).
+
+Solo cubre lo que necesita el lector del calendario: nombres de hoja,
+tabla de estilos (rellenos), paleta de colores (tema e indexados), cadenas
+compartidas y filas de cada hoja.
+"""
+import hashlib
+import html
+import io
+import posixpath
+import re
+import zipfile
+from datetime import datetime
+from typing import Container, Dict, Iterator, List, Optional, Tuple
+
+from lxml import etree
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+from src.palette import DEFAULT_THEME, Palette, parse_theme
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_X14 = "http://schemas.microsoft.com/office/spreadsheetml/2009/9/main"
+NS_XM = "http://schemas.microsoft.com/office/excel/2006/main"
+WORKSHEET_REL = NS_REL + "/worksheet"
+THEME_REL = NS_REL + "/theme"
+
+def _tag(name: str) -> str:
+    return f"{{{NS_MAIN}}}{name}"
+
+T_ROW, T_C, T_V, T_IS, T_T, T_R, T_SI = (
+    _tag("row"), _tag("c"), _tag("v"), _tag("is"), _tag("t"), _tag("r"), _tag("si")
+)
+T_DIMENSION, T_SHEETDATA, T_CF = _tag("dimension"), _tag("sheetData"), _tag("conditionalFormatting")
+# Formatos condicionales x14, dentro de <extLst>
+T_X14_CF, T_X14_CFRULE = f"{{{NS_X14}}}conditionalFormatting", f"{{{NS_X14}}}cfRule"
+T_XM_SQREF = f"{{{NS_XM}}}sqref"
+
+# Celda vacía: (valor, índice de estilo)
+EMPTY = (None, 0)
+
+_ROW_REF = re.compile(rb'<row\b[^>]*?\sr="(\d+)"')
+_ROW_NO_REF = re.compile(rb'<row(?![^>]*\sr=")[\s>/]')
+_CELL_NO_REF = re.compile(rb'<c(?![^>]*\sr=")[\s>/]')
+_ROOT = re.compile(rb'<worksheet\b[^>]*>')
+
+# Celdas de la columna A: (atributos, fila, contenido)
+_CELL_A = re.compile(rb'<c\b([^>]*?\sr="A(\d+)"[^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_CELL_T = re.compile(rb'\st="(\w+)"')
+_CELL_V = re.compile(rb'<v>(.*?)</v>', re.S)
+_INLINE_T = re.compile(rb'<t\b[^>]*>(.*?)</t>', re.S)
+
+# iter_rows salta al XML de min_row si así se ahorra al menos esto; por
+# debajo, parsear las filas de más cuesta menos que copiar el resto de la hoja
+SEEK_MIN = 64 * 1024
+
+_COL_CACHE: Dict[str, int] = {}
+
+def column_index(ref: str) -> int:
+    """'AB12' → 28."""
+    letters = ref.rstrip("0123456789")
+    col = _COL_CACHE.get(letters)
+    if col is None:
+        col = 0
+        for ch in letters:
+            col = col * 26 + (ord(ch.upper()) - 64)
+        _COL_CACHE[letters] = col
+    return col
+
+def _text(node) -> str:
+    """Texto de un <si>/<is>: el <t> directo o la concatenación de los <r><t>."""
+    t = node.find(T_T)
+    if t is not None:
+        return t.text or ""
+    return "".join(rt.text or "" for rt in node.iter(T_T) if rt.getparent().tag == T_R)
+
+def _clear(elem):
+    elem.clear()
+    while elem.getprevious() is not None:
+        del elem.getparent()[0]
+
+def _pattern(pattern) -> dict:
+    """{'patternType', 'fgColor', 'bgColor'} de un <patternFill> (colores como atributos)."""
+    fg = pattern.find(_tag("fgColor"))
+    bg = pattern.find(_tag("bgColor"))
+    return {
+        "patternType": pattern.get("patternType"),
+        "fgColor": dict(fg.attrib) if fg is not None else {},
+        "bgColor": dict(bg.attrib) if bg is not None else {},
+    }
+
+class SharedStrings:
+    """sharedStrings.xml leído solo hasta el índice más alto pedido.
+
+    Una hoja que solo usa las primeras cadenas (p. ej. al filtrar por empresa)
+    no obliga a descomprimir y parsear la tabla entera.
+    """
+
+    def __init__(self, zf: zipfile.ZipFile):
+        self._items: List[str] = []
+        self._src = zf.open("xl/sharedStrings.xml") if "xl/sharedStrings.xml" in zf.namelist() else None
+        self._events = (etree.iterparse(self._src, events=("end",), tag=T_SI)
+                        if self._src is not None else iter(()))
+
+    def __getitem__(self, i: int) -> str:
+        if i >= len(self._items):
+            self._read_until(i)
+        return self._items[i]
+
+    def __len__(self) -> int:
+        self._read_until(None)
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[str]:
+        self._read_until(None)
+        return iter(self._items)
+
+    def _read_until(self, i: Optional[int]):
+        for _, si in self._events:
+            self._items.append(_text(si))
+            _clear(si)
+            if i is not None and len(self._items) > i:
+                return
+        self.close()
+
+    def close(self):
+        if self._src is not None:
+            self._src.close()
+            self._src = None
+        self._events = iter(())
+
+class XlsxPackage:
+    """Libro abierto como zip. Estilos y cadenas compartidas se leen bajo demanda."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self.epoch = CALENDAR_WINDOWS_1900
+        self.theme_member: Optional[str] = None
+        self.sheets: Dict[str, str] = self._read_sheets()
+        self._fills: Optional[List[dict]] = None
+        self._indexed_colors: Optional[List[str]] = None
+        self._palette: Optional[Palette] = None
+        self._xf_fills: Optional[List[int]] = None
+        self._date_styles: Optional[Dict[int, bool]] = None
+        self._dxf_fills: Optional[List[dict]] = None
+        self._shared: Optional[SharedStrings] = None
+        self._sheet_xml: Tuple[Optional[str], bytes] = (None, b"")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._shared is not None:
+            self._shared.close()
+        self.zip.close()
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return list(self.sheets)
+
+    def _read_sheets(self) -> Dict[str, str]:
+        """Nombre de hoja → miembro del zip, en el orden del libro."""
+        rels = etree.fromstring(self.zip.read("xl/_rels/workbook.xml.rels"))
+        targets = {}
+        for rel in rels.iter(f"{{{NS_PKG}}}Relationship"):
+            if rel.get("Type") not in (WORKSHEET_REL, THEME_REL):
+                continue
+            target = rel.get("Target")
+            if target.startswith("/"):
+                target = target.lstrip("/")
+            else:
+                target = posixpath.normpath(posixpath.join("xl", target))
+            if rel.get("Type") == THEME_REL:
+                self.theme_member = target
+            else:
+                targets[rel.get("Id")] = target
+
+        sheets: Dict[str, str] = {}
+        wb = etree.fromstring(self.zip.read("xl/workbook.xml"))
+        pr = wb.find(_tag("workbookPr"))
+        if pr is not None and pr.get("date1904") in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+        for sh in wb.iter(_tag("sheet")):
+            member = targets.get(sh.get(f"{{{NS_REL}}}id"))
+            if member:
+                sheets[sh.get("name")] = member
+        return sheets
+
+    # -- estilos -----------------------------------------------------------
+
+    def _read_styles(self):
+        fills: List[dict] = []
+        xf_fills: List[int] = []
+        date_styles: Dict[int, bool] = {}
+        dxf_fills: List[Optional[dict]] = []
+        indexed: List[str] = []
+        if "xl/styles.xml" in self.zip.namelist():
+            root = etree.fromstring(self.zip.read("xl/styles.xml"))
+            custom = {int(n.get("numFmtId")): n.get("formatCode")
+                      for n in root.iter(_tag("numFmt"))}
+            node = root.find(_tag("fills"))
+            for fill in (node if node is not None else ()):
+                pattern = fill.find(_tag("patternFill"))
+                if pattern is None:
+                    fills.append({"patternType": None, "fgColor": {}})
+                    continue
+                fills.append(_pattern(pattern))
+            node = root.find(_tag("cellXfs"))
+            for idx, xf in enumerate(node if node is not None else ()):
+                xf_fills.append(int(xf.get("fillId", 0)))
+                num_fmt = int(xf.get("numFmtId", 0))
+                fmt = custom.get(num_fmt) or builtin_format_code(num_fmt)
+                if fmt and is_date_format(fmt):
+                    date_styles[idx] = is_timedelta_format(fmt)
+            node = root.find(_tag("dxfs"))
+            for dxf in (node if node is not None else ()):
+                pattern = dxf.find(f"{_tag('fill')}/{_tag('patternFill')}")
+                dxf_fills.append(_pattern(pattern) if pattern is not None else None)
+            node = root.find(f"{_tag('colors')}/{_tag('indexedColors')}")
+            indexed = [c.get("rgb", "") for c in (node if node is not None else ())]
+        self._fills, self._xf_fills, self._date_styles = fills, xf_fills, date_styles
+        self._dxf_fills, self._indexed_colors = dxf_fills, indexed
+
+    @property
+    def fills(self) -> List[dict]:
+        """Rellenos de styles.xml: {'patternType', 'fgColor': atributos del color}."""
+        if self._fills is None:
+            self._read_styles()
+        return self._fills
+
+    @property
+    def xf_fills(self) -> List[int]:
+        """Índice de estilo de celda (atributo s) → índice de relleno."""
+        if self._xf_fills is None:
+            self._read_styles()
+        return self._xf_fills
+
+    @property
+    def dxf_fills(self) -> List[Optional[dict]]:
+        """Relleno de cada formato diferencial (dxf) de los formatos condicionales,
+        con bgColor además de fgColor; None si el dxf no cambia el relleno."""
+        if self._dxf_fills is None:
+            self._read_styles()
+        return self._dxf_fills
+
+    @property
+    def date_styles(self) -> Dict[int, bool]:
+        """Estilos con formato de fecha → True si es de duración (timedelta)."""
+        if self._date_styles is None:
+            self._read_styles()
+        return self._date_styles
+
+    @property
+    def palette(self) -> Palette:
+        """Tema del libro (theme1.xml) y su paleta indexada, para resolver los
+        colores theme/indexed de los rellenos."""
+        if self._palette is None:
+            if self._indexed_colors is None:
+                self._read_styles()
+            names = set(self.zip.namelist())
+            theme = (parse_theme(self.zip.read(self.theme_member))
+                     if self.theme_member in names else DEFAULT_THEME)
+            self._palette = (Palette(theme, self._indexed_colors) if self._indexed_colors
+                             else Palette(theme))
+        return self._palette
+
+    # -- cadenas compartidas -------------------------------------------------
+
+    @property
+    def shared_strings(self) -> "SharedStrings":
+        """Cadenas compartidas; se leen de forma incremental según se piden."""
+        if self._shared is None:
+            self._shared = SharedStrings(self.zip)
+        return self._shared
+
+    # -- filas -------------------------------------------------------------
+
+    def sheet_xml(self, sheet: str) -> bytes:
+        """XML de la hoja descomprimido; se guarda el de la última hoja pedida,
+        que suele leerse varias veces seguidas (dimensiones, filas, formatos)."""
+        if self._sheet_xml[0] != sheet:
+            self._sheet_xml = (sheet, self.zip.read(self.sheets[sheet]))
+        return self._sheet_xml[1]
+
+    def conditional_formats(self, sheet: str) -> list:
+        """Elementos <conditionalFormatting> de la hoja, también los x14 de
+        extLst (T_X14_CF), que load_rules solo lista.
+
+        Van detrás de sheetData; si la hoja no tiene ninguno no se parsea nada.
+        """
+        data = self.sheet_xml(sheet)
+        if b"conditionalFormatting" not in data:
+            return []
+        return [elem for _, elem in etree.iterparse(io.BytesIO(data), events=("end",),
+                                                    tag=(T_CF, T_X14_CF))]
+
+    def header_signature(self, sheet: str, last_row: int) -> str:
+        """Hash del XML de las filas 1..last_row de la hoja, sin parsearlas.
+
+        Se corta en la primera fila numerada más allá de last_row; las filas
+        sin número que haya antes entran en el hash, que así nunca cubre menos.
+        """
+        data = self.sheet_xml(sheet)
+        start = data.find(b"<sheetData")
+        end = data.find(b"</sheetData>")
+        end = len(data) if end < 0 else end
+        for m in _ROW_REF.finditer(data, max(start, 0)):
+            if int(m.group(1)) > last_row:
+                end = m.start()
+                break
+        return hashlib.sha256(data[max(start, 0):end]).hexdigest()
+
+    def find_row(self, sheet: str, prefix: str, min_row: int = 1) -> Optional[int]:
+        """Primera fila desde min_row cuya celda de la columna A es un texto que
+        empieza por prefix (sin distinguir mayúsculas ni contar espacios
+        delante), o None.
+
+        Se busca en el XML sin parsearlo; solo si hay celdas sin referencia se
+        recorre la columna A con iter_rows.
+        """
+        prefix = prefix.lower()
+        data = self.sheet_xml(sheet)
+        if _CELL_NO_REF.search(data):
+            for r, row in self.iter_rows(sheet, min_row, None, 1):
+                first = row[0][0] if row else None
+                if isinstance(first, str) and first.strip().lower().startswith(prefix):
+                    return r
+            return None
+        for m in _CELL_A.finditer(data, max(data.find(b"<sheetData"), 0)):
+            if int(m.group(2)) < min_row:
+                continue
+            text = self._cell_text(m.group(1), m.group(3))
+            if text is not None and text.strip().lower().startswith(prefix):
+                return int(m.group(2))
+        return None
+
+    def _cell_text(self, attrs: bytes, body: Optional[bytes]) -> Optional[str]:
+        """Texto de una celda a partir de su XML, o None si no es de texto."""
+        if not body:
+            return None
+        t = _CELL_T.search(attrs)
+        t = t.group(1) if t else b"n"
+        if t == b"inlineStr":
+            return html.unescape(b"".join(_INLINE_T.findall(body)).decode())
+        v = _CELL_V.search(body)
+        if v is None:
+            return None
+        if t == b"s":
+            return self.shared_strings[int(v.group(1))]
+        return html.unescape(v.group(1).decode()) if t == b"str" else None
+
+    def _rows_xml(self, sheet: str, min_row: int) -> bytes:
+        """XML del que iter_rows lee las filas: el de la hoja o, si min_row queda
+        lejos del principio, una hoja con sheetData recortado desde esa fila.
+
+        Solo se recorta cuando todas las filas anteriores llevan número: si no,
+        alguna sin él podría ser ya min_row.
+        """
+        data = self.sheet_xml(sheet)
+        start = data.find(b"<sheetData")
+        if min_row <= 1 or start < 0 or len(data) - start < SEEK_MIN:
+            return data
+        for m in _ROW_REF.finditer(data, start):
+            if int(m.group(1)) >= min_row:
+                offset = m.start()
+                break
+        else:
+            return data
+        end = data.find(b"</sheetData>", offset)
+        root = _ROOT.search(data, 0, start)
+        if (offset - start < SEEK_MIN or end < 0 or root is None
+                or _ROW_NO_REF.search(data, start, offset)):
+            return data
+        return b"".join((root.group(0), b"<sheetData>", data[offset:end],
+                         b"</sheetData></worksheet>"))
+
+    def dimension(self, sheet: str) -> Optional[Tuple[int, int]]:
+        """(última fila, última columna) declaradas en <dimension>, o None.
+
+        Es lo que Excel guarda, no lo que hay: se infla en cuanto se da formato
+        a filas o columnas enteras.
+        """
+        with io.BytesIO(self.sheet_xml(sheet)) as src:
+            for _, elem in etree.iterparse(src, events=("start",), tag=(T_DIMENSION, T_SHEETDATA)):
+                if elem.tag == T_SHEETDATA:
+                    return None
+                last = elem.get("ref", "").split(":")[-1]
+                digits = last.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+                if not digits.isdigit():
+                    return None
+                return int(digits), column_index(last)
+        return None
+
+    def iter_rows(
+        self,
+        sheet: str,
+        min_row: int = 1,
+        max_row: Optional[int] = None,
+        max_col: Optional[int] = None,
+        only: Optional[Container[int]] = None,
+    ) -> Iterator[Tuple[int, List[tuple]]]:
+        """Pares (fila, celdas) con celdas (valor, estilo) indexadas por columna-1.
+
+        Las celdas más allá de max_col se descartan sin leer su valor, y con
+        only, también las de columnas que no estén en only (quedan como EMPTY).
+        Las filas que no existen en el XML no se devuelven. Los valores siguen
+        a openpyxl con data_only=True: cadenas como str, números como int/float
+        y números con formato de fecha como datetime. Con min_row lejos del
+        principio se empieza a parsear en esa fila (ver _rows_xml).
+        """
+        shared = None
+        date_styles = self.date_styles
+        r = 0
+        with io.BytesIO(self._rows_xml(sheet, min_row)) as src:
+            for _, row in etree.iterparse(src, events=("end",), tag=T_ROW):
+                ref = row.get("r")
+                r = int(ref) if ref else r + 1
+                if r < min_row:
+                    _clear(row)
+                    continue
+                if max_row is not None and r > max_row:
+                    break
+                cells: List[tuple] = []
+                col = 0
+                for c in row.iterchildren(T_C):
+                    ref = c.get("r")
+                    col = column_index(ref) if ref else col + 1
+                    if max_col is not None and col > max_col:
+                        break
+                    if only is not None and col not in only:
+                        continue
+                    t = c.get("t", "n")
+                    style = int(c.get("s", 0))
+                    if t == "inlineStr":
+                        node = c.find(T_IS)
+                        value = _text(node) if node is not None else None
+                    else:
+                        v = c.findtext(T_V) or None
+                        if v is None:
+                            value = None
+                        elif t == "s":
+                            if shared is None:
+                                shared = self.shared_strings
+                            value = shared[int(v)]
+                        elif t in ("str", "e"):
+                            value = v
+                        elif t == "b":
+                            value = v == "1"
+                        elif t == "d":
+                            value = datetime.fromisoformat(v)
+                        else:
+                            value = float(v) if ("." in v or "E" in v or "e" in v) else int(v)
+                            if style in date_styles:
+                                try:
+                                    value = from_excel(value, self.epoch, timedelta=date_styles[style])
+                                except (OverflowError, ValueError):
+                                    value = "#VALUE!"
+                    if col > len(cells) + 1:
+                        cells.extend([EMPTY] * (col - len(cells) - 1))
+                    cells.append((value, style))
+                _clear(row)
+                yield r, cells
@@ -0,0 +1,56 @@
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import PatternFill
+
+def _fill(hexc):
+    return PatternFill(fill_type="solid", start_color="FF" + hexc, end_color="FF" + hexc)
+
+def build_calendar(path):
+    """Calendario mínimo: junio y julio de 2025, una empresa y hojas a omitir."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "ACME"
+    ws.cell(row=1, column=3, value="June - 2025")
+    ws.cell(row=1, column=33, value="July - 2025")
+    for day in range(1, 31):
+        ws.cell(row=5, column=2 + day, value=day)
+    for day in range(1, 32):
+        ws.cell(row=5, column=32 + day, value=day)
+
+    ws.cell(row=6, column=1, value="Spain")
+    ws.cell(row=6, column=2, value="VAT")
+    ws.cell(row=6, column=3, value="SI")                    # 1 junio, texto
+    ws.cell(row=6, column=4).fill = _fill("00B0F0")         # 2 junio, OP
+    ws.cell(row=6, column=33, value="os")                   # 1 julio, texto en minúsculas
+    ws.cell(row=7, column=1, value="Portugal")
+    ws.cell(row=7, column=2, value="CIT")
+    ws.cell(row=7, column=4, value="SD")                    # 2 junio
+    ws.cell(row=7, column=4).fill = _fill("FFFF66")         # el texto manda sobre el color
+    ws.cell(row=7, column=63).fill = _fill("70AD47")        # 31 julio, OS
+    ws.cell(row=7, column=5).fill = _fill("123456")         # color desconocido
+    ws.cell(row=9, column=1, value="Legend")
+    ws.cell(row=10, column=1, value="Italy")
+    ws.cell(row=10, column=2, value="VAT")
+    ws.cell(row=10, column=3, value="SI")                   # tras la leyenda: se ignora
+
+    for name in ("SETTINGS", "France", "CALENDAR 2025"):
+        other = wb.create_sheet(name)
+        other.cell(row=1, column=3, value="June - 2025")
+        other.cell(row=6, column=1, value="Spain")
+        other.cell(row=6, column=2, value="VAT")
+        other.cell(row=6, column=3, value="SI")
+    wb.save(path)
+    return path
+
+@pytest.fixture
+def calendar_xlsx(tmp_path):
+    return str(build_calendar(tmp_path / "calendar.xlsx"))
+
+@pytest.fixture
+def multi_xlsx(calendar_xlsx):
+    """El calendario mínimo con tres empresas más, copias de ACME."""
+    wb = load_workbook(calendar_xlsx)
+    for name in ("BETA", "GAMMA", "DELTA"):
+        wb.copy_worksheet(wb["ACME"]).title = name
+    wb.save(calendar_xlsx)
+    return calendar_xlsx
@@ -0,0 +1,29 @@
+from datetime import date
+from src.reader import parse_calendar
+
+def test_all_dates_una_sola_pasada(calendar_xlsx):
+    regs = parse_calendar(calendar_xlsx)
+    got = {(r["pais"], r["impuesto"], r["fecha"], r["estado"]) for r in regs}
+    assert got == {
+        ("Spain", "VAT", date(2025, 6, 1), "SI"),
+        ("Spain", "VAT", date(2025, 6, 2), "OP"),
+        ("Spain", "VAT", date(2025, 7, 1), "OS"),
+        ("Portugal", "CIT", date(2025, 6, 2), "SD"),
+        ("Portugal", "CIT", date(2025, 7, 31), "OS"),
+    }
+    assert {r["empresa"] for r in regs} == {"ACME"}
+
+def test_all_dates_coincide_con_fecha_unica(calendar_xlsx):
+    regs = parse_calendar(calendar_xlsx)
+    for dt in {r["fecha"] for r in regs}:
+        assert parse_calendar(calendar_xlsx, target_date=dt) == [r for r in regs if r["fecha"] == dt]
+
+def test_registro_compacto_con_vista_de_dict(calendar_xlsx):
+    import pickle
+    reg = parse_calendar(calendar_xlsx)[0]
+    assert not hasattr(reg, "__dict__")
+    assert dict(reg) == {"empresa": "ACME", "pais": "Spain", "impuesto": "VAT",
+                         "fecha": date(2025, 6, 1), "estado": "SI"}
+    assert reg == dict(reg) and dict(reg) == reg
+    assert reg.get("estado") == "SI" and reg.get("otro") is None
+    assert pickle.loads(pickle.dumps(reg)) == reg
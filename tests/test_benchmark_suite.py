@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from scripts import benchmark_suite
+
+RESULTS = [{"size": "small", "spec": "3x20x1", "task": "parse_calendar[xml]",
+            "seconds": 1.0, "peak_mb": 1.0, "count": 10}]
+
+@pytest.fixture
+def baseline(tmp_path):
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps({"version": 1, "results": [dict(RESULTS[0], seconds=0.1)]}))
+    return path
+
+def _main(monkeypatch, *argv):
+    monkeypatch.setattr(benchmark_suite.sys, "argv", ["benchmark_suite.py", *argv])
+    monkeypatch.setattr(benchmark_suite, "run", lambda *a: RESULTS)
+    benchmark_suite.main()
+
+def test_compare_no_pisa_la_referencia(monkeypatch, baseline):
+    before = baseline.read_text()
+    with pytest.raises(SystemExit) as exc:
+        _main(monkeypatch, "--compare", str(baseline))
+    assert exc.value.code == 1
+    assert baseline.read_text() == before
+
+def test_compare_y_output_iguales_se_rechaza(monkeypatch, baseline):
+    before = baseline.read_text()
+    with pytest.raises(SystemExit) as exc:
+        _main(monkeypatch, "--compare", str(baseline), "-o", str(baseline))
+    assert exc.value.code == 2
+    assert baseline.read_text() == before
+
+def test_compare_con_output_guarda_aparte(monkeypatch, baseline, tmp_path):
+    out = tmp_path / "ahora.json"
+    with pytest.raises(SystemExit):
+        _main(monkeypatch, "--compare", str(baseline), "-o", str(out))
+    assert json.loads(out.read_text())["results"] == RESULTS
@@ -0,0 +1,144 @@
+import os
+import pytest
+from datetime import date
+import src.reader as reader
+from src.reader import parse_calendar
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CALENDAR_CACHE_DIR", str(tmp_path / "cache"))
+
+def _sin_excel(monkeypatch):
+    def falla(*args, **kwargs):
+        raise AssertionError("no debería volver a leer el Excel")
+    for name in ("_iter_openpyxl", "_iter_readonly", "_iter_xml",
+                 "_sheets_openpyxl", "_sheets_readonly", "_sheets_xml"):
+        monkeypatch.setattr(reader, name, falla)
+
+def test_cache_hit_sin_releer(calendar_xlsx, monkeypatch):
+    full = parse_calendar(calendar_xlsx, cache=True)
+    assert full == parse_calendar(calendar_xlsx)
+    _sin_excel(monkeypatch)
+    assert parse_calendar(calendar_xlsx, cache=True) == full
+    assert parse_calendar(calendar_xlsx, target_date=date(2025, 6, 2), company_filter="acme",
+                          cache=True) == [r for r in full if r["fecha"] == date(2025, 6, 2)]
+
+def test_cache_mtime_distinto_mismo_contenido(calendar_xlsx, monkeypatch):
+    full = parse_calendar(calendar_xlsx, cache=True)
+    os.utime(calendar_xlsx, ns=(0, 0))
+    _sin_excel(monkeypatch)
+    assert parse_calendar(calendar_xlsx, cache=True) == full
+
+def test_cache_se_reconstruye(calendar_xlsx, monkeypatch):
+    from openpyxl import load_workbook
+    parse_calendar(calendar_xlsx, cache=True)
+    wb = load_workbook(calendar_xlsx)
+    wb["ACME"].cell(row=6, column=5, value="AD")
+    wb.save(calendar_xlsx)
+    regs = parse_calendar(calendar_xlsx, cache=True)
+    assert regs == parse_calendar(calendar_xlsx)
+    assert any(r["estado"] == "AD" for r in regs)
+
+    monkeypatch.setattr(reader, "PARSER_VERSION", "otra")
+    calls = []
+    orig = reader._sheets_openpyxl
+    monkeypatch.setattr(reader, "_sheets_openpyxl", lambda *a: calls.append(a) or orig(*a))
+    assert parse_calendar(calendar_xlsx, cache=True) == regs
+    assert len(calls) == 1
+
+def test_cache_reparsea_solo_hojas_cambiadas(multi_xlsx, monkeypatch):
+    from copy import copy
+    from openpyxl import load_workbook
+    parse_calendar(multi_xlsx, cache=True)
+    wb = load_workbook(multi_xlsx)
+    wb["GAMMA"].cell(row=6, column=5, value="AD")
+    wb["GAMMA"].cell(row=7, column=6).fill = copy(wb["ACME"].cell(row=6, column=4).fill)
+    wb.save(multi_xlsx)
+
+    calls = []
+    orig = reader._sheets_openpyxl
+    monkeypatch.setattr(reader, "_sheets_openpyxl", lambda *a: calls.append(a[3]) or orig(*a))
+    regs = parse_calendar(multi_xlsx, cache=True)
+    assert calls == [["GAMMA"]]
+    monkeypatch.setattr(reader, "_sheets_openpyxl", orig)
+    assert regs == parse_calendar(multi_xlsx)
+    assert [r["estado"] for r in regs if r["empresa"] == "GAMMA"].count("AD") == 1
+
+def _rezip(path, **changes):
+    import zipfile
+    with zipfile.ZipFile(path) as z:
+        members = {i.filename: z.read(i) for i in z.infolist()}
+    for name, change in changes.items():
+        members[name] = change(members.get(name))
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+
+def test_cache_hoja_sin_cambios_con_cadenas_cambiadas(calendar_xlsx):
+    # openpyxl escribe cadenas en línea: se pasa "VAT" a la tabla de cadenas compartidas
+    sst = b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><si><t>VAT</t></si></sst>'
+    _rezip(calendar_xlsx, **{
+        "xl/sharedStrings.xml": lambda _: sst,
+        "xl/worksheets/sheet1.xml": lambda x: x.replace(b't="inlineStr"><is><t>VAT</t></is>', b't="s"><v>0</v>'),
+        "[Content_Types].xml": lambda x: x.replace(b"</Types>",
+            b'<Override PartName="/xl/sharedStrings.xml" ContentType="application/'
+            b'vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>'),
+    })
+    assert {r["impuesto"] for r in parse_calendar(calendar_xlsx, cache=True)} == {"VAT", "CIT"}
+
+    # Mismo sheet1.xml, pero su índice 0 ya no es "VAT"
+    _rezip(calendar_xlsx, **{"xl/sharedStrings.xml": lambda x: x.replace(b">VAT<", b">IVA<")})
+    regs = parse_calendar(calendar_xlsx, cache=True)
+    assert regs == parse_calendar(calendar_xlsx)
+    assert {r["impuesto"] for r in regs} == {"IVA", "CIT"}
+
+def test_fecha_sin_cache_lee_solo_sus_columnas(calendar_xlsx, monkeypatch):
+    # Caché desfasada (aquí, inexistente): la consulta de un día no la
+    # reconstruye leyendo todas las columnas, va por el motor con la fecha
+    calls = []
+    orig = reader._iter_xml
+    monkeypatch.setattr(reader, "_iter_xml", lambda *a: calls.append(a[1]) or orig(*a))
+    target = date(2025, 6, 2)
+    regs = parse_calendar(calendar_xlsx, target_date=target, engine="xml", cache=True)
+    assert calls == [target]
+    assert regs == parse_calendar(calendar_xlsx, target_date=target)
+    assert reader.calendar_cache.load(calendar_xlsx, reader.PARSER_VERSION) is None
+
+    # La lectura completa sí la rehace, y la siguiente consulta sale de ella
+    full = parse_calendar(calendar_xlsx, engine="xml", cache=True)
+    _sin_excel(monkeypatch)
+    assert parse_calendar(calendar_xlsx, target_date=target, cache=True) == \
+        [r for r in full if r["fecha"] == target]
+
+def test_empresa_sin_cache_lee_solo_sus_hojas(multi_xlsx, monkeypatch):
+    # Caché desfasada: la consulta de una empresa no reparsea todas las hojas
+    def falla(*args, **kwargs):
+        raise AssertionError("no debería rehacer la caché entera")
+    monkeypatch.setattr(reader, "_refresh_cache", falla)
+    cargadas = []
+    orig_load = reader.SheetLoader.load
+    monkeypatch.setattr(reader.SheetLoader, "load", lambda self, name: cargadas.append(name)
+                        or orig_load(self, name))
+    regs = parse_calendar(multi_xlsx, company_filter="gamma", cache=True)
+    assert {r["empresa"] for r in regs} == {"GAMMA"}
+    assert cargadas == ["GAMMA"]
+    assert regs == parse_calendar(multi_xlsx, company_filter="gamma", engine="xml", cache=True)
+    assert reader.calendar_cache.load(multi_xlsx, reader.PARSER_VERSION) is None
+
+def test_cache_fria_en_streaming(multi_xlsx, monkeypatch):
+    # Sin caché, la lectura completa produce cada hoja en cuanto se ha leído,
+    # con el libro abierto una sola vez, y guarda la caché al terminar
+    abiertos, cargadas = [], []
+    orig_init, orig_load = reader.SheetLoader.__init__, reader.SheetLoader.load
+    monkeypatch.setattr(reader.SheetLoader, "__init__",
+                        lambda self, path: abiertos.append(path) or orig_init(self, path))
+    monkeypatch.setattr(reader.SheetLoader, "load",
+                        lambda self, name: cargadas.append(name) or orig_load(self, name))
+    regs = reader.iter_calendar(multi_xlsx, cache=True)
+    first = next(regs)
+    assert first["empresa"] == "ACME" and cargadas == ["ACME"]
+    assert reader.calendar_cache.load(multi_xlsx, reader.PARSER_VERSION) is None
+    rest = list(regs)
+    assert cargadas == ["ACME", "BETA", "GAMMA", "DELTA"] and len(abiertos) == 1
+    assert reader.calendar_cache.load(multi_xlsx, reader.PARSER_VERSION) == [first, *rest] == \
+        parse_calendar(multi_xlsx)
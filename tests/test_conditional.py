@@ -0,0 +1,124 @@
+import pytest
+from datetime import date
+from openpyxl import load_workbook
+from openpyxl.formatting.rule import CellIsRule, ColorScaleRule, FormulaRule
+from openpyxl.styles import PatternFill
+
+from src.conditional import MAX_COL, MAX_ROW, Grid, load_rules, parse_formula, parse_sqref
+from src.reader import ENGINES, parse_calendar
+from src.trace import Tracer
+
+def _dxf(hexc):
+    return PatternFill(bgColor="FF" + hexc)
+
+@pytest.fixture
+def cf_xlsx(calendar_xlsx):
+    """El calendario mínimo con formatos condicionales sobre ACME."""
+    wb = load_workbook(calendar_xlsx)
+    ws = wb["ACME"]
+    ws.cell(row=7, column=6, value=7)                       # 4 junio, Portugal
+    ws.cell(row=6, column=7, value="x")                     # 5 junio, Spain
+    cf = ws.conditional_formatting
+    cf.add("C6:BK8", CellIsRule(operator="equal", formula=['"X"'], fill=_dxf("FFFF66")))
+    cf.add("F6:F7", CellIsRule(operator="between", formula=["5", "10"], fill=_dxf("FF99FF")))
+    cf.add("AG6:AG8", FormulaRule(formula=['$B6="CIT"'], fill=_dxf("00B0F0")))
+    cf.add("C6:D6", FormulaRule(formula=["TRUE"], fill=_dxf("123456")))   # tapa el OP de D6
+    cf.add("C7:C8", ColorScaleRule(start_type="min", start_color="FF0000",
+                                   end_type="max", end_color="00FF00"))
+    cf.add("H6:H7", FormulaRule(formula=["TODAY()>0"], fill=_dxf("70AD47")))
+    wb.save(calendar_xlsx)
+    return calendar_xlsx
+
+def test_parse_sqref():
+    assert parse_sqref("C6:AG8 $A$1") == [(6, 3, 8, 33), (1, 1, 1, 1)]
+    assert parse_sqref("C:BK $C:$NZ 8:6") == [(1, 3, MAX_ROW, 63), (1, 3, MAX_ROW, 390),
+                                              (6, 1, 8, MAX_COL)]
+    assert parse_sqref("C A1:C Z9!") == []
+
+def test_formula_y_comparaciones_de_excel():
+    grid = Grid([["SI", 3, None], ["si", "abc", 10]])
+    rows, cols = [1, 2], [1, 2, 3]
+
+    def ev(formula):
+        from src.conditional import CFRule
+        rule = CFRule(blocks=[(1, 1, 2, 3)], kind="expression", dxf=0, priority=1,
+                      formulas=[parse_formula(formula)])
+        return rule.evaluate(grid, (1, 1, 2, 3)).tolist()
+
+    assert ev('A1="Si"') == [[True, False, False], [True, False, False]]
+    assert ev("A1>5") == [[True, False, False], [True, True, True]]   # texto > número
+    assert ev("AND(ISBLANK(A1), TRUE)") == [[False, False, True], [False, False, False]]
+    assert ev('OR($A$1="x", NOT(A1<>""))') == [[False, False, True], [False, False, False]]
+
+def test_reglas_no_soportadas_se_ignoran(cf_xlsx):
+    from src.xlsx import XlsxPackage
+    with XlsxPackage(cf_xlsx) as pkg:
+        rules = load_rules(pkg.conditional_formats("ACME"))
+    assert len(rules.rules) == 4
+    assert len(rules.skipped) == 2
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_estados_por_formato_condicional(cf_xlsx, engine):
+    regs = parse_calendar(cf_xlsx, engine=engine)
+    got = {(r["pais"], r["fecha"], r["estado"]) for r in regs}
+    assert got == {
+        ("Spain", date(2025, 6, 1), "SI"),           # el texto manda sobre el formato
+        ("Spain", date(2025, 6, 5), "SI"),           # cellIs = "X", sin distinguir mayúsculas
+        ("Spain", date(2025, 7, 1), "OS"),
+        ("Portugal", date(2025, 6, 2), "SD"),
+        ("Portugal", date(2025, 6, 4), "AD"),        # between 5 y 10
+        ("Portugal", date(2025, 7, 1), "OP"),        # expression $B6="CIT", celda vacía
+        ("Portugal", date(2025, 7, 31), "OS"),
+    }
+    assert parse_calendar(cf_xlsx, target_date=date(2025, 7, 1), engine=engine) == \
+        [r for r in regs if r["fecha"] == date(2025, 7, 1)]
+
+def test_traza_de_formato_condicional(cf_xlsx):
+    tracer = Tracer(cells=200)
+    parse_calendar(cf_xlsx, engine="xml", tracer=tracer)
+    assert ("ACME", 7, 33, None, "OP", "condicional") in tracer.cells
+    assert any("ignoradas" in n for n in tracer.notes)
+
+def _rewrite_sheet(path, fn):
+    import zipfile
+    with zipfile.ZipFile(path) as z:
+        members = {i.filename: z.read(i) for i in z.infolist()}
+    members["xl/worksheets/sheet1.xml"] = fn(members["xl/worksheets/sheet1.xml"])
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+
+@pytest.mark.filterwarnings("ignore:Failed to load a conditional formatting rule")
+@pytest.mark.parametrize("engine", ENGINES)
+def test_rangos_de_columnas_y_filas_enteras(calendar_xlsx, engine):
+    wb = load_workbook(calendar_xlsx)
+    ws = wb["ACME"]
+    ws.cell(row=6, column=8, value="x")                      # 6 junio, Spain
+    ws.cell(row=7, column=9, value=7)                        # 7 junio, Portugal
+    ws.conditional_formatting.add("C6:BK8", CellIsRule(operator="equal", formula=['"X"'],
+                                                       fill=_dxf("FFFF66")))
+    ws.conditional_formatting.add("A7:BK7", CellIsRule(operator="equal", formula=["7"],
+                                                       fill=_dxf("FF99FF")))
+    wb.save(calendar_xlsx)
+    # openpyxl no escribe rangos abiertos: se ponen en el XML, como los guarda Excel
+    _rewrite_sheet(calendar_xlsx, lambda xml: xml.replace(b'sqref="C6:BK8"', b'sqref="$C:$BK"')
+                   .replace(b'sqref="A7:BK7"', b'sqref="7:7"'))
+    got = {(r["pais"], r["fecha"], r["estado"]) for r in parse_calendar(calendar_xlsx, engine=engine)}
+    assert {("Spain", date(2025, 6, 6), "SI"), ("Portugal", date(2025, 6, 7), "AD")} <= got
+
+X14 = (b'<extLst><ext uri="{78C0D931-6437-407d-A8EE-F0AAD7539E65}" '
+       b'xmlns:x14="http://schemas.microsoft.com/office/spreadsheetml/2009/9/main">'
+       b'<x14:conditionalFormattings><x14:conditionalFormatting '
+       b'xmlns:xm="http://schemas.microsoft.com/office/excel/2006/main">'
+       b'<x14:cfRule type="iconSet" priority="1" id="{00000000-0000-0000-0000-000000000001}"/>'
+       b'<xm:sqref>C6:BK8</xm:sqref></x14:conditionalFormatting></x14:conditionalFormattings>'
+       b'</ext></extLst></worksheet>')
+
+@pytest.mark.filterwarnings("ignore:Conditional Formatting extension")
+def test_reglas_x14_en_la_traza(calendar_xlsx):
+    _rewrite_sheet(calendar_xlsx, lambda xml: xml.replace(b"</worksheet>", X14))
+
+    tracer = Tracer()
+    assert parse_calendar(calendar_xlsx, engine="xml", tracer=tracer) == \
+        parse_calendar(calendar_xlsx, engine="openpyxl")
+    assert any("C6:BK8: regla x14 iconSet (extLst)" in n for n in tracer.notes)
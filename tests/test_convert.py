@@ -0,0 +1,188 @@
+import os
+import zipfile
+from datetime import date
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.styles import PatternFill
+
+from src.convert import convert_workbook
+from src.reader import parse_calendar
+
+COLOR_CODE = {
+    "FFFFFF": "SP",
+    "FFFF66": "SI",
+    "FF5050": "SD",
+    "70AD47": "OS",
+    "00B0F0": "OP",
+}
+VBA = b"\xd0\xcf\x11\xe0 macro falsa"
+
+def _summary(results):
+    return [(r.sheet, r.changed, r.cleared) for r in results]
+
+def skip(sheet):
+    return sheet == "SETTINGS" or sheet.startswith("CALENDAR")
+
+@pytest.fixture
+def macro_xlsx(calendar_xlsx, tmp_path):
+    """El calendario mínimo con un formato condicional y un vbaProject.bin."""
+    wb = load_workbook(calendar_xlsx)
+    wb["ACME"].conditional_formatting.add(
+        "C6:BK8", CellIsRule(operator="equal", formula=['"X"'], fill=PatternFill(bgColor="FFFFFF66")))
+    wb["SETTINGS"].cell(row=6, column=4).fill = PatternFill("solid", start_color="FF00B0F0")
+    wb.save(calendar_xlsx)
+    src = tmp_path / "macro.xlsx"
+    with zipfile.ZipFile(calendar_xlsx) as zin, zipfile.ZipFile(src, "w") as zout:
+        for info in zin.infolist():
+            zout.writestr(info, zin.read(info))
+        zout.writestr("xl/vbaProject.bin", VBA)
+    return str(src)
+
+def test_convierte_colores_en_siglas(macro_xlsx, tmp_path):
+    dst = str(tmp_path / "out.xlsx")
+    summary = _summary(convert_workbook(macro_xlsx, dst, COLOR_CODE, skip))
+    # D6 (OP) y BK7 (OS) pasan a sigla; D7 conserva su texto y E7 (color desconocido) solo pierde el relleno
+    assert summary == [("ACME", 2, 3), ("France", 0, 0)]
+
+    wb = load_workbook(dst)
+    ws = wb["ACME"]
+    assert ws["D6"].value == "OP" and ws["BK7"].value == "OS"
+    assert ws["D7"].value == "SD" and ws["D7"].fill.fill_type == "solid"
+    assert ws["E7"].value is None and ws["E7"].fill.fill_type is None
+    assert ws["D6"].fill.fill_type is None
+    assert not ws.conditional_formatting
+    assert wb["SETTINGS"]["D6"].fill.fill_type == "solid"      # hoja omitida, intacta
+
+    with zipfile.ZipFile(dst) as z:
+        assert z.read("xl/vbaProject.bin") == VBA
+
+def test_lectura_igual_tras_convertir(macro_xlsx, tmp_path):
+    dst = str(tmp_path / "out.xlsx")
+    list(convert_workbook(macro_xlsx, dst, COLOR_CODE, skip))
+    for engine in ("openpyxl", "xml"):
+        assert parse_calendar(dst, engine=engine) == \
+            parse_calendar(macro_xlsx, engine=engine)
+
+def test_error_no_deja_salida(tmp_path):
+    bad = tmp_path / "bad.xlsx"
+    bad.write_bytes(b"no es un zip")
+    dst = tmp_path / "out.xlsx"
+    with pytest.raises(zipfile.BadZipFile):
+        list(convert_workbook(str(bad), str(dst), COLOR_CODE))
+    assert list(tmp_path.iterdir()) == [bad]
+
+def test_paralelo_igual_a_secuencial(multi_xlsx, tmp_path):
+    seq, par = str(tmp_path / "seq.xlsx"), str(tmp_path / "par.xlsx")
+    a = _summary(convert_workbook(multi_xlsx, seq, COLOR_CODE, skip))
+    b = _summary(convert_workbook(multi_xlsx, par, COLOR_CODE, skip, workers=3))
+    assert a == b and [s[0] for s in a] == ["ACME", "France", "BETA", "GAMMA", "DELTA"]
+    with zipfile.ZipFile(seq) as zs, zipfile.ZipFile(par) as zp:
+        assert zs.namelist() == zp.namelist()
+        assert all(zs.read(n) == zp.read(n) for n in zs.namelist())
+
+def test_manifiesto_reutiliza_hojas(multi_xlsx, tmp_path):
+    dst = str(tmp_path / "out.xlsx")
+    first = list(convert_workbook(multi_xlsx, dst, COLOR_CODE, skip))
+    assert not any(r.reused for r in first)
+
+    # Misma entrada: no se reescribe nada
+    mtime = os.stat(dst).st_mtime_ns
+    again = list(convert_workbook(multi_xlsx, dst, COLOR_CODE, skip))
+    assert all(r.reused for r in again) and _summary(again) == _summary(first)
+    assert os.stat(dst).st_mtime_ns == mtime
+
+    # Cambia una hoja (con un estilo que ya existe): solo se convierte esa
+    wb = load_workbook(multi_xlsx)
+    wb["GAMMA"].cell(row=6, column=10).fill = PatternFill("solid", start_color="FF70AD47",
+                                                          end_color="FF70AD47")
+    wb.save(multi_xlsx)
+    partial = list(convert_workbook(multi_xlsx, dst, COLOR_CODE, skip))
+    assert [r.sheet for r in partial if not r.reused] == ["GAMMA"]
+    full = str(tmp_path / "full.xlsx")
+    list(convert_workbook(multi_xlsx, full, COLOR_CODE, skip, reuse=False))
+    with zipfile.ZipFile(dst) as a, zipfile.ZipFile(full) as b:
+        assert all(a.read(n) == b.read(n) for n in b.namelist())
+
+    # Otra tabla de colores: se convierte todo
+    other = dict(COLOR_CODE, **{"123456": "HS"})
+    assert not any(r.reused for r in convert_workbook(multi_xlsx, dst, other, skip))
+
+def test_manifiesto_invalido_si_la_salida_cambia(calendar_xlsx, tmp_path):
+    dst = str(tmp_path / "out.xlsx")
+    list(convert_workbook(calendar_xlsx, dst, COLOR_CODE, skip))
+    with open(dst, "ab") as f:
+        f.write(b"\0")
+    assert not any(r.reused for r in convert_workbook(calendar_xlsx, dst, COLOR_CODE, skip))
+
+def _rewrite_member(path, member, fn):
+    with zipfile.ZipFile(path) as z:
+        members = {i.filename: z.read(i) for i in z.infolist()}
+    members[member] = fn(members[member])
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+
+def test_maestra_de_formula_compartida_intacta(calendar_xlsx, tmp_path):
+    """D8 (verde OS) es la maestra de una fórmula compartida D8:F8; E8 y F8
+    dependen de su si. Convertirla dejaría a E8 y F8 sin fórmula."""
+    wb = load_workbook(calendar_xlsx)
+    ws = wb["ACME"]
+    ws["D8"] = "=C8+1"
+    ws["D8"].fill = PatternFill("solid", start_color="FF70AD47", end_color="FF70AD47")
+    ws["E8"] = "=D8+1"
+    ws["F8"] = "=E8+1"
+    ws["F8"].fill = PatternFill("solid", start_color="FF00B0F0", end_color="FF00B0F0")
+    wb.save(calendar_xlsx)
+    _rewrite_member(calendar_xlsx, "xl/worksheets/sheet1.xml", lambda xml: xml
+                    .replace(b"<f>C8+1</f>", b'<f t="shared" ref="D8:F8" si="0">C8+1</f>')
+                    .replace(b"<f>D8+1</f>", b'<f t="shared" si="0"/>')
+                    .replace(b"<f>E8+1</f>", b'<f t="shared" si="0"/>'))
+
+    dst = str(tmp_path / "out.xlsx")
+    results = list(convert_workbook(calendar_xlsx, dst, COLOR_CODE, skip))
+    acme = results[0]
+    assert (acme.sheet, acme.kept) == ("ACME", 1)
+
+    with zipfile.ZipFile(dst) as z:
+        xml = z.read("xl/worksheets/sheet1.xml")
+    # La maestra sigue con su fórmula y su relleno; la dependiente F8 sí se convierte
+    assert b'<f t="shared" ref="D8:F8" si="0">C8+1</f>' in xml
+    assert xml.count(b'<f t="shared" si="0"/>') == 1
+    ws = load_workbook(dst)["ACME"]
+    assert ws["D8"].value == "=C8+1" and ws["D8"].fill.fill_type == "solid"
+    assert ws["E8"].value == "=D8+1"
+    assert ws["F8"].value == "OP"
+
+    # Reutilizada desde el manifiesto, sigue contando
+    again = list(convert_workbook(calendar_xlsx, dst, COLOR_CODE, skip))
+    assert again[0].reused and again[0].kept == 1
+
+def test_blanco_de_fondo_y_cabeceras_intactos(calendar_xlsx, tmp_path):
+    """El blanco de tema o indexado no es SP, y fuera de la rejilla de fechas
+    (cabeceras, país e impuesto, leyenda) no se toca nada, ni el blanco rgb."""
+    from openpyxl.styles import Color
+    wb = load_workbook(calendar_xlsx)
+    ws = wb["ACME"]
+    white = PatternFill("solid", fgColor=Color(theme=0))
+    ws["A6"].fill = white                                          # Spain
+    ws["B6"].fill = PatternFill("solid", fgColor=Color(indexed=9))  # VAT
+    ws["C1"].fill = PatternFill("solid", start_color="FFFFFFFF", end_color="FFFFFFFF")
+    ws["C5"].fill = PatternFill("solid", start_color="FF00B0F0", end_color="FF00B0F0")
+    ws["F6"].fill = white                                          # 4 junio
+    ws["G6"].fill = PatternFill("solid", start_color="FFFFFFFF", end_color="FFFFFFFF")
+    ws["B9"].fill = PatternFill("solid", start_color="FF70AD47", end_color="FF70AD47")
+    wb.save(calendar_xlsx)
+
+    dst = str(tmp_path / "out.xlsx")
+    assert _summary(convert_workbook(calendar_xlsx, dst, COLOR_CODE, skip))[0] == ("ACME", 3, 5)
+    ws = load_workbook(dst)["ACME"]
+    assert (ws["A6"].value, ws["B6"].value, ws["C1"].value, ws["C5"].value) == \
+        ("Spain", "VAT", "June - 2025", 1)
+    assert all(ws[c].fill.fill_type == "solid" for c in ("A6", "B6", "C1", "C5", "B9"))
+    assert ws["F6"].value is None and ws["F6"].fill.fill_type is None
+    assert ws["G6"].value == "SP"
+    regs = parse_calendar(dst)
+    assert ("Spain", date(2025, 6, 5), "SP") in {(r["pais"], r["fecha"], r["estado"]) for r in regs}
+    assert [r for r in regs if r["fecha"] != date(2025, 6, 5)] == parse_calendar(calendar_xlsx)
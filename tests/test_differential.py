@@ -0,0 +1,40 @@
+import random
+from datetime import date
+
+from src import reader
+from src.differential import (CANDIDATES, check_case, diff_records, overrides, random_spec,
+                              run, sample_dates, speedups)
+from src.reader import parse_calendar
+from src.synthetic import CalendarSpec, build_calendar
+
+def test_motores_iguales_a_la_referencia(tmp_path):
+    results = list(run(3, str(tmp_path), seed=3, dates=1, max_companies=2, max_rows=5))
+    assert [str(m) for r in results for m in r.mismatches] == []
+    assert sum(r.records for r in results) > 0
+    assert set(speedups(results)) == {"openpyxl", *CANDIDATES}
+
+def test_renombrado_de_hojas(tmp_path):
+    # Con rows=1 todas las hojas tienen la misma fila: COMPANY 02 leída como
+    # COMPANY 01 junta dos filas iguales en la misma empresa
+    spec = CalendarSpec(companies=2, rows=1, density=0.3, seed=5)
+    path = build_calendar(str(tmp_path / "renamed.xlsx"), spec)
+    extra = {"COMPANY 02": "COMPANY 01"}
+    res = check_case(path, spec, extra, sample_dates(random.Random(0), spec, 2))
+    assert res.mismatches == []
+    with overrides(extra):
+        assert {r["empresa"] for r in parse_calendar(path, engine="xml")} == {"COMPANY 01"}
+    assert "COMPANY 02" not in reader.EMPRESA_OVERRIDES
+
+def test_diferencias_detectadas():
+    ref = [{"empresa": "A", "pais": "Spain", "impuesto": "VAT", "fecha": date(2025, 6, d), "estado": "SI"}
+           for d in (1, 2, 2)]
+    missing, extra = diff_records(ref, ref[:2] + [{**ref[0], "estado": "OS"}])
+    assert missing == [("A", "Spain", "VAT", date(2025, 6, 2), "SI")]
+    assert extra == [("A", "Spain", "VAT", date(2025, 6, 1), "OS")]
+
+def test_specs_dentro_de_lo_que_acepta_el_lector():
+    rnd = random.Random(0)
+    for _ in range(50):
+        spec = random_spec(rnd)
+        assert 1 <= spec.month_row <= reader.HEADER_ROWS
+        assert spec.month_row < spec.day_row <= spec.month_row + reader.DAY_ROW_SPAN
@@ -0,0 +1,140 @@
+import pytest
+from datetime import date
+from src.reader import parse_calendar, iter_calendar, ENGINES
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("target", [None, date(2025, 6, 2), date(2025, 7, 31), date(2025, 8, 1)])
+def test_motor_igual_a_referencia(calendar_xlsx, engine, target):
+    ref = parse_calendar(calendar_xlsx, target_date=target)
+    assert parse_calendar(calendar_xlsx, target_date=target, engine=engine) == ref
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_motor_filtro_empresa(calendar_xlsx, engine):
+    assert parse_calendar(calendar_xlsx, company_filter="acme", engine=engine)
+    assert parse_calendar(calendar_xlsx, company_filter="France", engine=engine) == []
+
+def test_motor_desconocido(calendar_xlsx):
+    with pytest.raises(ValueError):
+        parse_calendar(calendar_xlsx, engine="pandas")
+
+@pytest.mark.parametrize("company,empresa", [(None, "ACME"), ("gamma", "GAMMA")])
+@pytest.mark.parametrize("engine", ENGINES)
+def test_iter_calendar_hoja_a_hoja(multi_xlsx, engine, company, empresa, monkeypatch):
+    from src.xlsx import XlsxPackage
+    abiertas, leidas = [], []
+    orig_rows, orig_xml = XlsxPackage.iter_rows, XlsxPackage.sheet_xml
+    monkeypatch.setattr(XlsxPackage, "iter_rows",
+                        lambda self, sheet, *a: abiertas.append(sheet) or orig_rows(self, sheet, *a))
+    monkeypatch.setattr(XlsxPackage, "sheet_xml",
+                        lambda self, sheet: leidas.append(sheet) or orig_xml(self, sheet))
+    it = iter_calendar(multi_xlsx, company_filter=company, engine=engine)
+    first = next(it)
+    assert first["empresa"] == empresa
+    # Ni la leyenda lee otra hoja que la que se está recorriendo
+    assert set(leidas) == {empresa}
+    if engine == "xml":
+        assert set(abiertas) == {empresa}
+    assert [first] + list(it) == parse_calendar(multi_xlsx, company_filter=company)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_iter_calendar_cierra_el_libro_si_se_corta(multi_xlsx, engine, monkeypatch):
+    from src.xlsx import XlsxPackage
+    abiertos = set()
+    orig_init, orig_close = XlsxPackage.__init__, XlsxPackage.close
+    monkeypatch.setattr(XlsxPackage, "__init__",
+                        lambda self, path: abiertos.add(self) or orig_init(self, path))
+    monkeypatch.setattr(XlsxPackage, "close",
+                        lambda self: abiertos.discard(self) or orig_close(self))
+    it = iter_calendar(multi_xlsx, engine=engine)
+    next(it)
+    assert abiertos
+    it.close()
+    assert not abiertos
+
+@pytest.fixture
+def gaps_xlsx(tmp_path):
+    """Junio con una columna de total tras el día 15 y julio desplazado una columna."""
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "ACME"
+    ws.cell(row=1, column=3, value="June - 2025")
+    ws.cell(row=1, column=35, value="July - 2025")
+    for day in range(1, 31):
+        ws.cell(row=4, column=2 + day + (day > 15), value=day)
+    ws.cell(row=4, column=18, value="Total")
+    for day in range(1, 32):
+        ws.cell(row=4, column=34 + day, value=day)
+    ws.cell(row=6, column=1, value="Spain")
+    ws.cell(row=6, column=2, value="VAT")
+    ws.cell(row=6, column=18, value="SI")                   # columna de total: se ignora
+    ws.cell(row=6, column=19, value="SD")                   # 16 junio
+    ws.cell(row=6, column=35, value="OS")                   # 1 julio
+    path = tmp_path / "gaps.xlsx"
+    wb.save(path)
+    return str(path)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_eje_de_fechas_no_contiguo(gaps_xlsx, engine):
+    got = {(r["fecha"], r["estado"]) for r in parse_calendar(gaps_xlsx, engine=engine)}
+    assert got == {(date(2025, 6, 16), "SD"), (date(2025, 7, 1), "OS")}
+    assert [r["estado"] for r in parse_calendar(gaps_xlsx, target_date=date(2025, 6, 16),
+                                                engine=engine)] == ["SD"]
+
+def test_eje_sin_fila_de_dias():
+    from src.reader import DateAxis
+    axis = DateAxis.build({("june", 2025): 3, ("july", 2025): 33})
+    assert axis.column(date(2025, 6, 1)) == 3 and axis.column(date(2025, 7, 31)) == 63
+    assert axis.between(date(2025, 6, 30), date(2025, 7, 1)) == {32: date(2025, 6, 30),
+                                                                33: date(2025, 7, 1)}
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_dimensiones_infladas(calendar_xlsx, tmp_path, engine):
+    from openpyxl import load_workbook
+    from openpyxl.styles import PatternFill
+    from src.reader import BloatedSheetWarning
+    wb = load_workbook(calendar_xlsx)
+    ws = wb["ACME"]
+    for r in range(11, 3000, 97):                           # formato sin datos, lejos de la tabla
+        ws.cell(row=r, column=600).fill = PatternFill(fill_type="solid", start_color="FFFFFF00")
+    path = str(tmp_path / "inflado.xlsx")
+    wb.save(path)
+    with pytest.warns(BloatedSheetWarning, match="ACME"):
+        regs = parse_calendar(path, engine=engine)
+    assert regs == parse_calendar(calendar_xlsx)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_dimensiones_normales_sin_aviso(calendar_xlsx, engine):
+    import warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        parse_calendar(calendar_xlsx, engine=engine)
+
+def test_filtro_empresa_carga_solo_su_hoja(multi_xlsx, monkeypatch):
+    import src.reader as reader
+    cargadas = []
+    orig = reader.SheetLoader.load
+    monkeypatch.setattr(reader.SheetLoader, "load", lambda self, name: cargadas.append(name) or orig(self, name))
+    regs = parse_calendar(multi_xlsx, company_filter="gamma")
+    assert cargadas == ["GAMMA"]
+    loader = reader.SheetLoader(multi_xlsx)
+    loader.load("GAMMA")
+    loader.close()
+    assert loader.wb.sheetnames == ["GAMMA"]
+    assert regs and {r["empresa"] for r in regs} == {"GAMMA"}
+
+def test_sin_internos_de_openpyxl(multi_xlsx, monkeypatch):
+    import src.reader as reader
+    from openpyxl import load_workbook
+    ws = load_workbook(multi_xlsx)["ACME"]
+
+    class Publica:
+        # Solo la API pública de la hoja, sin ws._cells
+        iter_rows = ws.iter_rows
+    assert reader.value_extent(Publica()) == reader.value_extent(ws)
+
+    regs = parse_calendar(multi_xlsx)
+    monkeypatch.setattr(reader, "INCREMENTAL_LOAD", False)
+    assert parse_calendar(multi_xlsx) == regs
+    assert parse_calendar(multi_xlsx, company_filter="gamma") == \
+        [r for r in regs if r["empresa"] == "GAMMA"]
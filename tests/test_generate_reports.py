@@ -0,0 +1,25 @@
+from datetime import date
+
+from scripts import generate_reports
+from src.reader import iter_calendar, parse_calendar
+
+def test_informes_por_fecha(multi_xlsx, tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_reports, "OUT_DIR", str(tmp_path))
+    regs = parse_calendar(multi_xlsx)
+    written = generate_reports.stream_reports(iter_calendar(multi_xlsx))
+    assert written == {r["fecha"] for r in regs}
+    for dt in written:
+        text = (tmp_path / f"{dt.isoformat()}.txt").read_text(encoding="utf-8")
+        lines = [l.strip() for l in text.splitlines()]
+        assert [l for l in lines if l.startswith("Empresa:")] == \
+            [f"Empresa: {e}" for e in dict.fromkeys(r["empresa"] for r in regs if r["fecha"] == dt)]
+        assert sum(l.startswith("•") for l in lines) == sum(r["fecha"] == dt for r in regs)
+
+def test_informes_de_un_rango(calendar_xlsx, tmp_path, monkeypatch):
+    out = tmp_path / "outputs"
+    out.mkdir()
+    monkeypatch.setattr(generate_reports, "OUT_DIR", str(out))
+    june = [date(2025, 6, d) for d in range(1, 31)]
+    written = generate_reports.stream_reports(iter_calendar(calendar_xlsx), dates=june)
+    assert written == {r["fecha"] for r in parse_calendar(calendar_xlsx) if r["fecha"] in june}
+    assert sorted(p.name for p in out.iterdir()) == sorted(f"{d}.txt" for d in written)
@@ -0,0 +1,48 @@
+import pytest
+from openpyxl import load_workbook
+
+from src import reader
+from src.reader import ENGINES, parse_calendar
+from src.trace import Tracer
+
+@pytest.fixture(autouse=True)
+def _sin_disposiciones(monkeypatch):
+    monkeypatch.setattr(reader, "_LAYOUTS", type(reader._LAYOUTS)())
+
+def _hits(tracer):
+    return [n.split(":")[0] for n in tracer.notes if "cabecera en caché" in n]
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_cabecera_detectada_una_vez(multi_xlsx, engine):
+    tracer = Tracer()
+    regs = parse_calendar(multi_xlsx, engine=engine, tracer=tracer)
+    # Las cuatro hojas tienen la misma cabecera: solo ACME la detecta
+    assert _hits(tracer) == ["BETA", "GAMMA", "DELTA"]
+    assert len(reader._LAYOUTS) == 1
+
+    tracer = Tracer()
+    assert parse_calendar(multi_xlsx, engine=engine, tracer=tracer) == regs
+    assert _hits(tracer) == ["ACME", "BETA", "GAMMA", "DELTA"]
+
+def test_cambio_de_cabecera_se_detecta(multi_xlsx):
+    before = parse_calendar(multi_xlsx, engine="xml")
+    wb = load_workbook(multi_xlsx)
+    wb["GAMMA"].cell(row=1, column=33, value="August - 2025")
+    wb.save(multi_xlsx)
+
+    tracer = Tracer()
+    after = parse_calendar(multi_xlsx, engine="xml", tracer=tracer)
+    assert "GAMMA" not in _hits(tracer)
+    assert {r["fecha"].month for r in after if r["empresa"] == "GAMMA"} == {6, 8}
+    assert [r for r in after if r["empresa"] != "GAMMA"] == \
+        [r for r in before if r["empresa"] != "GAMMA"]
+
+def test_datos_fuera_de_la_cabecera_no_cambian_la_firma(calendar_xlsx):
+    from src.xlsx import XlsxPackage
+    with XlsxPackage(calendar_xlsx) as pkg:
+        before = reader.layout_signature(pkg, "ACME")
+    wb = load_workbook(calendar_xlsx)
+    wb["ACME"].cell(row=20, column=5, value="SI")
+    wb.save(calendar_xlsx)
+    with XlsxPackage(calendar_xlsx) as pkg:
+        assert reader.layout_signature(pkg, "ACME")[0] == before[0]
@@ -0,0 +1,83 @@
+import pytest
+from datetime import date
+from openpyxl import load_workbook
+from openpyxl.styles import PatternFill
+
+from src.legend import DEFAULT_LEGEND, read_legend
+from scripts.convert_colors import color_code_for, convert_openpyxl, skip_sheet
+from src.convert import convert_workbook
+from src.reader import ENGINES, company_legend, parse_calendar
+from src.xlsx import XlsxPackage
+
+def _fill(hexc):
+    return PatternFill(fill_type="solid", start_color="FF" + hexc, end_color="FF" + hexc)
+
+def _add_legend(path, rows):
+    wb = load_workbook(path)
+    ws = wb["ACME"]
+    for r, (swatch, code, desc) in enumerate(rows, start=11):
+        if swatch:
+            ws.cell(row=r, column=1).fill = _fill(swatch)
+        ws.cell(row=r, column=2, value=code)
+        ws.cell(row=r, column=3, value=desc)
+    wb.save(path)
+
+@pytest.fixture
+def legend_xlsx(calendar_xlsx):
+    """El calendario mínimo con una leyenda que da un color nuevo a SI y a HL."""
+    _add_legend(calendar_xlsx, [
+        ("123456", "SI", "Send information (custom)"),
+        ("ABCDEF", "hl", None),
+        ("FF0000", "XX", "Sigla que no es de Status"),
+    ])
+    return calendar_xlsx
+
+def test_sin_leyenda_en_el_libro(calendar_xlsx):
+    with XlsxPackage(calendar_xlsx) as pkg:
+        assert read_legend(pkg, "ACME") is DEFAULT_LEGEND
+
+def test_leyenda_del_libro(legend_xlsx):
+    legend = company_legend(legend_xlsx, "acme")
+    assert legend.colors["123456"] == "SI" and legend.colors["ABCDEF"] == "HL"
+    assert "FF0000" not in legend.colors
+    assert legend.colors["FFFF66"] == "SI"                      # los de siempre siguen
+    assert legend.descriptions["SI"] == "Send information (custom)"
+    assert legend.descriptions["HL"] == DEFAULT_LEGEND.descriptions["HL"]
+    assert legend.status_of_rgb("ff123456") == "SI"
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_colores_de_la_leyenda(legend_xlsx, engine):
+    regs = parse_calendar(legend_xlsx, engine=engine)
+    # E7 tenía un color desconocido; ahora la leyenda dice que es SI
+    assert ("Portugal", date(2025, 6, 3), "SI") in {(r["pais"], r["fecha"], r["estado"]) for r in regs}
+
+def test_cada_hoja_con_su_leyenda(multi_xlsx, tmp_path, monkeypatch):
+    monkeypatch.setenv("CALENDAR_CACHE_DIR", str(tmp_path / "cache"))
+    before = parse_calendar(multi_xlsx, cache=True)
+    assert all(r["fecha"] != date(2025, 6, 3) for r in before)
+    # La leyenda nueva está solo en ACME: las demás hojas siguen con la suya
+    _add_legend(multi_xlsx, [("123456", "SI", None)])
+    after = parse_calendar(multi_xlsx, cache=True)
+    assert after == parse_calendar(multi_xlsx)
+    assert {r["empresa"] for r in after if r["fecha"] == date(2025, 6, 3)} == {"ACME"}
+    for engine in ENGINES:
+        assert parse_calendar(multi_xlsx, company_filter="beta", engine=engine) == \
+            [r for r in before if r["empresa"] == "BETA"]
+        assert parse_calendar(multi_xlsx, engine=engine, workers=2) == after
+
+def test_muestra_blanca_no_da_color(calendar_xlsx):
+    _add_legend(calendar_xlsx, [("FFFFFF", "SP", None)])
+    with XlsxPackage(calendar_xlsx) as pkg:
+        assert read_legend(pkg, "ACME") is DEFAULT_LEGEND
+
+def test_informes_y_conversion_con_la_leyenda_de_cada_hoja(multi_xlsx, tmp_path):
+    _add_legend(multi_xlsx, [("123456", "SI", "Send information (custom)")])
+    assert company_legend(multi_xlsx, "ACME").descriptions["SI"] == "Send information (custom)"
+    assert company_legend(multi_xlsx, "BETA") is DEFAULT_LEGEND
+    # E7 tiene el color de la leyenda de ACME: sigla en ACME, en BETA no
+    patch, whole = str(tmp_path / "patch.xlsx"), str(tmp_path / "openpyxl.xlsx")
+    list(convert_workbook(multi_xlsx, patch, color_code_for, skip_sheet))
+    convert_openpyxl(multi_xlsx, whole)
+    for dst in (patch, whole):
+        wb = load_workbook(dst)
+        assert (wb["ACME"]["E7"].value, wb["BETA"]["E7"].value) == ("SI", None)
@@ -0,0 +1,36 @@
+from datetime import date
+from src.matrix import EPOCH, CalendarMatrix, load_matrices
+from src.reader import Status, parse_calendar
+
+def test_matriz_ida_y_vuelta(calendar_xlsx):
+    regs = parse_calendar(calendar_xlsx)
+    mats = load_matrices(calendar_xlsx)
+    assert list(mats) == ["ACME"]
+    m = mats["ACME"]
+    assert m.codes.dtype.name == "uint8"
+    assert m.rows == [("Spain", "VAT"), ("Portugal", "CIT")]
+    assert (m.start, m.end) == (date(2025, 6, 1), date(2025, 7, 31))
+    assert m.records() == regs
+
+def test_consultas_vectorizadas(calendar_xlsx):
+    m = load_matrices(calendar_xlsx)["ACME"]
+    assert m.on(date(2025, 6, 2)) == [("Spain", "VAT", Status.OP), ("Portugal", "CIT", Status.SD)]
+    assert m.on(date(2024, 1, 1)) == []
+    assert m.where(Status.OS) == [("Spain", "VAT", date(2025, 7, 1)), ("Portugal", "CIT", date(2025, 7, 31))]
+    junio = m.between(date(2025, 6, 1), date(2025, 6, 30))
+    assert junio.ndays == 30
+    assert junio.counts() == {Status.SI: 1, Status.OP: 1, Status.SD: 1}
+    assert m.active_dates() == sorted({r["fecha"] for r in parse_calendar(calendar_xlsx)})
+
+def test_matriz_vacia():
+    m = CalendarMatrix.from_records("X", [])
+    assert m.records() == [] and m.counts() == {} and m.active_dates() == []
+    assert (m.start, m.ndays) == (EPOCH, 0)
+
+def test_filas_repetidas_no_se_pisan():
+    # Dos filas seguidas con la misma clave (o dos hojas de la misma empresa)
+    regs = [{"pais": "Spain", "impuesto": "VAT", "fecha": date(2025, 6, d), "estado": e}
+            for d, e in ((1, "SI"), (3, "OS"), (1, "SD"), (2, "OP"))]
+    m = CalendarMatrix.from_records("X", regs)
+    assert m.rows == [("Spain", "VAT"), ("Spain", "VAT")]
+    assert [(r["fecha"].day, r["estado"]) for r in m.records()] == [(1, "SI"), (3, "OS"), (1, "SD"), (2, "OP")]
@@ -0,0 +1,68 @@
+import zipfile
+
+import pytest
+from datetime import date
+from openpyxl import load_workbook
+from openpyxl.styles import Color, PatternFill
+
+from src.palette import DEFAULT_PALETTE, Palette, apply_tint, parse_theme
+from src.reader import ENGINES, parse_calendar
+from src.xlsx import XlsxPackage
+
+def _theme_fill(theme, tint=0.0):
+    return PatternFill(fill_type="solid", fgColor=Color(theme=theme, tint=tint))
+
+def test_tint_como_excel():
+    assert apply_tint("70AD47", -0.249977111117893) == "548235"    # verde énfasis 6, oscuro 25%
+    assert apply_tint("ED7D31", 0.5999938962981048) == "F8CBAD"    # naranja énfasis 2, claro 60%
+    assert apply_tint("FFFFFF", -0.1499984740745262) == "D9D9D9"
+
+def test_colores_de_tema_e_indexados():
+    assert DEFAULT_PALETTE.rgb({"theme": "9"}) == "70AD47"
+    assert DEFAULT_PALETTE.rgb({"theme": "0"}) == "FFFFFF"         # lt1, no dk1
+    assert DEFAULT_PALETTE.rgb({"theme": "1"}) == "000000"
+    assert DEFAULT_PALETTE.rgb({"indexed": "5"}) == "FFFF00"
+    assert DEFAULT_PALETTE.rgb({"rgb": "FF00B0F0"}) == "00B0F0"
+    assert DEFAULT_PALETTE.rgb({"auto": "1"}) is None
+    assert Palette(indexed=["FF123456"]).rgb({"indexed": "0"}) == "123456"
+    assert DEFAULT_PALETTE.rgb(Color(theme=9, tint=-0.249977111117893)) == "548235"
+
+@pytest.fixture
+def theme_xlsx(calendar_xlsx):
+    """El calendario mínimo con rellenos de tema y el énfasis 6 del tema de
+    Office 2013 (el verde de OS) en theme1.xml."""
+    wb = load_workbook(calendar_xlsx)
+    ws = wb["ACME"]
+    ws.cell(row=8, column=1, value="Italy")
+    ws.cell(row=8, column=2, value="VAT")
+    ws.cell(row=8, column=3).fill = _theme_fill(9)                  # 1 junio, OS
+    ws.cell(row=8, column=4).fill = _theme_fill(9, 0.4)             # 2 junio, HS por la leyenda
+    ws.cell(row=11, column=1).fill = _theme_fill(9, 0.4)
+    ws.cell(row=11, column=2, value="HS")
+    wb.save(calendar_xlsx)
+
+    with zipfile.ZipFile(calendar_xlsx) as z:
+        members = {i.filename: z.read(i) for i in z.infolist()}
+    members["xl/theme/theme1.xml"] = members["xl/theme/theme1.xml"].replace(
+        b'<a:srgbClr val="F79646"/>', b'<a:srgbClr val="70AD47"/>')
+    with zipfile.ZipFile(calendar_xlsx, "w") as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return calendar_xlsx
+
+def test_tema_del_libro(theme_xlsx):
+    with XlsxPackage(theme_xlsx) as pkg:
+        assert pkg.palette.theme[9] == "70AD47"
+        assert pkg.palette.theme == tuple(parse_theme(pkg.zip.read("xl/theme/theme1.xml")))
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_rellenos_de_tema(theme_xlsx, engine):
+    regs = parse_calendar(theme_xlsx, engine=engine)
+    got = {(r["fecha"], r["estado"]) for r in regs if r["pais"] == "Italy"}
+    assert got == {(date(2025, 6, 1), "OS"), (date(2025, 6, 2), "HS")}
+
+def test_conversion_de_rellenos_de_tema(theme_xlsx, tmp_path):
+    from src.convert import convert_workbook
+    dst = str(tmp_path / "out.xlsx")
+    list(convert_workbook(theme_xlsx, dst, {"70AD47": "OS"}, lambda s: s != "ACME"))
+    assert load_workbook(dst)["ACME"]["C8"].value == "OS"
@@ -0,0 +1,28 @@
+import pytest
+from datetime import date
+from src.reader import parse_calendar, ENGINES
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("target", [None, date(2025, 6, 2)])
+def test_paralelo_igual_a_secuencial(multi_xlsx, engine, target):
+    seq = parse_calendar(multi_xlsx, target_date=target, engine=engine)
+    assert list(dict.fromkeys(r["empresa"] for r in seq)) == ["ACME", "BETA", "GAMMA", "DELTA"]
+    assert parse_calendar(multi_xlsx, target_date=target, engine=engine, workers=3) == seq
+
+def test_paralelo_con_filtro_una_hoja(multi_xlsx):
+    assert parse_calendar(multi_xlsx, company_filter="gamma", workers=4) == \
+        parse_calendar(multi_xlsx, company_filter="gamma")
+
+def test_paralelo_con_spawn_ve_los_overrides(multi_xlsx, monkeypatch):
+    # Con spawn (o forkserver) los procesos no heredan los cambios hechos en
+    # EMPRESA_OVERRIDES en tiempo de ejecución: se les pasan al arrancar
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    from src import reader
+    monkeypatch.setattr(reader, "ProcessPoolExecutor",
+                        partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn")))
+    monkeypatch.setitem(reader.EMPRESA_OVERRIDES, "BETA", "ACME")
+    seq = parse_calendar(multi_xlsx, engine="xml")
+    assert "BETA" not in {r["empresa"] for r in seq}
+    assert parse_calendar(multi_xlsx, engine="xml", workers=2) == seq
@@ -1,21 +1,29 @@
 import os
 import pytest
 from src.reader import parse_calendar
+from src.synthetic import build_calendar
 
-# Usaremos un Excel de prueba más pequeño, ponlo en data/mini_prueba.xlsx
+# Usaremos un Excel de prueba más pequeño, ponlo en data/mini_prueba.xlsx; si
+# no está, se genera uno sintético (scripts/synthetic_calendar.py)
 FIXTURE = os.path.join(os.path.dirname(__file__), "..", "data", "mini_prueba.xlsx")
 
-def test_parse_calendar_devuelve_lista_no_vacía():
-    regs = parse_calendar(FIXTURE)
+@pytest.fixture(scope="module")
+def fixture_xlsx(tmp_path_factory):
+    if os.path.exists(FIXTURE):
+        return FIXTURE
+    return build_calendar(str(tmp_path_factory.mktemp("data") / "mini_prueba.xlsx"))
+
+def test_parse_calendar_devuelve_lista_no_vacía(fixture_xlsx):
+    regs = parse_calendar(fixture_xlsx)
     assert isinstance(regs, list)
     assert len(regs) > 0
 
-def test_campos_registro():
-    reg = parse_calendar(FIXTURE)[0]
+def test_campos_registro(fixture_xlsx):
+    reg = parse_calendar(fixture_xlsx)[0]
     assert set(reg.keys()) == {"empresa", "pais", "impuesto", "fecha", "estado"}
 
-def test_agrupar_por_fecha():
-    regs = parse_calendar(FIXTURE)
+def test_agrupar_por_fecha(fixture_xlsx):
+    regs = parse_calendar(fixture_xlsx)
     fechas = {r["fecha"] for r in regs}
     # Debe haber registros en al menos dos fechas distintas
     assert len(fechas) >= 2
@@ -8,7 +8,7 @@ def main():
 
     # Imprime los primeros 10 registros para inspección
     for i, reg in enumerate(registros[:10], start=1):
-        print(f"{i:02d} | {reg['fecha'].date()} | {reg['empresa']} | {reg['pais']} | "
+        print(f"{i:02d} | {reg['fecha'].isoformat()} | {reg['empresa']} | {reg['pais']} | "
               f"{reg['impuesto']} | {reg['estado']}")
     
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+from dataclasses import replace
+from datetime import date
+
+import pytest
+from openpyxl import load_workbook
+
+from src.reader import ENGINES, parse_calendar
+from src.synthetic import EXTRA_SHEETS, CalendarSpec, build_calendar, company_names
+
+SPEC = CalendarSpec(companies=2, rows=6, years=2, density=0.2, seed=7)
+
+@pytest.fixture(scope="module")
+def synthetic_xlsx(tmp_path_factory):
+    return build_calendar(str(tmp_path_factory.mktemp("synthetic") / "calendar.xlsx"), SPEC)
+
+def test_disposicion(synthetic_xlsx):
+    wb = load_workbook(synthetic_xlsx)
+    assert wb.sheetnames[:2] == company_names(2)
+    assert set(EXTRA_SHEETS) <= set(wb.sheetnames)
+    ws = wb["COMPANY 01"]
+    assert ws["C3"].value == "January - 2025"
+    assert ws.cell(row=3, column=3 + 365).value == "January - 2026"
+    assert [ws.cell(row=5, column=c).value for c in (3, 4, 33, 34)] == [1, 2, 31, 1]
+
+def test_determinista(synthetic_xlsx, tmp_path):
+    again = build_calendar(str(tmp_path / "again.xlsx"), SPEC)
+    other = build_calendar(str(tmp_path / "other.xlsx"), replace(SPEC, seed=8))
+    regs = parse_calendar(synthetic_xlsx, engine="xml")
+    assert parse_calendar(again, engine="xml") == regs
+    assert parse_calendar(other, engine="xml") != regs
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_lectura(synthetic_xlsx, engine):
+    regs = parse_calendar(synthetic_xlsx, engine=engine)
+    assert {r["empresa"] for r in regs} == set(company_names(2))
+    assert {r["fecha"].year for r in regs} == {2025, 2026}
+    assert len({r["estado"] for r in regs}) > 5
+    assert date(2027, 1, 1) not in {r["fecha"] for r in regs}
+
+def test_tamano():
+    assert CalendarSpec.parse("10x50x2", seed=3) == CalendarSpec(companies=10, rows=50, years=2, seed=3)
+    assert CalendarSpec.parse("10x50x2").label == "10x50x2"
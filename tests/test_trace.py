@@ -0,0 +1,26 @@
+import pytest
+from src.reader import parse_calendar, ENGINES
+from src.trace import PHASES, Tracer
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_sin_tracer_no_imprime(calendar_xlsx, engine, capsys):
+    parse_calendar(calendar_xlsx, engine=engine)
+    assert capsys.readouterr().out == ""
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tiempos_por_fase_y_buffer_circular(calendar_xlsx, engine):
+    tracer = Tracer(cells=4)
+    regs = parse_calendar(calendar_xlsx, engine=engine, tracer=tracer)
+    assert regs == parse_calendar(calendar_xlsx)
+    assert list(tracer.timings) == ["ACME"]
+    assert set(tracer.timings["ACME"]) == set(PHASES)
+    assert all(t >= 0 for t in tracer.timings["ACME"].values())
+    assert len(tracer.cells) == 4
+    assert tracer.cells[-1][:3] == ("ACME", 7, 63)
+    assert "ACME" in tracer.report()
+
+def test_tracer_en_paralelo(multi_xlsx):
+    tracer = Tracer()
+    parse_calendar(multi_xlsx, engine="xml", workers=2, tracer=tracer)
+    assert list(tracer.timings) == ["ACME", "BETA", "GAMMA", "DELTA"]
+    assert tracer.cells is None
@@ -0,0 +1,90 @@
+import zipfile
+
+from src import xlsx
+from src.xlsx import XlsxPackage, column_index
+
+MAIN = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+REL = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+def _write(path, sheet_xml):
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("xl/workbook.xml",
+                   f'<workbook {MAIN} {REL}><sheets><sheet name="Hoja" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        z.writestr("xl/_rels/workbook.xml.rels",
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                   'Target="/xl/worksheets/sheet1.xml"/></Relationships>')
+        z.writestr("xl/sharedStrings.xml",
+                   f'<sst {MAIN}><si><t>June - 2025</t></si>'
+                   '<si><r><t>Sp</t></r><r><t>ain</t></r><rPh><t>x</t></rPh></si></sst>')
+        z.writestr("xl/styles.xml",
+                   f'<styleSheet {MAIN}><fills><fill><patternFill patternType="none"/></fill>'
+                   '<fill><patternFill patternType="solid"><fgColor rgb="FF00B0F0"/></patternFill></fill></fills>'
+                   '<cellXfs><xf fillId="0"/><xf fillId="1"/></cellXfs></styleSheet>')
+        z.writestr("xl/worksheets/sheet1.xml", f'<worksheet {MAIN}><sheetData>{sheet_xml}</sheetData></worksheet>')
+
+def test_column_index():
+    assert column_index("A1") == 1
+    assert column_index("AB12") == 28
+
+def test_filas_celdas_y_estilos(tmp_path):
+    path = tmp_path / "raw.xlsx"
+    _write(path,
+           '<row r="1"><c r="C1" t="s"><v>0</v></c></row>'
+           '<row><c t="s"><v>1</v></c><c t="inlineStr"><is><t>VAT</t></is></c>'
+           '<c s="1"/><c><v>3.5</v></c><c t="str"><v>SI</v></c></row>'
+           '<row r="9"><c r="B9"><v>7</v></c></row>')
+    with XlsxPackage(str(path)) as pkg:
+        assert pkg.sheetnames == ["Hoja"]
+        assert pkg.xf_fills == [0, 1]
+        assert pkg.fills[1] == {"patternType": "solid", "fgColor": {"rgb": "FF00B0F0"}, "bgColor": {}}
+        rows = list(pkg.iter_rows("Hoja"))
+        assert rows[0] == (1, [(None, 0), (None, 0), ("June - 2025", 0)])
+        assert rows[1] == (2, [("Spain", 0), ("VAT", 0), (None, 1), (3.5, 0), ("SI", 0)])
+        assert rows[2] == (9, [(None, 0), (7, 0)])
+        assert list(pkg.iter_rows("Hoja", min_row=2, max_row=2, max_col=2)) == [(2, [("Spain", 0), ("VAT", 0)])]
+        assert list(pkg.iter_rows("Hoja", min_row=2, max_row=2, only={1, 4})) == \
+            [(2, [("Spain", 0), (None, 0), (None, 0), (3.5, 0)])]
+        assert pkg.dimension("Hoja") is None
+
+def test_cadenas_compartidas_incrementales(tmp_path):
+    path = tmp_path / "libro.xlsx"
+    _write(path, '<row r="1"><c r="A1" t="s"><v>0</v></c></row>')
+    with XlsxPackage(str(path)) as pkg:
+        assert list(pkg.iter_rows("Hoja")) == [(1, [("June - 2025", 0)])]
+        assert len(pkg.shared_strings._items) == 1
+        assert list(pkg.shared_strings) == ["June - 2025", "Spain"]
+
+def test_fila_por_el_texto_de_la_columna_a(tmp_path):
+    path = tmp_path / "libro.xlsx"
+    _write(path,
+           '<row r="1"><c r="A1" t="s"><v>0</v></c></row>'
+           '<row r="4"><c r="A4"><v>1</v></c><c r="B4" t="inlineStr"><is><t>Legend</t></is></c></row>'
+           '<row r="7"><c r="A7" t="inlineStr"><is><t xml:space="preserve">  LEGEND &amp; co</t></is></c></row>'
+           '<row r="8"><c r="A8" t="str"><v>legend</v></c></row>')
+    with XlsxPackage(str(path)) as pkg:
+        assert pkg.find_row("Hoja", "legend") == 7
+        assert pkg.find_row("Hoja", "june") == 1
+        assert pkg.find_row("Hoja", "spain") is None
+    # Celdas sin referencia: se recorre la columna A
+    _write(path, '<row r="2"><c t="s"><v>1</v></c></row><row><c t="str"><v>Legend</v></c></row>')
+    with XlsxPackage(str(path)) as pkg:
+        assert pkg.find_row("Hoja", "legend") == 3
+
+def test_iter_rows_empieza_en_min_row(tmp_path, monkeypatch):
+    path = tmp_path / "libro.xlsx"
+    rows = "".join(f'<row r="{r}" x="1"><c r="A{r}"><v>{r}</v></c><c r="B{r}" s="1"/></row>'
+                   for r in range(1, 30, 2))
+    _write(path, rows)
+    with XlsxPackage(str(path)) as pkg:
+        full = list(pkg.iter_rows("Hoja", 10, 20, 2))
+        monkeypatch.setattr(xlsx, "SEEK_MIN", 0)
+        assert pkg._rows_xml("Hoja", 10).startswith(f"<worksheet {MAIN}><sheetData><row r=\"11\"".encode())
+        assert list(pkg.iter_rows("Hoja", 10, 20, 2)) == full
+        assert full[0] == (11, [(11, 0), (None, 1)])
+        assert list(pkg.iter_rows("Hoja", 40)) == []
+    # Una fila sin número antes de min_row podría ser ya min_row: no se salta
+    _write(path, '<row r="8"><c r="A8"><v>8</v></c></row><row><c><v>9</v></c></row>'
+                 '<row r="12"><c r="A12"><v>12</v></c></row>')
+    with XlsxPackage(str(path)) as pkg:
+        assert [r for r, _ in pkg.iter_rows("Hoja", 9)] == [9, 12]